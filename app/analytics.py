@@ -0,0 +1,185 @@
+"""
+DuckDB analytics store for cross-sectional scans.
+
+列式分析库：将日线镜像到本地 DuckDB 文件，全市场、单一日期区间的横截面扫描
+（如选股面板）在列式引擎中执行，比在 InnoDB 行存储上快几个数量级。
+主库（DATABASE_URL）仍是权威数据源；同步任务在写入主库后把新K线 upsert 到 DuckDB。
+
+Enable it with ``ANALYTICS_DATABASE_URL=duckdb:///data/analytics.duckdb`` and load
+the existing history once with::
+
+    python -m app.analytics load-db                 # from DATABASE_URL
+    python -m app.analytics load-archive /archive   # from a Parquet archive (app/archive.py)
+
+DuckDB allows one writing process at a time, so readers open the file read-only
+per scan and callers fall back to the main database while a sync is writing.
+Requires ``duckdb``.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy.engine import make_url
+
+from .bars import BAR_COLUMNS
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock_daily_data (
+    symbol      VARCHAR        NOT NULL,
+    trade_date  DATE           NOT NULL,
+    open_price  DECIMAL(12, 4) NOT NULL,
+    high_price  DECIMAL(12, 4) NOT NULL,
+    low_price   DECIMAL(12, 4) NOT NULL,
+    close_price DECIMAL(12, 4) NOT NULL,
+    volume      BIGINT         NOT NULL,
+    amount      BIGINT,
+    PRIMARY KEY (symbol, trade_date)
+)
+"""
+
+_COLUMN_LIST = ", ".join(("symbol", "trade_date") + BAR_COLUMNS)
+_UPSERT = (
+    f"INSERT INTO stock_daily_data SELECT {_COLUMN_LIST} FROM {{source}} "
+    "ON CONFLICT (symbol, trade_date) DO UPDATE SET "
+    + ", ".join(f"{name} = excluded.{name}" for name in BAR_COLUMNS)
+)
+
+
+def database_path() -> Optional[str]:
+    """Path of the DuckDB file from ANALYTICS_DATABASE_URL, or None when the store is disabled."""
+    if not settings.ANALYTICS_DATABASE_URL:
+        return None
+    url = make_url(settings.ANALYTICS_DATABASE_URL)
+    if url.drivername != "duckdb" or not url.database:
+        raise ValueError("ANALYTICS_DATABASE_URL must look like duckdb:///path/to/file.duckdb")
+    return url.database
+
+
+def enabled() -> bool:
+    return database_path() is not None
+
+
+def connect(read_only: bool = False):
+    """Opens the analytics database, creating the schema when opened for writing."""
+    try:
+        import duckdb
+    except ImportError:
+        raise RuntimeError("The analytics store requires duckdb: pip install duckdb")
+    path = database_path()
+    if path is None:
+        raise RuntimeError("ANALYTICS_DATABASE_URL is not configured.")
+    if not read_only:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    con = duckdb.connect(path, read_only=read_only)
+    if not read_only:
+        con.execute(SCHEMA)
+    return con
+
+
+# --- Writing ---
+
+def upsert_daily_bars(con, frame) -> int:
+    """Upserts a DataFrame with ``symbol``, ``trade_date`` and the bar columns natively in DuckDB."""
+    if len(frame) == 0:
+        return 0
+    con.register("incoming_bars", frame)
+    try:
+        con.execute(_UPSERT.format(source="incoming_bars"))
+    finally:
+        con.unregister("incoming_bars")
+    return len(frame)
+
+
+def mirror_synced_bars(symbol: str, df):
+    """Copies freshly synced daily bars (``fetch_k_data`` output) into the store; called by the sync tasks."""
+    if not enabled():
+        return
+    frame = df[["trade_date", *BAR_COLUMNS]].copy()
+    frame.insert(0, "symbol", symbol)
+    try:
+        with connect() as con:
+            upsert_daily_bars(con, frame)
+    except Exception as e:
+        # The main database is authoritative; a later load-db run repairs the mirror.
+        logger.warning(f"Could not mirror {symbol} into the analytics store: {e}")
+
+
+def load_from_archive(root: str) -> int:
+    """Upserts every daily bar of a Parquet archive written by app/archive.py."""
+    pattern = os.path.join(root, "stock_daily_data", "**", "*.parquet").replace("'", "''")
+    with connect() as con:
+        source = f"read_parquet('{pattern}', hive_partitioning = true)"
+        con.execute(_UPSERT.format(source=source))
+        return con.execute(f"SELECT count(*) FROM {source}").fetchone()[0]
+
+
+async def load_from_database(chunk_size: int = 100000) -> int:
+    """Streams stock_daily_data from the main database into the store."""
+    import pandas as pd
+
+    from . import crud, models
+    from .database import AsyncSessionLocal
+
+    total = 0
+    async with AsyncSessionLocal() as db:
+        with connect() as con:
+            async for rows in crud.stream_bars_with_symbol(db, models.StockDailyData, chunk_size=chunk_size):
+                total += upsert_daily_bars(con, pd.DataFrame([dict(row) for row in rows]))
+                logger.info(f"Loaded {total} daily bars into the analytics store.")
+    return total
+
+
+# --- Reading ---
+
+def scan_recent_daily_bars(lookback: int) -> Dict[str, np.ndarray]:
+    """
+    Returns the bars of every stock over the last ``lookback`` trading dates as
+    column arrays: ``symbol``, ``trade_date`` (datetime64[D]) and float BAR_COLUMNS.
+    """
+    prices = ", ".join(f"CAST({name} AS DOUBLE) AS {name}" for name in BAR_COLUMNS)
+    with connect(read_only=True) as con:
+        columns = con.execute(
+            f"""
+            WITH recent AS (
+                SELECT DISTINCT trade_date FROM stock_daily_data ORDER BY trade_date DESC LIMIT ?
+            )
+            SELECT symbol, trade_date, {prices}
+            FROM stock_daily_data
+            WHERE trade_date >= (SELECT min(trade_date) FROM recent)
+            """,
+            [lookback],
+        ).fetchnumpy()
+    result = {
+        "symbol": np.asarray(columns["symbol"], dtype=object),
+        "trade_date": np.asarray(columns["trade_date"]).astype("datetime64[D]"),
+    }
+    for name in BAR_COLUMNS:
+        # Nullable columns come back as masked arrays.
+        result[name] = np.ma.filled(np.ma.asarray(columns[name], dtype=np.float64), np.nan)
+    return result
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load the DuckDB analytics store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("load-db", help="Copy stock_daily_data from DATABASE_URL")
+    archive = sub.add_parser("load-archive", help="Copy daily bars from a Parquet archive")
+    archive.add_argument("path", help="Archive directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "load-db":
+        total = await load_from_database()
+    else:
+        total = await asyncio.to_thread(load_from_archive, args.path)
+    logger.info(f"Loaded {total} daily bars into the analytics store.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+"""
+Parquet archive export and fast reload.
+
+将 stock_info 与K线表导出为按年份和代码前缀分区的 Parquet 数据集，
+并可从本地文件批量导回，免去重新从 Baostock 全量下载::
+
+    {archive}/stock_info.parquet
+    {archive}/stock_daily_data/year=2024/prefix=sh.600/part-0-0.parquet
+    {archive}/stock_period_data/year=2024/prefix=sz.000/part-3-0.parquet
+
+Rows are keyed by symbol rather than stock_id, so an archive can be loaded into a
+database whose ids differ from the source. Usage::
+
+    python -m app.archive export /data/archive
+    python -m app.archive import /data/archive
+
+Requires ``pyarrow``.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import time
+from typing import List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, models
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+STOCK_INFO_FILE = "stock_info.parquet"
+STOCK_INFO_COLUMNS = ("symbol", "company_name", "exchange", "sector", "industry", "description", "ipo_date")
+BAR_TABLES = {
+    "stock_daily_data": models.StockDailyData,
+    "stock_period_data": models.StockPeriodData,
+}
+PRICE_COLUMNS = ("open_price", "high_price", "low_price", "close_price")
+PARTITION_COLUMNS = ["year", "prefix"]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("The Parquet archive requires pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def symbol_prefix(symbol: str) -> str:
+    """Partition key for a symbol: the exchange and the first three digits, e.g. ``sh.600``."""
+    return symbol[:6]
+
+
+def _bar_chunk_table(pa, rows: List[dict]):
+    """Converts a chunk of streamed bar rows into an Arrow table with partition columns."""
+    columns = {}
+    for name in rows[0].keys():
+        values = [row[name] for row in rows]
+        if name in PRICE_COLUMNS:
+            columns[name] = pa.array(values, type=pa.decimal128(12, 4))
+        elif name in ("volume", "amount"):
+            columns[name] = pa.array(values, type=pa.int64())
+        elif name in ("trade_date", "period_start"):
+            columns[name] = pa.array(values, type=pa.date32())
+        else:
+            columns[name] = pa.array(values, type=pa.string())
+    columns["year"] = pa.compute.year(columns["trade_date"])
+    columns["prefix"] = pa.array([symbol_prefix(s) for s in columns["symbol"].to_pylist()], type=pa.string())
+    return pa.table(columns)
+
+
+async def export_archive(db: AsyncSession, root: str, chunk_size: int = 50000, overwrite: bool = False):
+    """Writes stock_info and every bar table under ``root``, streaming ``chunk_size`` rows at a time."""
+    pa = _pyarrow()
+    if os.path.exists(root) and os.listdir(root):
+        if not overwrite:
+            raise FileExistsError(f"Archive directory {root} is not empty.")
+        shutil.rmtree(root)
+    os.makedirs(root, exist_ok=True)
+
+    result = await db.execute(select(*(getattr(models.StockInfo, c) for c in STOCK_INFO_COLUMNS)))
+    stock_infos = [dict(row) for row in result.mappings()]
+    pa.parquet.write_table(pa.Table.from_pylist(stock_infos), os.path.join(root, STOCK_INFO_FILE))
+    logger.info(f"Exported {len(stock_infos)} stock_info rows.")
+
+    for table_name, model in BAR_TABLES.items():
+        started = time.perf_counter()
+        total = 0
+        chunk_no = 0
+        async for rows in crud.stream_bars_with_symbol(db, model, chunk_size=chunk_size):
+            pa.parquet.write_to_dataset(
+                _bar_chunk_table(pa, rows),
+                root_path=os.path.join(root, table_name),
+                partition_cols=PARTITION_COLUMNS,
+                basename_template=f"part-{chunk_no}-{{i}}.parquet",
+            )
+            total += len(rows)
+            chunk_no += 1
+        logger.info(f"Exported {total} {table_name} rows in {time.perf_counter() - started:.1f}s.")
+
+
+async def import_archive(db: AsyncSession, root: str, batch_size: int = 50000):
+    """Loads an archive written by export_archive, upserting into the current database."""
+    pa = _pyarrow()
+
+    stock_infos = pa.parquet.read_table(os.path.join(root, STOCK_INFO_FILE)).to_pylist()
+    for i in range(0, len(stock_infos), batch_size):
+        await crud.upsert_stock_infos_bulk(db, stock_infos[i:i + batch_size])
+    id_by_symbol = {symbol: stock_id for stock_id, symbol in await crud.get_all_stock_symbols(db)}
+    logger.info(f"Imported {len(stock_infos)} stock_info rows.")
+
+    for table_name, model in BAR_TABLES.items():
+        path = os.path.join(root, table_name)
+        if not os.path.isdir(path):
+            continue
+        started = time.perf_counter()
+        total = 0
+        dataset = pa.dataset.dataset(path, format="parquet", partitioning="hive")
+        columns = [name for name in dataset.schema.names if name not in PARTITION_COLUMNS]
+        for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+            rows = batch.to_pylist()
+            for row in rows:
+                row["stock_id"] = id_by_symbol[row.pop("symbol")]
+            await crud.bulk_upsert_bars(db, model, rows)
+            total += len(rows)
+        logger.info(f"Imported {total} {table_name} rows in {time.perf_counter() - started:.1f}s.")
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import the Parquet bar archive.")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="Archive directory")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per streamed chunk")
+    parser.add_argument("--overwrite", action="store_true", help="Replace an existing archive on export")
+    args = parser.parse_args(argv)
+
+    async with AsyncSessionLocal() as db:
+        if args.command == "export":
+            await export_archive(db, args.path, chunk_size=args.chunk_size, overwrite=args.overwrite)
+        else:
+            await import_archive(db, args.path, batch_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,336 @@
+"""
+Resilient client layer for every Baostock call.
+
+Baostock 调用封装：记录每次调用的耗时，对瞬时错误（网络错误、会话失效等）按带抖动的
+指数退避重试，持续失败时打开熔断器。熔断期间调用方立即失败（CircuitOpenError），
+可以改用缓存数据。每次尝试前先从共享的令牌桶（app/rate_limit.py）按优先级取得令牌。
+
+The baostock package talks over one module-global socket, so calls are serialized
+with a lock and a single login session is kept open and re-established on demand.
+BAOSTOCK_BACKEND=offline swaps the service for the stand-in in ``app.offline_baostock``.
+This module does not touch the database so that the standalone ``app2`` service can use it too.
+"""
+import logging
+import random
+import threading
+import time
+from typing import List, Optional
+
+from .config import settings
+from .lazy_imports import lazy_import
+from .metrics import Counter, Gauge, Histogram, record_baostock, stage
+from .offline_baostock import create_api
+from .rate_limit import INTERACTIVE, AdaptiveTokenBucket
+
+# baostock imports pandas; with the offline backend it is never loaded at all.
+bs = lazy_import("baostock")
+
+logger = logging.getLogger(__name__)
+
+# Error codes worth retrying: session expired, network errors, corrupt responses, server errors.
+TRANSIENT_ERROR_CODES = {
+    "10001001",
+    "10002001", "10002002", "10002003", "10002004", "10002005", "10002006", "10002007", "10002008",
+    "10004001", "10004002",
+    "10005001",
+}
+
+CALL_DURATION = Histogram(
+    "baostock_call_duration_seconds", "Latency of each Baostock call attempt, including the row drain.",
+    ("method", "outcome"),
+)
+RETRIES = Counter("baostock_retries_total", "Baostock call attempts that were retried.", ("method",))
+SHORT_CIRCUITS = Counter("baostock_short_circuits_total", "Calls rejected while the breaker was open.", ("method",))
+FALLBACKS = Counter("baostock_fallbacks_total", "Requests served from cached data after a Baostock failure.", ("handler",))
+BREAKER_STATE = Gauge("baostock_breaker_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open.")
+
+
+class BaostockError(Exception):
+    """A Baostock call failed with ``error_code`` (``"exception"`` for a raised exception)."""
+
+    def __init__(self, method: str, error_code: str, error_msg: str):
+        super().__init__(f"Baostock {method} failed ({error_code}): {error_msg}")
+        self.method = method
+        self.error_code = error_code
+        self.error_msg = error_msg
+
+    @property
+    def transient(self) -> bool:
+        return self.error_code == "exception" or self.error_code in TRANSIENT_ERROR_CODES
+
+
+class CircuitOpenError(BaostockError):
+    """Raised without calling Baostock while the circuit breaker is open."""
+
+    def __init__(self, method: str, retry_after: float):
+        super().__init__(method, "circuit_open", f"circuit open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+    @property
+    def transient(self) -> bool:
+        return True
+
+
+class RateLimitedError(BaostockError):
+    """Raised when no upstream request token was granted within the acquire timeout."""
+
+    def __init__(self, method: str):
+        super().__init__(method, "rate_limited", "upstream request budget exhausted")
+
+    @property
+    def transient(self) -> bool:
+        return True
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failed calls. After ``reset_seconds``
+    it lets one probe call through (half-open); the probe's outcome closes or re-opens it.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a call may proceed now; in the half-open state only one probe at a time."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def cancel_probe(self):
+        """Releases a granted half-open probe that never reached Baostock, so the next call can probe."""
+        with self._lock:
+            self._probing = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Baostock circuit breaker closed.")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Baostock circuit breaker opened after {self.failures} failures.")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def state_code(self) -> int:
+        return {self.CLOSED: 0, self.HALF_OPEN: 1, self.OPEN: 2}[self.state]
+
+
+class QueryResult:
+    """Fields and drained rows of one Baostock query."""
+
+    __slots__ = ("fields", "rows")
+
+    def __init__(self, fields: List[str], rows: List[list]):
+        self.fields = fields
+        self.rows = rows
+
+
+class BaostockClient:
+    """
+    Runs Baostock queries with latency metrics, retries with jittered exponential
+    backoff and a circuit breaker.
+
+    Args:
+        max_retries: Retries after the first attempt for transient failures.
+        backoff_base: Backoff cap of the first retry; doubles per retry up to ``backoff_max``.
+            The actual delay is drawn uniformly from [0, cap] ("full jitter").
+        breaker: Circuit breaker shared by all calls through this client.
+        limiter: Token bucket every attempt draws from; it is fed each attempt's latency and outcome.
+        acquire_timeout: Longest an interactive call waits for a token; batch calls wait indefinitely.
+        api: The baostock module (or a stand-in with the same functions).
+    """
+
+    def __init__(self, max_retries: int, backoff_base: float, backoff_max: float,
+                 breaker: CircuitBreaker, limiter: Optional[AdaptiveTokenBucket] = None,
+                 acquire_timeout: Optional[float] = None, api=bs):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker
+        self.limiter = limiter
+        self.acquire_timeout = acquire_timeout
+        self.api = api
+        self._lock = threading.RLock()
+        self._logged_in = False
+
+    def query(self, method: str, *args, handler: str = "baostock", priority: int = INTERACTIVE,
+              **kwargs) -> QueryResult:
+        """
+        Calls ``baostock.<method>(*args, **kwargs)`` and drains all rows.
+        ``handler`` labels the login/query/drain stage timers; ``priority`` is the
+        limiter class (``rate_limit.INTERACTIVE`` or ``rate_limit.BATCH``).
+
+        Raises:
+            CircuitOpenError: The breaker is open; Baostock was not called.
+            RateLimitedError: An interactive call got no token within the acquire timeout.
+            BaostockError: The call failed permanently or after all retries.
+        """
+        if not self.breaker.allow():
+            SHORT_CIRCUITS.inc(method=method)
+            raise CircuitOpenError(method, self.breaker.retry_after())
+        # A half-open probe gets a single attempt.
+        attempts = 1 if self.breaker.state == CircuitBreaker.HALF_OPEN else self.max_retries + 1
+        for attempt in range(attempts):
+            try:
+                self._acquire(method, priority)
+            except RateLimitedError:
+                # No call was made, so the probe has no outcome to record.
+                self.breaker.cancel_probe()
+                raise
+            started = time.perf_counter()
+            try:
+                result = self._attempt(method, args, kwargs, handler)
+            except BaostockError as e:
+                if self.limiter is not None:
+                    self.limiter.record(time.perf_counter() - started, ok=not e.transient)
+                if not e.transient:
+                    # The upstream is healthy, the request is bad: don't count it against the breaker.
+                    self.breaker.record_success()
+                    raise
+                self._reset_session()
+                if attempt + 1 >= attempts:
+                    self.breaker.record_failure()
+                    raise
+                RETRIES.inc(method=method)
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                logger.info(f"Retrying Baostock {method} in {delay:.2f}s after {e.error_code}: {e.error_msg}")
+                time.sleep(delay)
+            else:
+                if self.limiter is not None:
+                    self.limiter.record(time.perf_counter() - started, ok=True)
+                self.breaker.record_success()
+                return result
+
+    def _acquire(self, method: str, priority: int):
+        if self.limiter is None:
+            return
+        timeout = self.acquire_timeout if priority == INTERACTIVE else None
+        if not self.limiter.acquire(priority, timeout):
+            raise RateLimitedError(method)
+
+    def close(self):
+        """Logs out of the shared session."""
+        with self._lock:
+            if self._logged_in:
+                try:
+                    self.api.logout()
+                finally:
+                    self._logged_in = False
+
+    def _attempt(self, method: str, args, kwargs, handler: str) -> QueryResult:
+        with self._lock:
+            self._login(handler)
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                with stage(handler, "query"):
+                    rs = getattr(self.api, method)(*args, **kwargs)
+                if rs.error_code != "0":
+                    record_baostock(method, rs.error_code)
+                    raise BaostockError(method, rs.error_code, rs.error_msg)
+                # Rows arrive in pages; next() fetches the following page and can fail mid-way.
+                with stage(handler, "drain"):
+                    rows = []
+                    while (rs.error_code == "0") & rs.next():
+                        rows.append(rs.get_row_data())
+                record_baostock(method, rs.error_code, len(rows))
+                if rs.error_code != "0":
+                    raise BaostockError(method, rs.error_code, rs.error_msg)
+                outcome = "ok"
+                return QueryResult(list(rs.fields), rows)
+            except BaostockError:
+                raise
+            except Exception as e:
+                record_baostock(method, "exception")
+                raise BaostockError(method, "exception", str(e)) from e
+            finally:
+                CALL_DURATION.observe(time.perf_counter() - started, method=method, outcome=outcome)
+
+    def _login(self, handler: str):
+        if self._logged_in:
+            return
+        started = time.perf_counter()
+        try:
+            with stage(handler, "login"):
+                lg = self.api.login()
+        except Exception as e:
+            CALL_DURATION.observe(time.perf_counter() - started, method="login", outcome="error")
+            record_baostock("login", "exception")
+            raise BaostockError("login", "exception", str(e)) from e
+        outcome = "ok" if lg.error_code == "0" else "error"
+        CALL_DURATION.observe(time.perf_counter() - started, method="login", outcome=outcome)
+        record_baostock("login", lg.error_code)
+        if lg.error_code != "0":
+            raise BaostockError("login", lg.error_code, lg.error_msg)
+        self._logged_in = True
+
+    def _reset_session(self):
+        """Drops the session after a transient failure so the next attempt logs in again."""
+        with self._lock:
+            if self._logged_in:
+                try:
+                    self.api.logout()
+                except Exception:
+                    pass
+                self._logged_in = False
+
+
+_client: Optional[BaostockClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> BaostockClient:
+    """Returns the process-wide client configured from settings."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            breaker = CircuitBreaker(settings.BAOSTOCK_BREAKER_FAILURES, settings.BAOSTOCK_BREAKER_RESET_SECONDS)
+            limiter = None
+            if settings.BAOSTOCK_RATE_LIMIT:
+                limiter = AdaptiveTokenBucket(
+                    rate=settings.BAOSTOCK_RATE_INITIAL,
+                    burst=settings.BAOSTOCK_RATE_BURST,
+                    min_rate=settings.BAOSTOCK_RATE_MIN,
+                    max_rate=settings.BAOSTOCK_RATE_MAX,
+                    latency_target=settings.BAOSTOCK_LATENCY_TARGET_SECONDS,
+                    increase=settings.BAOSTOCK_RATE_INCREASE,
+                    decrease=settings.BAOSTOCK_RATE_DECREASE,
+                )
+            _client = BaostockClient(
+                settings.BAOSTOCK_MAX_RETRIES,
+                settings.BAOSTOCK_BACKOFF_BASE_SECONDS,
+                settings.BAOSTOCK_BACKOFF_MAX_SECONDS,
+                breaker,
+                limiter=limiter,
+                acquire_timeout=settings.BAOSTOCK_ACQUIRE_TIMEOUT_SECONDS,
+                api=create_api(settings.BAOSTOCK_BACKEND),
+            )
+            BREAKER_STATE.set_function(breaker.state_code)
+        return _client
@@ -0,0 +1,164 @@
+"""
+Memory-budgeted, process-level cache of per-symbol bar arrays.
+
+热点缓存：按 (股票, 频率, 复权方式) 缓存列式K线数组，总内存受 BAR_CACHE_MAX_BYTES 约束，
+支持 LRU / LFU 淘汰、命中/未命中/淘汰计数，以及供同步任务调用的失效接口。
+This module only depends on NumPy so that the standalone ``app2`` service can use it too.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Hashable, Optional
+
+from .bars import Bars
+from .config import settings
+
+# Rough per-entry bookkeeping overhead added to the array bytes.
+ENTRY_OVERHEAD_BYTES = 512
+
+
+class CacheEntry:
+    """Cached bars together with the date range they cover."""
+
+    __slots__ = ("bars", "start_date", "end_date", "expires_at", "meta", "nbytes", "hits")
+
+    def __init__(self, bars: Bars, start_date: Optional[date], end_date: Optional[date],
+                 expires_at: Optional[float], meta: Optional[dict]):
+        self.bars = bars
+        self.start_date = start_date
+        self.end_date = end_date
+        self.expires_at = expires_at
+        self.meta = meta or {}
+        self.nbytes = bars.nbytes + ENTRY_OVERHEAD_BYTES
+        self.hits = 0
+
+    def covers(self, start_date: Optional[date], end_date: Optional[date]) -> bool:
+        """True if [start_date, end_date] lies within the cached range (None = unbounded)."""
+        if self.start_date is not None and (start_date is None or start_date < self.start_date):
+            return False
+        if self.end_date is not None and (end_date is None or end_date > self.end_date):
+            return False
+        return True
+
+
+class BarCache:
+    """
+    Thread-safe cache of Bars with a byte budget.
+
+    Args:
+        max_bytes: Total bytes the cached arrays may hold.
+        policy: ``"lru"`` evicts the least recently used entry, ``"lfu"`` the least
+            frequently used one (ties broken by recency).
+    """
+
+    def __init__(self, max_bytes: int, policy: str = "lru"):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown cache policy: {policy}")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key: Hashable, start_date: Optional[date] = None,
+               end_date: Optional[date] = None) -> Optional[CacheEntry]:
+        """Returns the entry for ``key`` if it is fresh and covers the range, counting a hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            # Expired entries stay until replaced or evicted: peek() serves them as a
+            # fallback while the upstream is unavailable.
+            if entry is not None and entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                entry = None
+            if entry is None or not entry.covers(start_date, end_date):
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """Returns the entry for ``key`` even if expired, without counting a lookup."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: Hashable, bars: Bars, start_date: Optional[date] = None,
+            end_date: Optional[date] = None, ttl: Optional[float] = None,
+            meta: Optional[dict] = None) -> CacheEntry:
+        """
+        Caches ``bars`` covering [start_date, end_date] (None = the full history),
+        evicting other entries until the budget is met. ``ttl`` bounds the age of
+        entries whose data can still change, e.g. ranges that include today.
+        """
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        entry = CacheEntry(bars, start_date, end_date, expires_at, meta)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if entry.nbytes > self.max_bytes:
+                # Never cache something that would flush the whole hot set.
+                return entry
+            while self.bytes + entry.nbytes > self.max_bytes and self._entries:
+                self._remove(self._victim())
+                self.evictions += 1
+            self._entries[key] = entry
+            self.bytes += entry.nbytes
+        return entry
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_symbol(self, symbol: str):
+        """Drops every entry whose key is a tuple starting with ``symbol``; called by the sync tasks."""
+        with self._lock:
+            for key in [k for k in self._entries if isinstance(k, tuple) and k and k[0] == symbol]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "policy": self.policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _victim(self) -> Hashable:
+        if self.policy == "lru":
+            return next(iter(self._entries))
+        # Iteration order is recency, so min() keeps the least recent among equal counts.
+        return min(self._entries, key=lambda k: self._entries[k].hits)
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.nbytes
+
+
+_cache: Optional[BarCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> BarCache:
+    """Returns the process-level cache configured from settings."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = BarCache(settings.BAR_CACHE_MAX_BYTES, settings.BAR_CACHE_POLICY)
+    return _cache
@@ -0,0 +1,113 @@
+"""
+Column-oriented bar containers.
+
+K线数据在服务端以列式NumPy数组传递，避免为每一行构造ORM对象或DataFrame。
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from .lazy_imports import lazy_import
+
+# Loaded on first use so that importing this module stays cheap for app2's cold start.
+np = lazy_import("numpy")
+
+# Value columns carried by every bar set, in the order they are selected from the DB.
+BAR_COLUMNS = ("open_price", "high_price", "low_price", "close_price", "volume", "amount")
+
+
+class Bars:
+    """OHLCV bars for a single symbol, stored column-wise and sorted by ``trade_date``."""
+
+    __slots__ = ("trade_date", "columns")
+
+    def __init__(self, trade_date: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.trade_date = trade_date
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.trade_date)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name == "trade_date":
+            return self.trade_date
+        return self.columns[name]
+
+    @classmethod
+    def empty(cls) -> "Bars":
+        return cls(
+            np.empty(0, dtype="datetime64[D]"),
+            {name: np.empty(0, dtype=np.float64) for name in BAR_COLUMNS},
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the column arrays."""
+        return self.trade_date.nbytes + sum(col.nbytes for col in self.columns.values())
+
+    def slice(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> "Bars":
+        """Returns the bars within [start_date, end_date] as views via binary search."""
+        lo = 0 if start_date is None else int(np.searchsorted(self.trade_date, np.datetime64(start_date, "D"), "left"))
+        # end_date is inclusive of the whole day, which also holds for intraday timestamps.
+        hi = len(self) if end_date is None else int(np.searchsorted(self.trade_date, np.datetime64(end_date, "D") + 1, "left"))
+        return Bars(self.trade_date[lo:hi], {name: col[lo:hi] for name, col in self.columns.items()})
+
+    def to_payload(self) -> dict:
+        """Converts the bars into plain lists for a column-oriented JSON response."""
+        payload = {"trade_date": self.trade_date.tolist()}
+        for name, col in self.columns.items():
+            if name in ("volume", "amount"):
+                payload[name] = [None if v != v else int(v) for v in col.tolist()]
+            else:
+                payload[name] = col.tolist()
+        return payload
+
+
+def bars_from_rows(rows: Sequence[Sequence]) -> Bars:
+    """
+    Builds a Bars object from ``(trade_date, open, high, low, close, volume, amount)`` rows.
+    """
+    if not rows:
+        return Bars.empty()
+    columns = list(zip(*rows))
+    trade_date = np.array(columns[0], dtype="datetime64[D]")
+    return Bars(
+        trade_date,
+        {name: np.array(values, dtype=np.float64) for name, values in zip(BAR_COLUMNS, columns[1:])},
+    )
+
+
+def bars_from_frame(df) -> Bars:
+    """Builds a Bars object from a DataFrame shaped like ``baostock_utils.fetch_k_data`` output."""
+    trade_date = np.array(df['trade_date'].tolist(), dtype="datetime64[D]")
+    return Bars(
+        trade_date,
+        {name: df[name].astype("float64").to_numpy(na_value=np.nan) for name in BAR_COLUMNS},
+    )
+
+
+def split_rows_by_stock(rows: Sequence[Sequence]) -> Dict[int, Bars]:
+    """
+    Splits ``(stock_id, trade_date, open, ...)`` rows ordered by stock_id, trade_date
+    into one Bars object per stock, without a per-row Python loop.
+    """
+    if not rows:
+        return {}
+    columns = list(zip(*rows))
+    stock_ids = np.array(columns[0], dtype=np.int64)
+    trade_date = np.array(columns[1], dtype="datetime64[D]")
+    values = {name: np.array(col, dtype=np.float64) for name, col in zip(BAR_COLUMNS, columns[2:])}
+
+    bounds = np.flatnonzero(np.diff(stock_ids)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(stock_ids)]))
+    return {
+        int(stock_ids[lo]): Bars(trade_date[lo:hi], {name: col[lo:hi] for name, col in values.items()})
+        for lo, hi in zip(starts, ends)
+    }
+
+
+def unique_symbols(symbols: Iterable[str]) -> List[str]:
+    """De-duplicates symbols while keeping the caller's order."""
+    return list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
@@ -0,0 +1,283 @@
+"""
+Memory-mapped columnar bar store.
+
+本地列式K线存储：每个 (频率, 股票) 一组定宽二进制文件::
+
+    {BAR_STORE_DIR}/{frequency}/{symbol}/trade_date.i4   # days since 1970-01-01
+    {BAR_STORE_DIR}/{frequency}/{symbol}/open_price.i8   # fixed point, x 10^4
+    ...
+
+读取方通过 numpy.memmap 打开文件，按日期二分查找后切片（零拷贝），
+多个 uvicorn worker 经由操作系统页缓存共享同一份数据。
+写入方由同步任务驱动；每个文件集只允许一个写入者。追加新日期（或覆盖最后一天）时原地写入；
+改写历史时先在新的“代”目录中写出完整文件，再原子地替换 ``{symbol}`` 符号链接，
+读取方始终只看到某一代的完整数据。
+
+Backfill the store from the database with::
+
+    python -m app.barstore
+"""
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .bars import BAR_COLUMNS, Bars
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prices are stored as int64 fixed point with the same 4 decimals as Numeric(12, 4).
+PRICE_SCALE = 10_000
+PRICE_COLUMNS = ("open_price", "high_price", "low_price", "close_price")
+# Sentinel for NULL volume/amount values.
+NULL_INT = np.iinfo(np.int64).min
+
+DATE_FILE = "trade_date.i4"
+DATE_DTYPE = np.dtype("<i4")
+VALUE_DTYPE = np.dtype("<i8")
+
+
+class BarStore:
+    """
+    Memory-mapped per-symbol column files under ``root``. ``{frequency}/{symbol}`` is a
+    symlink to the current generation directory: appends extend its files in place,
+    rewrites of stored history publish a new generation and swap the link.
+    """
+
+    def __init__(self, root: str, max_maps: int = 4096):
+        self.root = root
+        # path -> (file size, memmap), least recently used first; reopened whenever a
+        # writer changes the size. Bounded so a whole market (7 files x 3 frequencies
+        # per symbol) stays well under the kernel's vm.max_map_count.
+        self._maps: "OrderedDict[str, Tuple[int, np.ndarray]]" = OrderedDict()
+        self.max_maps = max_maps
+
+    def _dir(self, symbol: str, frequency: str) -> str:
+        return os.path.join(self.root, frequency, symbol)
+
+    def _current(self, symbol: str, frequency: str) -> str:
+        """The generation directory the symbol currently resolves to; readers use it for every file."""
+        return os.path.realpath(self._dir(symbol, frequency))
+
+    def _map(self, path: str, dtype: np.dtype) -> np.ndarray:
+        """Returns a read-only memmap of ``path``, cached until the file size changes."""
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return np.empty(0, dtype=dtype)
+        cached = self._maps.get(path)
+        if cached is not None and cached[0] == size:
+            self._maps.move_to_end(path)
+            return cached[1]
+        count = size // dtype.itemsize
+        array = np.memmap(path, dtype=dtype, mode="r", shape=(count,)) if count else np.empty(0, dtype=dtype)
+        self._maps[path] = (size, array)
+        self._maps.move_to_end(path)
+        while len(self._maps) > self.max_maps:
+            # Dropping the last reference unmaps the file; slices a reader still
+            # holds keep their mapping alive until they are released.
+            self._maps.popitem(last=False)
+        return array
+
+    def exists(self, symbol: str, frequency: str) -> bool:
+        return os.path.exists(os.path.join(self._current(symbol, frequency), DATE_FILE))
+
+    # --- Reading ---
+
+    def read_columns(
+        self, symbol: str, frequency: str,
+        start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Returns zero-copy memmap slices of the raw columns within [start_date, end_date],
+        or None if the symbol is not in the store.
+        """
+        for _ in range(3):
+            # Resolved once per pass, so all columns come from the same generation.
+            directory = self._current(symbol, frequency)
+            if not os.path.exists(os.path.join(directory, DATE_FILE)):
+                return None
+            try:
+                return self._read_generation(directory, start_date, end_date)
+            except FileNotFoundError:
+                # A concurrent rebuild removed this generation; follow the link again.
+                continue
+        raise RuntimeError(f"Bar store files for {symbol} ({frequency}) kept changing while being read.")
+
+    def _read_generation(
+        self, directory: str, start_date: Optional[date], end_date: Optional[date]
+    ) -> Dict[str, np.ndarray]:
+        # The date column is written last, so its length bounds the complete rows.
+        dates = self._map(os.path.join(directory, DATE_FILE), DATE_DTYPE)
+        lo = 0 if start_date is None else int(np.searchsorted(dates, _day(start_date), "left"))
+        hi = len(dates) if end_date is None else int(np.searchsorted(dates, _day(end_date), "right"))
+        columns = {"trade_date": dates[lo:hi]}
+        for name in BAR_COLUMNS:
+            values = self._map(os.path.join(directory, f"{name}.i8"), VALUE_DTYPE)
+            if len(values) < len(dates):
+                raise FileNotFoundError(os.path.join(directory, f"{name}.i8"))
+            columns[name] = values[lo:hi]
+        return columns
+
+    def read(
+        self, symbol: str, frequency: str,
+        start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> Optional[Bars]:
+        """Reads a date range as float Bars; only the selected slice is converted."""
+        columns = self.read_columns(symbol, frequency, start_date, end_date)
+        if columns is None:
+            return None
+        values = {}
+        for name in BAR_COLUMNS:
+            raw = columns[name]
+            if name in PRICE_COLUMNS:
+                values[name] = raw / PRICE_SCALE
+            else:
+                values[name] = np.where(raw == NULL_INT, np.nan, raw.astype(np.float64))
+        return Bars(columns["trade_date"].astype("datetime64[D]"), values)
+
+    def last_date(self, symbol: str, frequency: str) -> Optional[date]:
+        dates = self._map(os.path.join(self._current(symbol, frequency), DATE_FILE), DATE_DTYPE)
+        return dates[-1].astype("datetime64[D]").item() if len(dates) else None
+
+    # --- Writing ---
+
+    def append(self, symbol: str, frequency: str, bars: Bars) -> int:
+        """
+        Writes bars sorted by date. Stored bars on the dates of the new bars are
+        replaced and all other stored bars are kept, so re-syncing the latest day, the
+        current rollup period or a historical range is safe.
+
+        New dates after the stored ones and an overwrite of the last stored day are
+        written in place; anything that moves stored rows rebuilds the files in a new
+        generation, so readers never pair a date with another day's values.
+
+        Returns:
+            The number of rows written.
+        """
+        if len(bars) == 0:
+            return 0
+        directory = self._current(symbol, frequency)
+        date_path = os.path.join(directory, DATE_FILE)
+        value_paths = {name: os.path.join(directory, f"{name}.i8") for name in BAR_COLUMNS}
+
+        new_days = bars.trade_date.astype("datetime64[D]").astype(DATE_DTYPE)
+        stored = self._map(date_path, DATE_DTYPE)
+        keep = int(np.searchsorted(stored, new_days[0], "left"))
+
+        encoded = {}
+        for name in BAR_COLUMNS:
+            values = np.asarray(bars[name], dtype=np.float64)
+            if name in PRICE_COLUMNS:
+                encoded[name] = np.rint(values * PRICE_SCALE).astype(VALUE_DTYPE)
+            else:
+                encoded[name] = np.where(np.isnan(values), NULL_INT, np.rint(np.nan_to_num(values))).astype(VALUE_DTYPE)
+
+        in_place = os.path.isdir(directory) and (
+            keep == len(stored) or (keep == len(stored) - 1 and stored[keep] == new_days[0])
+        )
+        if in_place:
+            # Values are written before dates so concurrent readers, which size the rows
+            # by the date file, never see a date without its values. The only stored row
+            # that can be rewritten is the last one, with the same date.
+            for name in BAR_COLUMNS:
+                _write_at(value_paths[name], keep * VALUE_DTYPE.itemsize, encoded[name].tobytes())
+            _write_at(date_path, keep * DATE_DTYPE.itemsize, new_days.tobytes())
+            return len(bars)
+
+        # Merge with all stored rows: the new bars win on equal dates, every other stored row is kept.
+        stored_days = np.array(stored)
+        kept = ~np.isin(stored_days, new_days)
+        days = np.concatenate([stored_days[kept], new_days])
+        order = np.argsort(days, kind="stable")
+        columns = {DATE_FILE: days[order]}
+        for name in BAR_COLUMNS:
+            old = self._map(value_paths[name], VALUE_DTYPE)[:len(stored)]
+            columns[f"{name}.i8"] = np.concatenate([np.asarray(old)[kept], encoded[name]])[order]
+        self._publish(symbol, frequency, columns)
+        return len(bars)
+
+    def _publish(self, symbol: str, frequency: str, columns: Dict[str, np.ndarray]):
+        """Writes ``columns`` (file name -> array) into a new generation and points the symbol's link at it."""
+        link = self._dir(symbol, frequency)
+        parent = os.path.dirname(link)
+        os.makedirs(parent, exist_ok=True)
+        generation = tempfile.mkdtemp(prefix=f".{symbol}.", dir=parent)
+        for file_name, array in columns.items():
+            with open(os.path.join(generation, file_name), "wb") as f:
+                f.write(array.tobytes())
+        previous = os.path.realpath(link) if os.path.lexists(link) else None
+        if previous is not None and not os.path.islink(link):
+            # A plain directory from before generations existed can't be swapped atomically;
+            # readers see no data for this symbol until the link is in place.
+            previous = generation + ".old"
+            os.rename(link, previous)
+        staged = generation + ".link"
+        os.symlink(os.path.basename(generation), staged)
+        os.replace(staged, link)
+
+        # The replaced generation stays for readers that resolved it just before the swap
+        # (files they already mapped stay valid regardless); older ones are removed.
+        for entry in os.listdir(parent):
+            path = os.path.join(parent, entry)
+            if entry.startswith(f".{symbol}.") and path not in (generation, previous) and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+        if previous is not None:
+            for path in [path for path in self._maps if path.startswith(previous + os.sep)]:
+                del self._maps[path]
+
+
+def _day(value: date) -> np.int32:
+    return np.datetime64(value, "D").astype(DATE_DTYPE)
+
+
+def _write_at(path: str, offset: int, data: bytes):
+    with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+        f.seek(offset)
+        f.write(data)
+
+
+_store: Optional[BarStore] = None
+
+
+def get_store() -> Optional[BarStore]:
+    """Returns the process-level store, or None when BAR_STORE_DIR is not configured."""
+    global _store
+    if not settings.BAR_STORE_DIR:
+        return None
+    if _store is None:
+        _store = BarStore(settings.BAR_STORE_DIR)
+    return _store
+
+
+async def backfill():
+    """Writes every stock's stored daily and rollup bars from the database into the store."""
+    from . import crud
+    from .bars import split_rows_by_stock
+    from .database import AsyncSessionLocal
+
+    store = get_store()
+    if store is None:
+        raise RuntimeError("BAR_STORE_DIR is not configured.")
+    async with AsyncSessionLocal() as db:
+        for stock_id, symbol in await crud.get_all_stock_symbols(db):
+            for frequency in ("d", "w", "m"):
+                rows = await crud.get_bars_batch(
+                    db, stock_ids=[stock_id], frequency=frequency,
+                    start_date=date(1900, 1, 1), end_date=date.max
+                )
+                bars = split_rows_by_stock(rows).get(stock_id)
+                if bars is not None:
+                    store.append(symbol, frequency, bars)
+            logger.info(f"Backfilled bar store for {symbol}.")
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
@@ -3,16 +3,85 @@
 
 该模块提供了一个与数据库交互的数据访问层。
 """
+import datetime
 from datetime import date
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
-from sqlalchemy import select
+from sqlalchemy import UniqueConstraint, and_, delete, func, literal_column, select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 
 from . import models, schemas
 
+# --- Dialect helpers ---
+
+def _conflict_columns(model) -> List[str]:
+    """
+    Columns of the natural key an upsert of ``model`` conflicts on: its unique
+    constraint or index, or the primary key of tables clustered on a natural key.
+    """
+    for constraint in model.__table__.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            return [c.name for c in constraint.columns]
+    for index in model.__table__.indexes:
+        if index.unique:
+            return [c.name for c in index.columns]
+    primary_key = [c.name for c in model.__table__.primary_key.columns]
+    if primary_key != ["id"]:
+        return primary_key
+    raise ValueError(f"{model.__tablename__} has no unique constraint to upsert on")
+
+def upsert_statement(db: AsyncSession, model, update_columns: Iterable[str]):
+    """
+    Builds an INSERT that updates ``update_columns`` of rows that already exist,
+    using the native upsert of the session's database:
+
+    - MySQL: ``ON DUPLICATE KEY UPDATE``
+    - SQLite, PostgreSQL, DuckDB: ``ON CONFLICT (natural key) DO UPDATE``
+
+    With no ``update_columns`` existing rows are left untouched.
+
+    Raises:
+        ValueError: The session's database is none of the above (a configuration error).
+    """
+    dialect = db.bind.dialect.name
+    update_columns = list(dict.fromkeys(update_columns))
+    if dialect == "mysql":
+        stmt = mysql.insert(model)
+        if not update_columns:
+            # A no-op update rather than INSERT IGNORE, which would also hide foreign key errors.
+            key = _conflict_columns(model)[0]
+            return stmt.on_duplicate_key_update({key: model.__table__.c[key]})
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in update_columns})
+    if dialect in ("sqlite", "postgresql", "duckdb"):
+        stmt = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(model)
+        if not update_columns:
+            return stmt.on_conflict_do_nothing(index_elements=_conflict_columns(model))
+        return stmt.on_conflict_do_update(
+            index_elements=_conflict_columns(model),
+            set_={c: stmt.excluded[c] for c in update_columns},
+        )
+    raise ValueError(f"Upserts are not supported on the {dialect} dialect; use MySQL, SQLite, PostgreSQL or DuckDB")
+
+def days_before(db: AsyncSession, column, days: int):
+    """
+    ``column`` (a DATE expression) minus ``days`` days, in the session database's
+    date arithmetic.
+
+    Raises:
+        ValueError: The session's database is not MySQL, SQLite, PostgreSQL or DuckDB.
+    """
+    dialect = db.bind.dialect.name
+    if dialect == "mysql":
+        return func.date_sub(column, literal_column(f"INTERVAL {int(days)} DAY"))
+    if dialect == "sqlite":
+        return func.date(column, f"-{int(days)} days")
+    if dialect in ("postgresql", "duckdb"):
+        # Inlined like the MySQL interval: an untyped parameter makes ``date - $1`` ambiguous.
+        return column - literal_column(str(int(days)))
+    raise ValueError(f"Date arithmetic is not supported on the {dialect} dialect; use MySQL, SQLite, PostgreSQL or DuckDB")
+
 # --- StockInfo CRUD ---
 
 async def get_stock_info_by_symbol(db: AsyncSession, symbol: str) -> Optional[models.StockInfo]:
@@ -31,6 +100,33 @@ async def get_or_create_stock_info(db: AsyncSession, symbol: str) -> models.Stoc
         await db.refresh(stock_info)
     return stock_info
 
+async def get_stock_infos_by_symbols(db: AsyncSession, symbols: List[str]) -> List[models.StockInfo]:
+    """Retrieves the stock_info records for several symbols with a single IN query."""
+    if not symbols:
+        return []
+    result = await db.execute(select(models.StockInfo).filter(models.StockInfo.symbol.in_(symbols)))
+    return result.scalars().all()
+
+async def get_all_stock_symbols(db: AsyncSession) -> List[tuple]:
+    """Retrieves ``(id, symbol)`` for every stock without loading full ORM objects."""
+    result = await db.execute(select(models.StockInfo.id, models.StockInfo.symbol))
+    return result.all()
+
+async def get_all_stock_names(db: AsyncSession) -> List[tuple]:
+    """Retrieves ``(id, symbol, company_name)`` for every stock."""
+    result = await db.execute(
+        select(models.StockInfo.id, models.StockInfo.symbol, models.StockInfo.company_name)
+    )
+    return result.all()
+
+async def upsert_stock_infos_bulk(db: AsyncSession, stock_info_list: List[dict]):
+    """Inserts or updates stock_info rows keyed by symbol; ids are assigned by this database."""
+    if not stock_info_list:
+        return
+    columns = [c for c in stock_info_list[0] if c not in ("id", "symbol")]
+    await db.execute(upsert_statement(db, models.StockInfo, columns), stock_info_list)
+    await db.commit()
+
 # --- StockDailyData CRUD ---
 
 async def get_latest_daily_data_date(db: AsyncSession, stock_id: int) -> Optional[date]:
@@ -46,29 +142,54 @@ async def get_latest_daily_data_date(db: AsyncSession, stock_id: int) -> Optiona
 async def upsert_daily_data_batch(db: AsyncSession, daily_data_list: List[dict]):
     """
     Batch inserts or updates stock_daily_data records.
-    Uses MySQL's ON DUPLICATE KEY UPDATE.
+    Uses the database's native upsert on the (stock_id, trade_date) primary key (see upsert_statement).
     """
     if not daily_data_list:
         return
 
-    stmt = insert(models.StockDailyData).values(daily_data_list)
-    
     # Define the columns to update on duplicate key
-    update_on_duplicate = {
-        'open_price': stmt.inserted.open_price,
-        'high_price': stmt.inserted.high_price,
-        'low_price': stmt.inserted.low_price,
-        'close_price': stmt.inserted.close_price,
-        'volume': stmt.inserted.volume,
-        'amount': stmt.inserted.amount,
-        'update_time': stmt.inserted.update_time,
-    }
-    
-    final_stmt = stmt.on_duplicate_key_update(**update_on_duplicate)
-    
-    await db.execute(final_stmt)
+    update_on_duplicate = [
+        'open_price', 'high_price', 'low_price', 'close_price', 'volume', 'amount', 'update_time',
+    ]
+    stmt = upsert_statement(db, models.StockDailyData, update_on_duplicate).values(daily_data_list)
+
+    await db.execute(stmt)
+    await db.commit()
+
+async def bulk_upsert_bars(db: AsyncSession, model, rows: List[dict], chunk_size: int = 5000):
+    """
+    Fast loader for large bar imports into ``model`` (StockDailyData or StockPeriodData).
+
+    Rows are sent as executemany batches of ``chunk_size`` (which the driver rewrites
+    into multi-row INSERTs) and committed once, instead of compiling one statement
+    with a bound parameter per value.
+    """
+    if not rows:
+        return
+    key_columns = _conflict_columns(model)
+    update_columns = [c for c in rows[0] if c not in key_columns] + ['update_time']
+    stmt = upsert_statement(db, model, update_columns)
+    for i in range(0, len(rows), chunk_size):
+        await db.execute(stmt, rows[i:i + chunk_size])
     await db.commit()
 
+async def stream_bars_with_symbol(db: AsyncSession, model, chunk_size: int = 50000):
+    """
+    Streams every row of a bar table joined with its symbol, ordered by stock and date,
+    as lists of at most ``chunk_size`` mappings. Uses a server-side cursor so memory
+    stays bounded by the chunk size.
+    """
+    columns = [c for c in model.__table__.columns if c.name not in ('id', 'stock_id', 'creation_time', 'update_time')]
+    stmt = (
+        select(models.StockInfo.symbol, *columns)
+        .join(models.StockInfo, models.StockInfo.id == model.stock_id)
+        .order_by(model.stock_id, model.trade_date)
+        .execution_options(yield_per=chunk_size)
+    )
+    result = await db.stream(stmt)
+    async for partition in result.mappings().partitions(chunk_size):
+        yield partition
+
 async def get_daily_data_history(
     db: AsyncSession, stock_id: int, start_date: date, end_date: date
 ) -> List[models.StockDailyData]:
@@ -84,6 +205,171 @@ async def get_daily_data_history(
     )
     return result.scalars().all()
 
+async def get_daily_bar_history(db: AsyncSession, stock_id: int) -> List[tuple]:
+    """
+    Retrieves the full daily history of a stock as raw
+    ``(trade_date, open, high, low, close, volume, amount)`` tuples.
+    """
+    table = models.StockDailyData
+    result = await db.execute(
+        select(
+            table.trade_date, table.open_price, table.high_price,
+            table.low_price, table.close_price, table.volume, table.amount,
+        )
+        .filter(table.stock_id == stock_id)
+        .order_by(table.trade_date.asc())
+    )
+    return result.all()
+
+async def get_daily_bars_batch(
+    db: AsyncSession, stock_ids: List[int], start_date: date, end_date: date
+) -> List[tuple]:
+    """
+    Retrieves raw daily bar columns for several stocks in one query.
+
+    Rows are ``(stock_id, trade_date, open, high, low, close, volume, amount)``
+    tuples ordered by stock_id and trade_date, ready for ``bars.split_rows_by_stock``.
+    """
+    if not stock_ids:
+        return []
+    table = models.StockDailyData
+    result = await db.execute(
+        select(
+            table.stock_id, table.trade_date, table.open_price, table.high_price,
+            table.low_price, table.close_price, table.volume, table.amount,
+        )
+        .filter(
+            table.stock_id.in_(stock_ids),
+            table.trade_date >= start_date,
+            table.trade_date <= end_date
+        )
+        .order_by(table.stock_id.asc(), table.trade_date.asc())
+    )
+    return result.all()
+
+async def get_recent_trade_dates(db: AsyncSession, limit: int) -> List[date]:
+    """Retrieves the most recent ``limit`` distinct trade dates across all stocks."""
+    result = await db.execute(
+        select(models.StockDailyData.trade_date)
+        .distinct()
+        .order_by(models.StockDailyData.trade_date.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+async def get_all_daily_bars_since(db: AsyncSession, start_date: date) -> List[tuple]:
+    """
+    Retrieves raw daily bar columns of every stock from ``start_date`` on, in one query.
+    Rows have the same layout as ``get_daily_bars_batch``.
+    """
+    table = models.StockDailyData
+    result = await db.execute(
+        select(
+            table.stock_id, table.trade_date, table.open_price, table.high_price,
+            table.low_price, table.close_price, table.volume, table.amount,
+        )
+        .filter(table.trade_date >= start_date)
+    )
+    return result.all()
+
+# --- StockPeriodData CRUD ---
+
+async def upsert_period_data_batch(db: AsyncSession, period_data_list: List[dict]):
+    """
+    Batch inserts or updates weekly/monthly rollup records.
+    Uses the database's native upsert on uq_stock_freq_period.
+    """
+    if not period_data_list:
+        return
+
+    update_on_duplicate = [
+        'trade_date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume', 'amount', 'update_time',
+    ]
+    stmt = upsert_statement(db, models.StockPeriodData, update_on_duplicate).values(period_data_list)
+    await db.execute(stmt)
+    await db.commit()
+
+async def get_period_bars_batch(
+    db: AsyncSession, stock_ids: List[int], frequency: str, start_date: date, end_date: date
+) -> List[tuple]:
+    """
+    Retrieves raw weekly/monthly bar columns for several stocks in one query.
+
+    Rows have the same layout as ``get_daily_bars_batch``; ``trade_date`` is the
+    last trading day of each period.
+    """
+    if not stock_ids:
+        return []
+    table = models.StockPeriodData
+    result = await db.execute(
+        select(
+            table.stock_id, table.trade_date, table.open_price, table.high_price,
+            table.low_price, table.close_price, table.volume, table.amount,
+        )
+        .filter(
+            table.stock_id.in_(stock_ids),
+            table.frequency == frequency,
+            table.trade_date >= start_date,
+            table.trade_date <= end_date
+        )
+        .order_by(table.stock_id.asc(), table.trade_date.asc())
+    )
+    return result.all()
+
+async def get_bars_batch(
+    db: AsyncSession, stock_ids: List[int], frequency: str, start_date: date, end_date: date
+) -> List[tuple]:
+    """Retrieves raw bar columns for several stocks from the daily or rollup table."""
+    if frequency == "d":
+        return await get_daily_bars_batch(db, stock_ids=stock_ids, start_date=start_date, end_date=end_date)
+    return await get_period_bars_batch(
+        db, stock_ids=stock_ids, frequency=frequency, start_date=start_date, end_date=end_date
+    )
+
+async def get_bars_before(
+    db: AsyncSession, stock_id: int, frequency: str, before: date, limit: int
+) -> List[tuple]:
+    """
+    Retrieves up to ``limit`` bars strictly before ``before``, in ascending date order.
+    Used to warm up indicators ahead of a requested range.
+    """
+    table = models.StockDailyData if frequency == "d" else models.StockPeriodData
+    stmt = (
+        select(
+            table.stock_id, table.trade_date, table.open_price, table.high_price,
+            table.low_price, table.close_price, table.volume, table.amount,
+        )
+        .filter(table.stock_id == stock_id, table.trade_date < before)
+        .order_by(table.trade_date.desc())
+        .limit(limit)
+    )
+    if frequency != "d":
+        stmt = stmt.filter(table.frequency == frequency)
+    result = await db.execute(stmt)
+    return list(reversed(result.all()))
+
+# --- StockIndicatorState CRUD ---
+
+async def get_indicator_state(
+    db: AsyncSession, stock_id: int, frequency: str
+) -> Optional[models.StockIndicatorState]:
+    """Retrieves the saved indicator state of a stock."""
+    result = await db.execute(
+        select(models.StockIndicatorState)
+        .filter(
+            models.StockIndicatorState.stock_id == stock_id,
+            models.StockIndicatorState.frequency == frequency
+        )
+    )
+    return result.scalars().first()
+
+async def upsert_indicator_state(db: AsyncSession, values: dict):
+    """Inserts or replaces the saved indicator state of a stock."""
+    update_on_duplicate = ['spec', 'last_date', 'state', 'latest', 'update_time']
+    stmt = upsert_statement(db, models.StockIndicatorState, update_on_duplicate).values(values)
+    await db.execute(stmt)
+    await db.commit()
+
 # --- UserWatchlist CRUD ---
 
 async def add_stock_to_watchlist(db: AsyncSession, user_id: int, stock_id: int) -> models.UserWatchlist:
@@ -107,6 +393,58 @@ async def remove_stock_from_watchlist(db: AsyncSession, user_id: int, stock_id:
         return True
     return False
 
+async def resolve_watchlist_symbols(db: AsyncSession, user_id: int, symbols: List[str]) -> List[tuple]:
+    """
+    Resolves symbols to stock ids and the user's existing watchlist entries in one query.
+
+    Returns ``(symbol, stock_id, watchlist_id)`` rows for every known symbol;
+    ``watchlist_id`` is None when the stock is not yet on the user's watchlist.
+    """
+    if not symbols:
+        return []
+    watchlist = models.UserWatchlist
+    result = await db.execute(
+        select(models.StockInfo.symbol, models.StockInfo.id, watchlist.id)
+        .outerjoin(watchlist, and_(watchlist.stock_id == models.StockInfo.id, watchlist.user_id == user_id))
+        .filter(models.StockInfo.symbol.in_(symbols))
+    )
+    return result.all()
+
+async def add_stocks_to_watchlist_bulk(db: AsyncSession, user_id: int, stock_ids: List[int]):
+    """
+    Adds several stocks to a user's watchlist with a single INSERT statement.
+    Rows that already exist are left untouched via the uq_user_stock constraint.
+    """
+    if not stock_ids:
+        return
+    now = datetime.datetime.utcnow()
+    # Duplicates keep their original added_at.
+    stmt = upsert_statement(db, models.UserWatchlist, []).values(
+        [{"user_id": user_id, "stock_id": stock_id, "added_at": now} for stock_id in stock_ids]
+    )
+    await db.execute(stmt)
+    await db.commit()
+
+async def remove_stocks_from_watchlist_bulk(db: AsyncSession, user_id: int, stock_ids: List[int]) -> int:
+    """Removes several stocks from a user's watchlist with a single DELETE ... IN statement."""
+    if not stock_ids:
+        return 0
+    result = await db.execute(
+        delete(models.UserWatchlist)
+        .where(models.UserWatchlist.user_id == user_id, models.UserWatchlist.stock_id.in_(stock_ids))
+    )
+    await db.commit()
+    return result.rowcount
+
+async def get_watchlisted_symbols(db: AsyncSession) -> List[str]:
+    """Retrieves the distinct symbols that appear on any user's watchlist."""
+    result = await db.execute(
+        select(models.StockInfo.symbol)
+        .join(models.UserWatchlist, models.UserWatchlist.stock_id == models.StockInfo.id)
+        .distinct()
+    )
+    return result.scalars().all()
+
 async def get_user_watchlist(db: AsyncSession, user_id: int) -> List[models.UserWatchlist]:
     """Retrieves a user's entire watchlist."""
     result = await db.execute(
@@ -115,3 +453,52 @@ async def get_user_watchlist(db: AsyncSession, user_id: int) -> List[models.User
         .options(selectinload(models.UserWatchlist.stock_info)) # Eager load stock_info
     )
     return result.scalars().all()
+
+async def get_watchlist_dashboard(
+    db: AsyncSession, user_id: int, days: int, lookback: datetime.timedelta
+) -> List[tuple]:
+    """
+    Retrieves every watchlist entry of a user together with its last ``days`` bars.
+
+    A grouped subquery finds the latest bar date of each watched stock; each stock's
+    bars within ``lookback`` of its own latest bar are ranked (newest first) with
+    ROW_NUMBER() and the top ``days`` joined back onto the watchlist, all in one
+    statement, so stocks whose data ends long ago still get their bars.
+    Rows are ``(added_at, StockInfo, rn, trade_date, open, high, low, close, volume, amount)``
+    ordered by watchlist entry and then newest bar first; entries without bars
+    yield a single row whose bar columns are None.
+    """
+    daily = models.StockDailyData
+    watchlist = models.UserWatchlist
+    latest = (
+        select(daily.stock_id, func.max(daily.trade_date).label("latest_date"))
+        .join(watchlist, and_(watchlist.stock_id == daily.stock_id, watchlist.user_id == user_id))
+        .group_by(daily.stock_id)
+        .subquery()
+    )
+    ranked = (
+        select(
+            daily.stock_id, daily.trade_date, daily.open_price, daily.high_price,
+            daily.low_price, daily.close_price, daily.volume, daily.amount,
+            func.row_number().over(
+                partition_by=daily.stock_id, order_by=daily.trade_date.desc()
+            ).label("rn"),
+        )
+        .join(latest, and_(
+            latest.c.stock_id == daily.stock_id,
+            daily.trade_date >= days_before(db, latest.c.latest_date, lookback.days),
+        ))
+        .subquery()
+    )
+    result = await db.execute(
+        select(
+            watchlist.added_at, models.StockInfo, ranked.c.rn, ranked.c.trade_date,
+            ranked.c.open_price, ranked.c.high_price, ranked.c.low_price,
+            ranked.c.close_price, ranked.c.volume, ranked.c.amount,
+        )
+        .join(models.StockInfo, models.StockInfo.id == watchlist.stock_id)
+        .outerjoin(ranked, and_(ranked.c.stock_id == watchlist.stock_id, ranked.c.rn <= days))
+        .filter(watchlist.user_id == user_id)
+        .order_by(watchlist.added_at.asc(), watchlist.id.asc(), ranked.c.rn.asc())
+    )
+    return result.all()
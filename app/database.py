@@ -1,37 +1,93 @@
 """
 Database initialization and session management.
 
-Sets up the asynchronous SQLAlchemy engine and session factory.
+Sets up the asynchronous SQLAlchemy engines and session factories.
+
+读写分离：写连接池（同步任务的批量 upsert）与读连接池（路由的交互式查询）相互独立，
+批量导入不会占满接口所需的连接。读连接池可指向一个或多个只读副本（DATABASE_READ_URLS），
+未配置时对主库单独建立一个读连接池。
 """
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import itertools
+from typing import AsyncGenerator, List
+
+from fastapi import Request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from .config import settings
+from .db_metrics import instrument_engine
+
+# Request methods served from the reader pool.
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def _create_engine(url: str, pool_size: int, max_overflow: int) -> AsyncEngine:
+    """Creates an engine with its own connection pool configured from settings."""
+    kwargs = {
+        # DB_ECHO=true logs every SQL statement; useful for debugging only.
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        kwargs.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=settings.DB_POOL_TIMEOUT)
+    return create_async_engine(url, **kwargs)
+
+
+def _session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=engine,
+        class_=AsyncSession,
+        expire_on_commit=False, # Prevents SQLAlchemy from expiring objects after commit
+    )
+
+
+# Writer: sync tasks, imports and write endpoints.
+async_engine = _create_engine(settings.DATABASE_URL, settings.DB_WRITER_POOL_SIZE, settings.DB_WRITER_MAX_OVERFLOW)
+AsyncSessionLocal = _session_factory(async_engine)
 
-# Create an asynchronous engine for the given database URL.
-# echo=True will log all SQL statements, useful for debugging.
-async_engine = create_async_engine(settings.DATABASE_URL, echo=True)
+# Readers: one engine per replica, or a separate pool on the primary.
+_read_urls = [url.strip() for url in settings.DATABASE_READ_URLS.split(",") if url.strip()] or [settings.DATABASE_URL]
+reader_engines: List[AsyncEngine] = [
+    _create_engine(url, settings.DB_READER_POOL_SIZE, settings.DB_READER_MAX_OVERFLOW) for url in _read_urls
+]
+if settings.DB_INSTRUMENTATION:
+    instrument_engine(async_engine, "writer")
+    for i, engine in enumerate(reader_engines):
+        instrument_engine(engine, f"reader{i}")
+
+_reader_factories = itertools.cycle([_session_factory(engine) for engine in reader_engines])
+
+
+def ReadSessionLocal() -> AsyncSession:
+    """
+    Creates a session on the next reader (round robin). Replicas may lag the
+    primary slightly; use AsyncSessionLocal where a read must see a just-committed write.
+    """
+    return next(_reader_factories)()
 
-# Create a configured "AsyncSession" class.
-# This is a factory for creating new AsyncSession objects.
-AsyncSessionLocal = async_sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=async_engine,
-    class_=AsyncSession,
-    expire_on_commit=False, # Prevents SQLAlchemy from expiring objects after commit
-)
 
 # Base class for our ORM models.
 # All model classes will inherit from this class.
 Base = declarative_base()
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """
     FastAPI dependency to get a database session.
 
+    Read-only requests (GET/HEAD/OPTIONS) get a session from the reader pool,
+    everything else from the writer.
+
     Yields:
         An asynchronous database session.
     """
-    async with AsyncSessionLocal() as session:
+    factory = ReadSessionLocal if request.method in READ_METHODS else AsyncSessionLocal
+    async with factory() as session:
+        yield session
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency for read-only endpoints that are not GET requests."""
+    async with ReadSessionLocal() as session:
         yield session
@@ -0,0 +1,154 @@
+"""
+SQL instrumentation built on SQLAlchemy engine and pool events.
+
+SQL埋点：按归一化语句与调用方（crud 函数）统计耗时直方图，抽样记录慢查询，
+并导出连接池的借出等待时间与饱和度。所有指标经 /metrics 导出。
+"""
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .config import settings
+from .metrics import Counter, Gauge, Histogram
+
+try:
+    import greenlet
+except ImportError:  # pragma: no cover - SQLAlchemy's asyncio support requires greenlet
+    greenlet = None
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds", "SQL statement execution time by normalized statement.",
+    ("engine", "statement"),
+)
+CALLER_DURATION = Histogram(
+    "db_caller_duration_seconds", "SQL execution time by the app function that issued it.",
+    ("engine", "caller"),
+)
+STATEMENT_ERRORS = Counter("db_statement_errors_total", "SQL statements that raised.", ("engine", "caller"))
+SLOW_QUERIES = Counter("db_slow_queries_total", "Statements slower than DB_SLOW_QUERY_SECONDS.", ("engine", "caller"))
+POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out.", ("engine",))
+POOL_CAPACITY = Gauge("db_pool_capacity", "Pool size plus max overflow.", ("engine",))
+POOL_SATURATION = Gauge("db_pool_saturation", "Checked-out connections / capacity.", ("engine",))
+
+_slow_log: deque = deque(maxlen=settings.DB_SLOW_QUERY_LOG_SIZE)
+_slow_lock = threading.Lock()
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM_LISTS = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str, limit: int = 200) -> str:
+    """Collapses literals, IN/VALUES parameter lists and whitespace so equivalent statements share a key."""
+    statement = _SPACES.sub(" ", statement).strip()
+    statement = _LITERALS.sub("?", statement)
+    statement = _PARAM_LISTS.sub("(...)", statement)
+    return statement[:limit]
+
+
+def _caller() -> str:
+    """
+    Name of the innermost app function (outside this module) that issued the statement.
+    Under the asyncio extension the statement runs in a greenlet; the awaiting
+    coroutines are on the parent greenlet's stack.
+    """
+    frame = None
+    if greenlet is not None:
+        parent = greenlet.getcurrent().parent
+        if parent is not None:
+            frame = parent.gr_frame
+    if frame is None:
+        frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.") and module != __name__:
+            return f"{module[4:]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def slow_queries() -> List[dict]:
+    """Most recent sampled slow statements, newest first."""
+    with _slow_lock:
+        return list(reversed(_slow_log))
+
+
+def _record_slow(name: str, caller: str, statement: str, parameters, elapsed: float):
+    SLOW_QUERIES.inc(engine=name, caller=caller)
+    if random.random() >= settings.DB_SLOW_QUERY_SAMPLE_RATE:
+        return
+    entry = {
+        "at": time.time(),
+        "engine": name,
+        "caller": caller,
+        "seconds": round(elapsed, 6),
+        "statement": _SPACES.sub(" ", statement)[:2000],
+        "parameters": repr(parameters)[:500],
+    }
+    with _slow_lock:
+        _slow_log.append(entry)
+    logger.warning(f"Slow query ({elapsed:.3f}s) from {caller}: {entry['statement'][:300]}")
+
+
+def _instrument_pool(name: str, pool):
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0) if hasattr(pool, "size") else None
+    if capacity:
+        POOL_CAPACITY.set(capacity, engine=name)
+        POOL_CHECKED_OUT.set_function(pool.checkedout, engine=name)
+        POOL_SATURATION.set_function(lambda: pool.checkedout() / capacity, engine=name)
+
+    # There is no pool event before a checkout starts waiting, so time the
+    # pool's acquire step directly.
+    do_get = getattr(pool, "_do_get", None)
+    if do_get is None:
+        return
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started, engine=name)
+
+    pool._do_get = timed_do_get
+
+
+def instrument_engine(engine: AsyncEngine, name: str):
+    """Attaches statement timing, slow-query sampling and pool metrics to ``engine``."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        caller = _caller()
+        STATEMENT_DURATION.observe(elapsed, engine=name, statement=normalize_statement(statement))
+        CALLER_DURATION.observe(elapsed, engine=name, caller=caller)
+        if elapsed >= settings.DB_SLOW_QUERY_SECONDS:
+            _record_slow(name, caller, statement, parameters, elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+        STATEMENT_ERRORS.inc(engine=name, caller=_caller())
+
+    _instrument_pool(name, sync_engine.pool)
@@ -0,0 +1,34 @@
+"""
+Cached full-history loaders shared by the routers and the startup warm-up.
+"""
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import bar_cache, bars, crud, symbols
+from .config import settings
+
+
+async def get_daily_history(db: AsyncSession, symbol: str) -> Optional[bar_cache.CacheEntry]:
+    """
+    Returns the full daily history of a symbol from the hot-set cache, loading it
+    from the database on a miss. Returns None if the symbol is unknown.
+    """
+    cache = bar_cache.get_cache()
+    key = (symbol, "d", "2")
+    entry = cache.lookup(key)
+    if entry is not None:
+        return entry
+
+    index = await symbols.get_index(db)
+    stock_id = index.resolve(symbol)
+    if stock_id is None:
+        # The index may predate the stock; fall back to the table.
+        stock_info = await crud.get_stock_info_by_symbol(db, symbol=symbol)
+        if stock_info is None:
+            return None
+        stock_id = stock_info.id
+
+    rows = await crud.get_daily_bar_history(db, stock_id=stock_id)
+    history = bars.bars_from_rows(rows)
+    return cache.put(key, history, ttl=settings.BAR_CACHE_TTL_SECONDS, meta={"stock_id": stock_id})
@@ -0,0 +1,395 @@
+"""
+Vectorized technical indicators over column arrays.
+
+指标引擎：MA/EMA、MACD、RSI、BOLL、KDJ、ATR、OBV。
+每个指标既可以对完整历史做向量化计算，也可以携带可序列化的状态，
+在追加新K线时只处理新增部分（O(新增K线)）。
+"""
+import datetime
+import math
+import re
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud
+from .bars import Bars, split_rows_by_stock
+
+Outputs = Dict[str, np.ndarray]
+State = Dict[str, object]
+
+
+# --- Array helpers ---
+
+def _ema(x: np.ndarray, alpha: float, prev: Optional[float] = None) -> np.ndarray:
+    """
+    Exponential moving average ``y[t] = alpha * x[t] + (1 - alpha) * y[t-1]``.
+
+    The recursion is seeded with ``prev`` when continuing from saved state, otherwise
+    with the first input. The recurrence is evaluated in blocks with closed-form
+    weights so long histories stay vectorized without underflow.
+    """
+    out = np.empty(len(x), dtype=np.float64)
+    if len(x) == 0:
+        return out
+    decay = 1.0 - alpha
+    # Block length keeps decay**-block well inside float64 range.
+    block = max(1, min(256, int(200 / max(-np.log(decay), 1e-12)))) if decay > 0 else 1
+    y = x[0] if prev is None else prev
+    start = 0
+    if prev is None:
+        out[0] = y
+        start = 1
+    for lo in range(start, len(x), block):
+        chunk = x[lo:lo + block]
+        k = np.arange(1, len(chunk) + 1)
+        powers = decay ** k
+        # y[lo+i] = decay**(i+1) * y_prev + alpha * sum_j decay**(i-j) * x[lo+j]
+        weighted = np.cumsum(chunk / powers) * alpha * powers
+        out[lo:lo + len(chunk)] = powers * y + weighted
+        y = out[lo + len(chunk) - 1]
+    return out
+
+
+def _rolling(x: np.ndarray, tail: np.ndarray, n: int, func) -> np.ndarray:
+    """
+    Applies ``func`` over trailing windows of length ``n`` of ``concat(tail, x)``.
+    Positions without a full window are NaN.
+    """
+    ext = np.concatenate((tail, x))
+    out = np.full(len(x), np.nan)
+    if len(ext) >= n:
+        values = func(sliding_window_view(ext, n), axis=1)
+        # values[i] covers ext[i:i+n]; x[j] ends the window starting at len(tail)+j-n+1.
+        first = max(0, n - 1 - len(tail))
+        out[first:] = values[len(tail) + first - n + 1:]
+    return out
+
+
+def _expanding_rolling(x: np.ndarray, tail: np.ndarray, n: int, func) -> np.ndarray:
+    """Like ``_rolling`` but uses the available prefix while fewer than ``n`` values exist."""
+    ext = np.concatenate((tail, x))
+    out = _rolling(x, tail, n, func)
+    for j in range(min(len(x), max(0, n - 1 - len(tail)))):
+        out[j] = func(ext[:len(tail) + j + 1])
+    return out
+
+
+def _tail(x: np.ndarray, tail: list, n: int) -> list:
+    """Keeps the last ``n`` values of ``concat(tail, x)`` for the next update."""
+    if n <= 0:
+        return []
+    return np.concatenate((np.asarray(tail, dtype=np.float64), x))[-n:].tolist()
+
+
+def _prev_shift(x: np.ndarray, prev: Optional[float]) -> np.ndarray:
+    """x shifted by one bar, with the saved previous value (or NaN) in front."""
+    return np.concatenate(([np.nan if prev is None else prev], x[:-1]))
+
+
+# --- Indicators ---
+
+class Indicator:
+    """
+    Base class for an indicator parsed from a spec token such as ``ma20``.
+
+    ``run`` computes the outputs for ``bars`` continuing from ``state`` (None for a
+    fresh computation) and returns the outputs together with the new state.
+    """
+    name: str = ""
+    default_params: Tuple[int, ...] = ()
+
+    def __init__(self, token: str, params: Tuple[int, ...]):
+        self.token = token
+        self.params = params or self.default_params
+
+    @property
+    def lookback(self) -> int:
+        """Bars needed before a range for the outputs to be warmed up."""
+        return max(self.params) if self.params else 1
+
+    def run(self, bars: Bars, state: Optional[State]) -> Tuple[Outputs, State]:
+        raise NotImplementedError
+
+
+class MA(Indicator):
+    name = "ma"
+    default_params = (5,)
+
+    def run(self, bars, state):
+        (n,) = self.params
+        close = bars["close_price"]
+        tail = np.asarray((state or {}).get("tail", []), dtype=np.float64)
+        values = _rolling(close, tail, n, np.mean)
+        return {self.token: values}, {"tail": _tail(close, tail.tolist(), n - 1)}
+
+
+class EMA(Indicator):
+    name = "ema"
+    default_params = (12,)
+
+    @property
+    def lookback(self):
+        return self.params[0] * 10
+
+    def run(self, bars, state):
+        (n,) = self.params
+        values = _ema(bars["close_price"], 2.0 / (n + 1), (state or {}).get("ema"))
+        new_state = dict(state or {})
+        if len(values):
+            new_state["ema"] = float(values[-1])
+        return {self.token: values}, new_state
+
+
+class MACD(Indicator):
+    name = "macd"
+    default_params = (12, 26, 9)
+
+    @property
+    def lookback(self):
+        return max(self.params) * 10
+
+    def run(self, bars, state):
+        fast, slow, signal = self.params
+        state = state or {}
+        close = bars["close_price"]
+        ema_fast = _ema(close, 2.0 / (fast + 1), state.get("fast"))
+        ema_slow = _ema(close, 2.0 / (slow + 1), state.get("slow"))
+        dif = ema_fast - ema_slow
+        dea = _ema(dif, 2.0 / (signal + 1), state.get("dea"))
+        outputs = {
+            f"{self.token}_dif": dif,
+            f"{self.token}_dea": dea,
+            f"{self.token}_hist": 2 * (dif - dea),
+        }
+        if not len(close):
+            return outputs, state
+        return outputs, {"fast": float(ema_fast[-1]), "slow": float(ema_slow[-1]), "dea": float(dea[-1])}
+
+
+class RSI(Indicator):
+    name = "rsi"
+    default_params = (14,)
+
+    @property
+    def lookback(self):
+        return self.params[0] * 10
+
+    def run(self, bars, state):
+        (n,) = self.params
+        state = state or {}
+        close = bars["close_price"]
+        change = close - _prev_shift(close, state.get("prev_close"))
+        # The very first bar has no previous close; start the averages on the second.
+        skip = 1 if state.get("prev_close") is None else 0
+        gain = np.maximum(change[skip:], 0.0)
+        move = np.abs(change[skip:])
+        avg_gain = _ema(gain, 1.0 / n, state.get("avg_gain"))
+        avg_move = _ema(move, 1.0 / n, state.get("avg_move"))
+        values = np.full(len(close), np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values[skip:] = np.where(avg_move > 0, avg_gain / avg_move * 100, 50.0)
+        if not len(close):
+            return {self.token: values}, state
+        new_state = {"prev_close": float(close[-1])}
+        if len(avg_gain):
+            new_state.update(avg_gain=float(avg_gain[-1]), avg_move=float(avg_move[-1]))
+        return {self.token: values}, new_state
+
+
+class BOLL(Indicator):
+    name = "boll"
+    default_params = (20, 2)
+
+    @property
+    def lookback(self):
+        return self.params[0]
+
+    def run(self, bars, state):
+        n, width = self.params
+        close = bars["close_price"]
+        tail = np.asarray((state or {}).get("tail", []), dtype=np.float64)
+        mid = _rolling(close, tail, n, np.mean)
+        std = _rolling(close, tail, n, np.std)
+        outputs = {
+            f"{self.token}_mid": mid,
+            f"{self.token}_upper": mid + width * std,
+            f"{self.token}_lower": mid - width * std,
+        }
+        return outputs, {"tail": _tail(close, tail.tolist(), n - 1)}
+
+
+class KDJ(Indicator):
+    name = "kdj"
+    default_params = (9, 3, 3)
+
+    @property
+    def lookback(self):
+        return self.params[0] + max(self.params[1:]) * 10
+
+    def run(self, bars, state):
+        n, k_period, d_period = self.params
+        state = state or {}
+        high, low, close = bars["high_price"], bars["low_price"], bars["close_price"]
+        high_tail = np.asarray(state.get("high_tail", []), dtype=np.float64)
+        low_tail = np.asarray(state.get("low_tail", []), dtype=np.float64)
+        hhv = _expanding_rolling(high, high_tail, n, np.max)
+        llv = _expanding_rolling(low, low_tail, n, np.min)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rsv = np.where(hhv > llv, (close - llv) / (hhv - llv) * 100, 50.0)
+        k = _ema(rsv, 1.0 / k_period, state.get("k", 50.0))
+        d = _ema(k, 1.0 / d_period, state.get("d", 50.0))
+        outputs = {f"{self.token}_k": k, f"{self.token}_d": d, f"{self.token}_j": 3 * k - 2 * d}
+        new_state = {
+            "high_tail": _tail(high, high_tail.tolist(), n - 1),
+            "low_tail": _tail(low, low_tail.tolist(), n - 1),
+            "k": float(k[-1]) if len(k) else state.get("k", 50.0),
+            "d": float(d[-1]) if len(d) else state.get("d", 50.0),
+        }
+        return outputs, new_state
+
+
+class ATR(Indicator):
+    name = "atr"
+    default_params = (14,)
+
+    @property
+    def lookback(self):
+        return self.params[0] * 10
+
+    def run(self, bars, state):
+        (n,) = self.params
+        state = state or {}
+        high, low, close = bars["high_price"], bars["low_price"], bars["close_price"]
+        prev_close = _prev_shift(close, state.get("prev_close"))
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        values = _ema(true_range, 1.0 / n, state.get("atr"))
+        if not len(close):
+            return {self.token: values}, state
+        return {self.token: values}, {"prev_close": float(close[-1]), "atr": float(values[-1])}
+
+
+class OBV(Indicator):
+    name = "obv"
+
+    @property
+    def lookback(self):
+        return 1
+
+    def run(self, bars, state):
+        state = state or {}
+        close, volume = bars["close_price"], np.nan_to_num(bars["volume"])
+        prev_close = _prev_shift(close, state.get("prev_close"))
+        signed = np.where(close > prev_close, volume, np.where(close < prev_close, -volume, 0.0))
+        values = state.get("obv", 0.0) + np.cumsum(signed)
+        if not len(close):
+            return {self.token: values}, state
+        return {self.token: values}, {"prev_close": float(close[-1]), "obv": float(values[-1])}
+
+
+INDICATORS = {cls.name: cls for cls in (MA, EMA, MACD, RSI, BOLL, KDJ, ATR, OBV)}
+
+_TOKEN_RE = re.compile(r"^([a-z]+)(\d+(?:_\d+)*)?$")
+
+
+def parse_spec(spec: str) -> List[Indicator]:
+    """
+    Parses an indicator spec such as ``"ma5,ma20,macd,rsi14,boll,kdj9_3_3"``.
+
+    A token is an indicator name optionally followed by its parameters joined with
+    underscores; omitted parameters fall back to the indicator's defaults.
+
+    Raises:
+        ValueError: If a token names an unknown indicator or is malformed.
+    """
+    indicators = []
+    for token in dict.fromkeys(t.strip().lower() for t in spec.split(",") if t.strip()):
+        match = _TOKEN_RE.match(token)
+        if not match or match.group(1) not in INDICATORS:
+            raise ValueError(f"Unknown indicator: {token}")
+        cls = INDICATORS[match.group(1)]
+        params = tuple(int(p) for p in match.group(2).split("_")) if match.group(2) else ()
+        if params and len(params) != len(cls.default_params):
+            raise ValueError(f"Indicator {cls.name} takes {len(cls.default_params)} parameter(s): {token}")
+        if any(p <= 0 for p in params):
+            raise ValueError(f"Indicator parameters must be positive: {token}")
+        indicators.append(cls(token, params))
+    return indicators
+
+
+def lookback(indicators: List[Indicator]) -> int:
+    """Bars of history to load before a requested range so every indicator is warmed up."""
+    return max((ind.lookback for ind in indicators), default=0)
+
+
+def compute(
+    bars: Bars, indicators: List[Indicator], state: Optional[State] = None
+) -> Tuple[Outputs, State]:
+    """
+    Computes indicators over ``bars``, optionally continuing from a saved state.
+
+    When ``state`` is given, bars on or before its ``last_date`` are skipped so the
+    cost is proportional to the number of new bars. The returned outputs cover
+    only the processed bars and the returned state can be fed to the next call.
+    """
+    state = dict(state or {})
+    last_date = state.get("last_date")
+    if last_date is not None:
+        bars = bars.slice(start_date=date.fromisoformat(last_date) + timedelta(days=1))
+
+    outputs: Outputs = {}
+    for ind in indicators:
+        values, state[ind.token] = ind.run(bars, state.get(ind.token))
+        outputs.update(values)
+    if len(bars):
+        state["last_date"] = bars.trade_date[-1].item().isoformat()
+    return outputs, state
+
+
+def _json_safe(value):
+    """Replaces NaN/inf with None so state can be stored in a JSON column."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+async def refresh_indicator_state(db: AsyncSession, stock_id: int, spec: str, frequency: str = "d"):
+    """
+    Brings the saved indicator state of a stock up to date with its stored bars.
+
+    Only bars after the saved ``last_date`` are read and processed. The full history
+    is replayed when there is no saved state or the indicator spec has changed.
+    """
+    indicators = parse_spec(spec)
+    saved = await crud.get_indicator_state(db, stock_id=stock_id, frequency=frequency)
+    if saved is not None and saved.spec == spec:
+        state = saved.state
+        start_date = saved.last_date + timedelta(days=1)
+    else:
+        state = None
+        start_date = date(1900, 1, 1)
+
+    rows = await crud.get_bars_batch(
+        db, stock_ids=[stock_id], frequency=frequency, start_date=start_date, end_date=date.max
+    )
+    bars = split_rows_by_stock(rows).get(stock_id)
+    if bars is None:
+        return
+
+    outputs, state = compute(bars, indicators, state)
+    await crud.upsert_indicator_state(db, {
+        'stock_id': stock_id,
+        'frequency': frequency,
+        'spec': spec,
+        'last_date': bars.trade_date[-1].item(),
+        'state': _json_safe(state),
+        'latest': _json_safe({name: float(values[-1]) for name, values in outputs.items()}),
+        'update_time': datetime.datetime.utcnow(),
+    })
@@ -0,0 +1,67 @@
+"""
+Deferred imports of heavy modules.
+
+延迟导入：``pd = lazy_import("pandas")`` 立即返回一个占位模块，真正的导入推迟到第一次
+访问其属性时才执行；导入完成后占位模块拥有真实模块的全部属性，之后的访问没有额外开销。
+冷启动与 ``--reload`` 不再为 pandas / numpy / baostock 付出数百毫秒；
+每个模块实际加载的耗时记入指标 ``deferred_import_seconds`` 并写日志。
+
+The first use is serialized by a lock, so concurrent first uses from worker threads
+(``asyncio.to_thread``) are safe. Use ``python -m benchmarks.import_time app2`` to
+see what a module still imports eagerly.
+"""
+import importlib
+import logging
+import sys
+import threading
+import time
+import types
+
+from .metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+DEFERRED_IMPORT_SECONDS = Gauge(
+    "deferred_import_seconds", "Time the first use of a lazily imported module spent importing it.", ("module",),
+)
+
+# Reentrant: importing one deferred module can touch another (pandas -> numpy).
+_lock = threading.RLock()
+
+
+class _DeferredModule(types.ModuleType):
+    """Placeholder in sys.modules; only attributes it doesn't have yet reach ``__getattr__``."""
+
+    def __getattr__(self, attr):
+        return getattr(_load(self), attr)
+
+
+def _load(placeholder: _DeferredModule) -> types.ModuleType:
+    name = placeholder.__name__
+    with _lock:
+        real = placeholder.__dict__.get("_deferred_module")
+        if real is not None:
+            return real
+        if sys.modules.get(name) is placeholder:
+            del sys.modules[name]
+        started = time.perf_counter()
+        try:
+            real = importlib.import_module(name)
+        except BaseException:
+            sys.modules.setdefault(name, placeholder)
+            raise
+        elapsed = time.perf_counter() - started
+        placeholder.__dict__.update(real.__dict__)
+        placeholder.__dict__["_deferred_module"] = real
+    DEFERRED_IMPORT_SECONDS.set(elapsed, module=name)
+    logger.info(f"Deferred import of {name} took {elapsed * 1000:.0f} ms")
+    return real
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Returns module ``name``, importing it on first attribute access (a plain import if already loaded)."""
+    with _lock:
+        module = sys.modules.get(name)
+        if module is None:
+            module = sys.modules[name] = _DeferredModule(name)
+        return module
@@ -0,0 +1,224 @@
+"""
+Event-loop lag monitor and blocked-callback sampler.
+
+事件循环监控：协程按固定间隔唤醒，实际唤醒时间与计划之差即为循环延迟（直方图）；
+一个看门狗线程在心跳停止超过阈值时，抓取事件循环线程当前的调用栈——也就是正在阻塞循环的代码。
+每次阻塞结束后按阻塞位置（最内层的项目代码函数）计数并记录耗时，
+最近的阻塞及其最常见的调用栈可通过 /metrics/loop_stalls 查看。
+
+Sampling only reads the loop thread's frame from another thread, so the overhead
+is one wake-up per interval on each side and the monitor is safe to leave on in
+production. LOOP_MONITOR_DEBUG additionally enables asyncio debug mode, whose
+"Executing <Handle ...> took N seconds" warnings name the slow callback itself;
+debug mode slows every callback down and is meant for development only.
+This module only depends on the standard library so that ``app2`` can use it too.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import List, Optional, Tuple
+
+from .config import settings
+from .metrics import Counter as MetricCounter, Histogram
+
+try:
+    import greenlet
+except ImportError:  # pragma: no cover - SQLAlchemy's asyncio support requires greenlet
+    greenlet = None
+
+logger = logging.getLogger(__name__)
+
+_STALL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LAG = Histogram(
+    "event_loop_lag_seconds", "How late the monitor's periodic wake-up ran.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+STALLS = MetricCounter(
+    "event_loop_stalls_total", "Times the event loop was blocked longer than LOOP_STALL_THRESHOLD_SECONDS.", ("site",),
+)
+STALL_DURATION = Histogram(
+    "event_loop_stall_seconds", "How long the event loop was blocked, per stall.", ("site",), buckets=_STALL_BUCKETS,
+)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _walk(frame, parent_greenlet=None):
+    """
+    Frames from ``frame`` outwards. Code awaited through SQLAlchemy's asyncio layer
+    runs in a child greenlet whose stack ends at the greenlet boundary; the walk then
+    continues on the loop thread's main greenlet, which is suspended (``gr_frame`` set)
+    exactly while a child greenlet runs, and holds the awaiting coroutines (app.crud ...).
+    """
+    while frame is not None:
+        yield frame
+        frame = frame.f_back
+    parent_frame = parent_greenlet.gr_frame if parent_greenlet is not None else None
+    while parent_frame is not None:
+        yield parent_frame
+        parent_frame = parent_frame.f_back
+
+
+def _blocking_site(frame, parent_greenlet=None) -> str:
+    """Innermost project function (``app.*`` or ``app2``) on the sampled stack, else the innermost function."""
+    innermost = None
+    for frame in _walk(frame, parent_greenlet):
+        module = frame.f_globals.get("__name__", "")
+        if innermost is None:
+            innermost = f"{module}.{frame.f_code.co_name}"
+        if (module.startswith("app.") and module != __name__) or module in ("app2", "__main__"):
+            return f"{module}.{frame.f_code.co_name}"
+    return innermost or "unknown"
+
+
+def _format_stack(frame, limit: int, parent_greenlet=None) -> Tuple[str, ...]:
+    """The sampled stack, outermost first, as ``path:line in function`` with project paths made relative."""
+    frames = list(itertools.islice(_walk(frame, parent_greenlet), limit))
+    lines = []
+    for entry in traceback.StackSummary.extract(((f, f.f_lineno) for f in reversed(frames)), lookup_lines=False):
+        path = entry.filename
+        if path.startswith(_ROOT + os.sep):
+            path = path[len(_ROOT) + 1:]
+        lines.append(f"{path}:{entry.lineno} in {entry.name}")
+    return tuple(lines)
+
+
+class LoopMonitor:
+    """
+    Measures the lag of ``loop`` and samples the loop thread's stack while it is blocked.
+
+    Args:
+        interval: Heartbeat period of the monitor coroutine.
+        threshold: A heartbeat later than this counts as a stall and is sampled.
+        log_size: Number of recent stalls kept for ``stalls()``.
+        stack_limit: Innermost frames kept per stack sample.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float, threshold: float,
+                 log_size: int = 100, stack_limit: int = 40):
+        self.loop = loop
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_limit = stack_limit
+        self._beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        # The loop thread's main greenlet; see _walk.
+        self._loop_greenlet = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._log: deque = deque(maxlen=log_size)
+        self._log_lock = threading.Lock()
+
+    def start(self):
+        """Starts the heartbeat on the loop (must be called from the loop's thread) and the watchdog thread."""
+        self._loop_thread = threading.get_ident()
+        self._loop_greenlet = greenlet.getcurrent() if greenlet is not None else None
+        self._beat = time.monotonic()
+        self._task = self.loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._task.cancel)
+
+    def stalls(self) -> List[dict]:
+        """Most recent stalls, newest first."""
+        with self._log_lock:
+            return list(reversed(self._log))
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            LAG.observe(max(0.0, now - expected))
+            self._beat = now
+
+    def _watch(self):
+        # Sample a few times per threshold so short stalls still get a stack.
+        period = min(self.interval, self.threshold / 2)
+        stall = None
+        while not self._stopped.wait(period):
+            beat = self._beat
+            if stall is not None and beat != stall["beat"]:
+                self._finish(stall, beat - stall["beat"] - self.interval)
+                stall = None
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            if stall is None:
+                stall = {"beat": beat, "at": time.time() - blocked, "stacks": Counter(), "sites": Counter()}
+            stall["stacks"][_format_stack(frame, self.stack_limit, self._loop_greenlet)] += 1
+            stall["sites"][_blocking_site(frame, self._loop_greenlet)] += 1
+            del frame
+
+    def _finish(self, stall: dict, seconds: float):
+        site = stall["sites"].most_common(1)[0][0]
+        stack, hits = stall["stacks"].most_common(1)[0]
+        STALLS.inc(site=site)
+        STALL_DURATION.observe(seconds, site=site)
+        entry = {
+            "at": round(stall["at"], 3),
+            "seconds": round(seconds, 6),
+            "site": site,
+            "samples": sum(stall["stacks"].values()),
+            "stack_samples": hits,
+            "stack": list(stack),
+        }
+        with self._log_lock:
+            self._log.append(entry)
+        logger.warning(f"Event loop blocked for {seconds:.3f}s in {site}: {' <- '.join(reversed(stack[-3:]))}")
+
+
+_monitor: Optional[LoopMonitor] = None
+
+
+def start() -> Optional[LoopMonitor]:
+    """
+    Starts monitoring the running event loop when LOOP_MONITOR_ENABLED. Idempotent
+    per loop, so both app startup hooks and long-running tasks can call it.
+    """
+    global _monitor
+    if not settings.LOOP_MONITOR_ENABLED:
+        return None
+    loop = asyncio.get_running_loop()
+    if _monitor is not None:
+        if _monitor.loop is loop:
+            return _monitor
+        _monitor.stop()
+    if settings.LOOP_MONITOR_DEBUG:
+        loop.set_debug(True)
+        loop.slow_callback_duration = settings.LOOP_STALL_THRESHOLD_SECONDS
+    _monitor = LoopMonitor(
+        loop,
+        settings.LOOP_MONITOR_INTERVAL_SECONDS,
+        settings.LOOP_STALL_THRESHOLD_SECONDS,
+        log_size=settings.LOOP_STALL_LOG_SIZE,
+    )
+    _monitor.start()
+    return _monitor
+
+
+def stop():
+    global _monitor
+    if _monitor is not None:
+        _monitor.stop()
+        _monitor = None
+
+
+def stalls() -> List[dict]:
+    """Recent stalls of the monitored loop, newest first."""
+    return _monitor.stalls() if _monitor is not None else []
@@ -7,29 +7,51 @@ FastAPI应用程序的主入口点。
 该文件用于配置和初始化FastAPI应用，包括路由器的设置。
 """
 from fastapi import FastAPI
-from .database import Base, async_engine
+from . import loop_monitor, symbols, warmup
+from .logging_config import configure_logging
+from .metrics import RequestMetricsMiddleware
+from .profiling import ProfileRequestMiddleware
 # .代表包目录内部的相对导入
-from .routers import stock, watchlist
+from .routers import admin, metrics, screener, stock, watchlist
+
+configure_logging()
 
 app = FastAPI(
     title="Stock Trading & Visualization System",
     description="A backend system for fetching, storing, and serving stock market data.",
     version="1.0.0",
 )
+app.add_middleware(RequestMetricsMiddleware)
+# Per-request profiling (X-Profile + X-Admin-Token headers)
+app.add_middleware(ProfileRequestMiddleware)
 
 @app.on_event("startup")
-# 第一行是“异步地打开数据库连接并进入事务”。
-# 第二行是“在这个连接上，等待表结构创建完成”。
 async def startup():
-    """Create database tables on startup."""
-    async with async_engine.begin() as conn:
-        # Use this to create tables. In production, you'd use Alembic migrations.
-        # await conn.run_sync(Base.metadata.drop_all)
-        await conn.run_sync(Base.metadata.create_all)
+    """
+    Start background work. The schema is managed by Alembic migrations
+    (``alembic upgrade head``), not created here.
+    """
+    loop_monitor.start()
+    # Warm caches in the background; the app serves requests meanwhile.
+    warmup.start_warmup()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Persist request counts so the next start warms the same hot symbols, and stop the loop monitor."""
+    symbols.save_view_counts()
+    loop_monitor.stop()
 
 # Include the routers
 app.include_router(stock.router)
 app.include_router(watchlist.router)
+app.include_router(screener.router)
+app.include_router(metrics.router)
+app.include_router(admin.router)
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe that also reports startup warm-up progress."""
+    return {"ready": True, "warm": warmup.progress.state == "done", "warmup": warmup.progress.to_dict()}
 
 @app.get("/")
 async def root():
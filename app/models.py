@@ -7,16 +7,19 @@ import datetime
 from typing import List, Optional
 from decimal import Decimal
 
-from sqlalchemy import (BigInteger, Column, Date, DateTime, ForeignKey, Numeric,
+from sqlalchemy import (JSON, BigInteger, Column, Date, DateTime, ForeignKey, Index, Integer, Numeric,
                         String, Text, UniqueConstraint)
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from .database import Base
 
+# SQLite only auto-increments INTEGER PRIMARY KEY columns, so ids use BIGINT everywhere else.
+BigIntPK = BigInteger().with_variant(Integer, "sqlite")
+
 class User(Base):
     __tablename__ = "users"
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(BigIntPK, primary_key=True, autoincrement=True)
     username: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
@@ -28,7 +31,7 @@ class User(Base):
 class StockInfo(Base):
     __tablename__ = "stock_info"
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(BigIntPK, primary_key=True, autoincrement=True)
     symbol: Mapped[str] = mapped_column(String(10), unique=True, nullable=False, index=True)
     company_name: Mapped[Optional[str]] = mapped_column(String(255), default="")
     exchange: Mapped[Optional[str]] = mapped_column(String(50), default="")
@@ -39,14 +42,19 @@ class StockInfo(Base):
     last_updated: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
     daily_data: Mapped[List["StockDailyData"]] = relationship(back_populates="stock_info")
+    period_data: Mapped[List["StockPeriodData"]] = relationship(back_populates="stock_info")
     watchlists: Mapped[List["UserWatchlist"]] = relationship(back_populates="stock_info")
 
 class StockDailyData(Base):
+    """
+    Daily bars, clustered on (stock_id, trade_date) so a per-symbol range read is a
+    sequential primary key scan. On MySQL the table is also range-partitioned by
+    year, which rules out a foreign key constraint there; see migrations/.
+    """
     __tablename__ = "stock_daily_data"
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
-    stock_id: Mapped[int] = mapped_column(ForeignKey("stock_info.id", ondelete="CASCADE"), nullable=False)
-    trade_date: Mapped[datetime.date] = mapped_column(Date, nullable=False)
+    stock_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("stock_info.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    trade_date: Mapped[datetime.date] = mapped_column(Date, primary_key=True)
     open_price: Mapped[Decimal] = mapped_column(Numeric(12, 4), nullable=False)
     high_price: Mapped[Decimal] = mapped_column(Numeric(12, 4), nullable=False)
     low_price: Mapped[Decimal] = mapped_column(Numeric(12, 4), nullable=False)
@@ -58,14 +66,78 @@ class StockDailyData(Base):
 
     stock_info: Mapped["StockInfo"] = relationship(back_populates="daily_data")
 
-    __table_args__ = (UniqueConstraint("stock_id", "trade_date", name="uq_stock_date"),)
+    __table_args__ = (Index("idx_trade_date", "trade_date"), {"sqlite_with_rowid": False})
+
+class StockPeriodData(Base):
+    """Weekly ('w') and monthly ('m') bars rolled up from stock_daily_data."""
+    __tablename__ = "stock_period_data"
+
+    id: Mapped[int] = mapped_column(BigIntPK, primary_key=True, autoincrement=True)
+    stock_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("stock_info.id", ondelete="CASCADE"), nullable=False)
+    frequency: Mapped[str] = mapped_column(String(1), nullable=False)
+    period_start: Mapped[datetime.date] = mapped_column(Date, nullable=False)
+    trade_date: Mapped[datetime.date] = mapped_column(Date, nullable=False)
+    open_price: Mapped[Decimal] = mapped_column(Numeric(12, 4), nullable=False)
+    high_price: Mapped[Decimal] = mapped_column(Numeric(12, 4), nullable=False)
+    low_price: Mapped[Decimal] = mapped_column(Numeric(12, 4), nullable=False)
+    close_price: Mapped[Decimal] = mapped_column(Numeric(12, 4), nullable=False)
+    volume: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    amount: Mapped[Optional[int]] = mapped_column(BigInteger)
+    update_time: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    stock_info: Mapped["StockInfo"] = relationship(back_populates="period_data")
+
+    __table_args__ = (UniqueConstraint("stock_id", "frequency", "period_start", name="uq_stock_freq_period"),)
+
+class StockIndicatorState(Base):
+    """Saved indicator state so sync runs only process newly appended bars."""
+    __tablename__ = "stock_indicator_state"
+
+    id: Mapped[int] = mapped_column(BigIntPK, primary_key=True, autoincrement=True)
+    stock_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("stock_info.id", ondelete="CASCADE"), nullable=False)
+    frequency: Mapped[str] = mapped_column(String(1), nullable=False)
+    spec: Mapped[str] = mapped_column(String(255), nullable=False)
+    last_date: Mapped[datetime.date] = mapped_column(Date, nullable=False)
+    state: Mapped[dict] = mapped_column(JSON, nullable=False)
+    latest: Mapped[dict] = mapped_column(JSON, nullable=False)
+    update_time: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("stock_id", "frequency", name="uq_stock_freq_indicator"),)
+
+class SyncJob(Base):
+    """
+    One unit of sync work (a symbol and date range) in the queue drained by
+    ``app.sync_queue`` workers. A running job is leased to one worker until
+    ``lease_expires_at``; an expired lease puts the job back in the queue.
+    """
+    __tablename__ = "sync_jobs"
+
+    id: Mapped[int] = mapped_column(BigIntPK, primary_key=True, autoincrement=True)
+    symbol: Mapped[str] = mapped_column(String(10), nullable=False)
+    frequency: Mapped[str] = mapped_column(String(1), nullable=False, default="d")
+    # No start date: continue from the latest stored bar.
+    start_date: Mapped[Optional[datetime.date]] = mapped_column(Date)
+    end_date: Mapped[Optional[datetime.date]] = mapped_column(Date)
+    status: Mapped[str] = mapped_column(String(10), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    lease_owner: Mapped[Optional[str]] = mapped_column(String(100))
+    lease_expires_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+    rows_written: Mapped[Optional[int]] = mapped_column(Integer)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_sync_jobs_status", "status", "id"),
+        Index("idx_sync_jobs_lease", "status", "lease_expires_at"),
+    )
 
 class UserWatchlist(Base):
     __tablename__ = "user_watchlist"
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    stock_id: Mapped[int] = mapped_column(ForeignKey("stock_info.id", ondelete="CASCADE"), nullable=False)
+    id: Mapped[int] = mapped_column(BigIntPK, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    stock_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("stock_info.id", ondelete="CASCADE"), nullable=False)
     added_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, default=datetime.datetime.utcnow)
 
     user: Mapped["User"] = relationship(back_populates="watchlists")
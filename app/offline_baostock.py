@@ -0,0 +1,225 @@
+"""
+Offline stand-in for the subset of the baostock API used by this project.
+
+离线 Baostock 替身：实现本项目用到的接口（login、logout、query_history_k_data_plus、
+query_stock_basic 以及结果集的 next / get_row_data / fields），数据来自录制的 fixture
+或 ``app.synthetic`` 生成的确定性合成行情，可配置注入延迟与错误率，便于在无网络的机器上做可复现的基准与压测。
+
+Select it with ``BAOSTOCK_BACKEND=offline``. ``BAOSTOCK_BACKEND=record`` talks to the
+real service and saves every successful query under BAOSTOCK_FIXTURES_DIR, from
+where the offline backend replays it; queries without a fixture get synthetic data::
+
+    BAOSTOCK_BACKEND=offline BAOSTOCK_OFFLINE_LATENCY_SECONDS=0.05 uvicorn app2:app
+"""
+import hashlib
+import json
+import random
+import time
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
+
+from .config import settings
+from .lazy_imports import lazy_import
+
+if TYPE_CHECKING:
+    from .synthetic import MarketGenerator
+
+# Error codes injected at BAOSTOCK_OFFLINE_ERROR_RATE: network errors and a server error.
+INJECTED_ERRORS = (
+    ("10002007", "网络接收错误"),
+    ("10002003", "网络连接超时"),
+    ("10005001", "系统级别错误"),
+)
+STOCK_BASIC_FIELDS = ["code", "code_name", "ipoDate", "outDate", "type", "status"]
+
+
+class ResultData:
+    """Result set with the attributes and methods of ``baostock.data.resultset.ResultData``."""
+
+    def __init__(self, fields: Optional[List[str]] = None, rows: Optional[List[list]] = None,
+                 error_code: str = "0", error_msg: str = "success"):
+        self.fields = fields or []
+        self.data = rows or []
+        self.error_code = error_code
+        self.error_msg = error_msg
+        self._cursor = -1
+
+    def next(self) -> bool:
+        self._cursor += 1
+        return self._cursor < len(self.data)
+
+    def get_row_data(self) -> list:
+        return self.data[self._cursor]
+
+    def get_data(self):
+        import pandas as pd
+        return pd.DataFrame(self.data, columns=self.fields)
+
+
+class FixtureStore:
+    """Recorded query results, one JSON file per (method, parameters)."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, method: str, params: dict) -> Path:
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:20]
+        return self.root / method / f"{digest}.json"
+
+    def load(self, method: str, params: dict) -> Optional[ResultData]:
+        path = self._path(method, params)
+        if not path.exists():
+            return None
+        recorded = json.loads(path.read_text(encoding="utf-8"))
+        return ResultData(recorded["fields"], recorded["rows"])
+
+    def save(self, method: str, params: dict, fields: List[str], rows: List[list]):
+        path = self._path(method, params)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = {"method": method, "params": params, "fields": fields, "rows": rows}
+        path.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+
+
+def _k_params(code, fields, start_date=None, end_date=None, frequency="d", adjustflag="3") -> dict:
+    return {
+        "code": code, "fields": fields, "start_date": start_date or "", "end_date": end_date or "",
+        "frequency": frequency, "adjustflag": adjustflag,
+    }
+
+
+def _basic_params(code="", code_name="") -> dict:
+    return {"code": code, "code_name": code_name}
+
+
+class OfflineBaostock:
+    """
+    Drop-in for the ``baostock`` module: replays fixtures when present, otherwise
+    serves synthetic data, after ``latency`` (+ uniform ``jitter``) seconds and
+    failing a fraction ``error_rate`` of queries with a transient error code.
+    """
+
+    def __init__(self, source: "MarketGenerator", fixtures: Optional[FixtureStore] = None,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.source = source
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+
+    def login(self, user_id="anonymous", password="123456", options=0) -> ResultData:
+        self._delay()
+        return ResultData()
+
+    def logout(self, user_id="anonymous") -> ResultData:
+        return ResultData()
+
+    def query_history_k_data_plus(self, code, fields, start_date=None, end_date=None,
+                                  frequency="d", adjustflag="3") -> ResultData:
+        params = _k_params(code, fields, start_date, end_date, frequency, adjustflag)
+        failure = self._delay_or_fail()
+        if failure is not None:
+            return failure
+        if self.fixtures is not None:
+            recorded = self.fixtures.load("query_history_k_data_plus", params)
+            if recorded is not None:
+                return recorded
+        field_list = [f.strip() for f in fields.split(",")]
+        start = date.fromisoformat(start_date) if start_date else date(2015, 1, 1)
+        end = date.fromisoformat(end_date) if end_date else date.today()
+        if start > end:
+            return ResultData(error_code="10004009", error_msg="起始日期大于终止日期")
+        return ResultData(field_list, self.source.k_rows(code, field_list, start, end, frequency, adjustflag))
+
+    def query_stock_basic(self, code="", code_name="") -> ResultData:
+        params = _basic_params(code, code_name)
+        failure = self._delay_or_fail()
+        if failure is not None:
+            return failure
+        if self.fixtures is not None:
+            recorded = self.fixtures.load("query_stock_basic", params)
+            if recorded is not None:
+                return recorded
+        rows = [
+            row for row in self.source.stock_basic_rows()
+            if (not code or row[0] == code) and (not code_name or code_name in row[1])
+        ]
+        return ResultData(list(STOCK_BASIC_FIELDS), rows)
+
+    def _delay(self):
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _delay_or_fail(self) -> Optional[ResultData]:
+        self._delay()
+        if self.error_rate and self._rng.random() < self.error_rate:
+            error_code, error_msg = self._rng.choice(INJECTED_ERRORS)
+            return ResultData(error_code=error_code, error_msg=error_msg)
+        return None
+
+
+class RecordingBaostock:
+    """Forwards to the real ``baostock`` module and saves each successful query as a fixture."""
+
+    def __init__(self, api, fixtures: FixtureStore):
+        self.api = api
+        self.fixtures = fixtures
+
+    def login(self, *args, **kwargs):
+        return self.api.login(*args, **kwargs)
+
+    def logout(self, *args, **kwargs):
+        return self.api.logout(*args, **kwargs)
+
+    def query_history_k_data_plus(self, *args, **kwargs) -> ResultData:
+        rs = self.api.query_history_k_data_plus(*args, **kwargs)
+        return self._record("query_history_k_data_plus", _k_params(*args, **kwargs), rs)
+
+    def query_stock_basic(self, *args, **kwargs) -> ResultData:
+        rs = self.api.query_stock_basic(*args, **kwargs)
+        return self._record("query_stock_basic", _basic_params(*args, **kwargs), rs)
+
+    def _record(self, method: str, params: dict, rs) -> ResultData:
+        if rs.error_code != "0":
+            return rs
+        rows = []
+        while (rs.error_code == "0") & rs.next():
+            rows.append(rs.get_row_data())
+        if rs.error_code != "0":
+            return ResultData(error_code=rs.error_code, error_msg=rs.error_msg)
+        self.fixtures.save(method, params, list(rs.fields), rows)
+        return ResultData(list(rs.fields), rows)
+
+
+def create_api(backend: str):
+    """The object the Baostock client calls for ``backend`` ("baostock", "offline" or "record")."""
+    bs = lazy_import("baostock")
+
+    if backend == "baostock":
+        return bs
+    fixtures = FixtureStore(settings.BAOSTOCK_FIXTURES_DIR) if settings.BAOSTOCK_FIXTURES_DIR else None
+    if backend == "record":
+        if fixtures is None:
+            raise ValueError("BAOSTOCK_BACKEND=record requires BAOSTOCK_FIXTURES_DIR")
+        return RecordingBaostock(bs, fixtures)
+    if backend == "offline":
+        # Imported here: the generator needs NumPy, which the real backend doesn't.
+        from .synthetic import MarketGenerator
+
+        source = MarketGenerator(
+            settings.BAOSTOCK_OFFLINE_SYMBOLS,
+            # Anchored to January 1st so the bars don't shift from one day to the next.
+            start=date(date.today().year - settings.BAOSTOCK_OFFLINE_YEARS, 1, 1),
+            seed=settings.BAOSTOCK_OFFLINE_SEED,
+        )
+        return OfflineBaostock(
+            source,
+            fixtures,
+            latency=settings.BAOSTOCK_OFFLINE_LATENCY_SECONDS,
+            jitter=settings.BAOSTOCK_OFFLINE_JITTER_SECONDS,
+            error_rate=settings.BAOSTOCK_OFFLINE_ERROR_RATE,
+            seed=settings.BAOSTOCK_OFFLINE_SEED,
+        )
+    raise ValueError(f"Unknown BAOSTOCK_BACKEND: {backend}")
@@ -0,0 +1,211 @@
+"""
+On-demand sampling profiler for live workers.
+
+采样分析器：后台线程按固定间隔读取进程内各线程的调用栈（sys._current_frames），
+汇总为火焰图工具可直接读取的折叠栈格式（collapsed stacks，每行 ``帧;帧;帧 次数``），
+可用 flamegraph.pl、speedscope 或 inferno 查看。开销只与采样频率和栈深度有关，
+不需要重启进程，也不需要在代码里加 print。
+
+Two modes:
+
+- ``wall``: every sample counts, so time spent waiting (I/O, locks, the event loop's
+  ``select``) shows up; use it for "where does the request's time go".
+- ``cpu``: a sample only counts while its thread is running on a CPU (state ``R`` in
+  ``/proc/self/task/<tid>/stat``; Linux only); use it for "what burns CPU".
+
+Both the ``/admin/profile`` endpoints and the per-request ``X-Profile`` header
+(``ProfileRequestMiddleware``) require ``X-Admin-Token: <ADMIN_TOKEN>``; with
+ADMIN_TOKEN unset they are disabled. This module only depends on the standard
+library so that ``app2`` can use it too.
+"""
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Optional
+
+from .config import settings
+
+MODES = ("wall", "cpu")
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PROC_TASKS = "/proc/self/task"
+
+# Threads of the instrumentation itself, never sampled.
+_INSTRUMENTATION_THREADS = {"loop-monitor", "sampling-profiler"}
+
+# One profile at a time per process; overlapping samplers would distort each other.
+_session_lock = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """Another profile is already running in this process."""
+
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    """True if ADMIN_TOKEN is configured and ``token`` matches it."""
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode())
+
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    if path.startswith(_ROOT + os.sep):
+        path = path[len(_ROOT) + 1:]
+    # ';' separates frames in the collapsed format.
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _is_project(path: str) -> bool:
+    return path.startswith(_ROOT + os.sep) and "site-packages" not in path
+
+
+def _on_cpu(native_id: int) -> bool:
+    try:
+        with open(f"{_PROC_TASKS}/{native_id}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return False
+    # The state follows the parenthesized thread name, which may itself contain spaces.
+    return stat[stat.rindex(b")") + 2:stat.rindex(b")") + 3] == b"R"
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of the process's threads every ``interval`` seconds.
+
+    Args:
+        mode: ``"wall"`` or ``"cpu"`` (see the module docstring).
+        idle: Also keep samples of threads with no project code on their stack, such as
+            idle pool workers or the event loop waiting in ``select``.
+        thread_filter: Called with a thread ident before each sample; False skips that thread.
+    """
+
+    def __init__(self, interval: float = 0.005, mode: str = "wall", idle: bool = False,
+                 thread_filter: Optional[Callable[[int], bool]] = None):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        if mode == "cpu" and not os.path.isdir(_PROC_TASKS):
+            raise ValueError("cpu mode needs /proc (Linux); use wall mode")
+        self.interval = interval
+        self.mode = mode
+        self.idle = idle
+        self.thread_filter = thread_filter
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if not _session_lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running in this process")
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> "SamplingProfiler":
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.elapsed = time.perf_counter() - self.started
+            _session_lock.release()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            threads = {t.ident: t for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                thread = threads.get(ident)
+                if ident == own or (thread is not None and thread.name in _INSTRUMENTATION_THREADS):
+                    continue
+                if self.thread_filter is not None and not self.thread_filter(ident):
+                    continue
+                if self.mode == "cpu" and (thread is None or not _on_cpu(thread.native_id)):
+                    continue
+                stack = []
+                in_project = False
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    in_project = in_project or _is_project(frame.f_code.co_filename)
+                    frame = frame.f_back
+                if not (in_project or self.idle):
+                    continue
+                stack.append(f"thread:{thread.name if thread else ident}")
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, root first, one ``stack count`` line each, heaviest first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileRequestMiddleware:
+    """
+    ASGI middleware: a request carrying ``X-Profile: wall|cpu`` and a valid
+    ``X-Admin-Token`` is profiled while it runs, and the response is replaced by the
+    collapsed stacks (the original status goes in ``X-Profile-Status``). Meant for
+    single slow requests such as ``POST /api/stock2/kline`` or ``GET /stocks/{symbol}/daily_data``.
+
+    Event-loop samples are kept only while the request's own task is running; worker
+    threads (``asyncio.to_thread``) are always sampled, so run it on a quiet worker.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        mode = headers.get(b"x-profile", b"").decode()
+        if not mode or not admin_token_valid(headers.get(b"x-admin-token", b"").decode()):
+            await self.app(scope, receive, send)
+            return
+
+        loop = asyncio.get_running_loop()
+        loop_thread = threading.get_ident()
+        task = asyncio.current_task()
+
+        def request_threads(ident: int) -> bool:
+            return ident != loop_thread or asyncio.current_task(loop) is task
+
+        status = ["500"]
+
+        async def discard(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+
+        try:
+            profiler = SamplingProfiler(settings.PROFILE_INTERVAL_SECONDS, mode, thread_filter=request_threads)
+            profiler.start()
+        except (ValueError, ProfilerBusyError) as e:
+            await _plain_response(send, 409 if isinstance(e, ProfilerBusyError) else 400, str(e).encode())
+            return
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+        await _plain_response(send, 200, profiler.collapsed().encode(), [
+            (b"x-profile-status", status[0].encode()),
+            (b"x-profile-seconds", f"{profiler.elapsed:.3f}".encode()),
+            (b"x-profile-samples", str(profiler.samples).encode()),
+        ])
+
+
+async def _plain_response(send, status: int, body: bytes, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(body)).encode()),
+                    *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
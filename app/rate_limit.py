@@ -0,0 +1,119 @@
+"""
+Client-side budget for upstream (Baostock) requests.
+
+上游请求限流：令牌桶按优先级发放令牌，交互式请求（图表）优先于批量任务（夜间回补）；
+速率按 AIMD 自适应调整——调用成功且延迟低于目标时线性上调，出错或变慢时乘性下调，
+无需手工调参即可稳定在上游可承受的最高速率附近。
+This module only depends on the standard library so that the standalone ``app2``
+service can use it too.
+"""
+import heapq
+import itertools
+import threading
+import time
+from typing import Optional
+
+from .metrics import Counter, Gauge, Histogram
+
+# Priority classes; lower is served first.
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+RATE = Gauge("upstream_rate_limit_per_second", "Current upstream request rate granted by the limiter.")
+WAIT = Histogram(
+    "upstream_rate_limit_wait_seconds", "Time spent waiting for an upstream request token.", ("priority",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+TIMEOUTS = Counter("upstream_rate_limit_timeouts_total", "Token requests that timed out.", ("priority",))
+ADJUSTMENTS = Counter("upstream_rate_limit_adjustments_total", "AIMD rate changes.", ("direction",))
+
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket whose refill rate adapts AIMD-style, with strict priority between waiters.
+
+    A waiter only takes a token when it is at the head of the queue, ordered by
+    (priority, arrival), so a queued interactive request is served before any
+    batch request that is already waiting.
+
+    Args:
+        rate: Initial tokens per second.
+        burst: Bucket capacity.
+        min_rate, max_rate: Bounds of the adaptive rate.
+        latency_target: Calls slower than this count as congestion.
+        increase: Tokens/second added after each second of healthy calls.
+        decrease: Factor applied to the rate on congestion, at most once per ``cooldown`` seconds.
+    """
+
+    def __init__(self, rate: float, burst: float, min_rate: float, max_rate: float,
+                 latency_target: float, increase: float, decrease: float, cooldown: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.latency_target = latency_target
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._last_increase = self._updated
+        self._last_decrease = 0.0
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        RATE.set_function(lambda: self.rate)
+
+    def acquire(self, priority: int = INTERACTIVE, timeout: Optional[float] = None) -> bool:
+        """Blocks until a token is granted (True) or ``timeout`` seconds pass (False)."""
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+        label = PRIORITY_NAMES.get(priority, str(priority))
+        with self._cond:
+            waiter = (priority, next(self._seq))
+            heapq.heappush(self._waiters, waiter)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiters[0] == waiter and self._tokens >= 1:
+                        self._tokens -= 1
+                        WAIT.observe(time.monotonic() - started, priority=label)
+                        return True
+                    now = time.monotonic()
+                    if deadline is not None and now >= deadline:
+                        TIMEOUTS.inc(priority=label)
+                        return False
+                    # Sleep until the next token is due (or a waiter ahead of us leaves).
+                    wait = max((1 - self._tokens) / self.rate, 0.001)
+                    if deadline is not None:
+                        wait = min(wait, deadline - now)
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def record(self, latency: float, ok: bool):
+        """Feeds back the outcome of one upstream call to adapt the rate."""
+        now = time.monotonic()
+        with self._cond:
+            if ok and latency <= self.latency_target:
+                if now - self._last_increase >= 1.0 and self.rate < self.max_rate:
+                    self._refill()
+                    self.rate = min(self.max_rate, self.rate + self.increase)
+                    self._last_increase = now
+                    ADJUSTMENTS.inc(direction="increase")
+            elif now - self._last_decrease >= self.cooldown and self.rate > self.min_rate:
+                self._refill()
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+                # Don't increase again right away; probe upwards from the new rate.
+                self._last_increase = now
+                ADJUSTMENTS.inc(direction="decrease")
+            self._cond.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
@@ -0,0 +1,122 @@
+"""
+Weekly and monthly rollups derived from stored daily bars.
+
+周线/月线由 stock_daily_data 向量化聚合得到，并在同步任务中增量维护：
+每次追加日线后只重算受影响的（通常是当前的）周期。
+"""
+import datetime
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud
+from .bars import BAR_COLUMNS, Bars, split_rows_by_stock
+
+ROLLUP_FREQUENCIES = ("w", "m")
+
+
+def period_starts(trade_date: np.ndarray, frequency: str) -> np.ndarray:
+    """Maps datetime64[D] trade dates to the Monday of their week or the 1st of their month."""
+    if frequency == "w":
+        days = trade_date.astype(np.int64)
+        # 1970-01-01 was a Thursday, so (days + 3) % 7 is the weekday with Monday = 0.
+        return (days - (days + 3) % 7).astype("datetime64[D]")
+    if frequency == "m":
+        return trade_date.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"Unsupported rollup frequency: {frequency}")
+
+
+def period_start(day: date, frequency: str) -> date:
+    """Scalar version of ``period_starts``."""
+    return period_starts(np.array([day], dtype="datetime64[D]"), frequency)[0].item()
+
+
+def _sum_present(values: np.ndarray, first: np.ndarray) -> np.ndarray:
+    """Per-period sums ignoring missing days; NaN (NULL) for periods with no value at all."""
+    present = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(present, values, 0.0), first)
+    return np.where(np.add.reduceat(present, first) > 0, sums, np.nan)
+
+
+def rollup_bars(daily: Bars, frequency: str) -> Tuple[np.ndarray, Bars]:
+    """
+    Aggregates daily bars into weekly or monthly bars.
+
+    Returns the period start of every output bar and the rolled-up bars, whose
+    ``trade_date`` is the last trading day of each period.
+    """
+    if len(daily) == 0:
+        return np.empty(0, dtype="datetime64[D]"), Bars.empty()
+
+    starts = period_starts(daily.trade_date, frequency)
+    bounds = np.flatnonzero(starts[1:] != starts[:-1]) + 1
+    first = np.concatenate(([0], bounds))
+    last = np.concatenate((bounds, [len(daily)])) - 1
+
+    columns = {
+        "open_price": daily["open_price"][first],
+        "high_price": np.maximum.reduceat(daily["high_price"], first),
+        "low_price": np.minimum.reduceat(daily["low_price"], first),
+        "close_price": daily["close_price"][last],
+        "volume": np.add.reduceat(np.nan_to_num(daily["volume"]), first),
+        # amount is nullable: a period without any daily amount stays NULL rather than 0.
+        "amount": _sum_present(daily["amount"], first),
+    }
+    return starts[first], Bars(daily.trade_date[last], columns)
+
+
+def _to_records(stock_id: int, frequency: str, starts: np.ndarray, bars: Bars) -> List[dict]:
+    """Converts rolled-up bars into rows for ``crud.upsert_period_data_batch``."""
+    now = datetime.datetime.utcnow()
+    columns = [bars[name].tolist() for name in BAR_COLUMNS]
+    records = []
+    for start, trade_date, o, h, l, c, v, a in zip(starts.tolist(), bars.trade_date.tolist(), *columns):
+        records.append({
+            'stock_id': stock_id,
+            'frequency': frequency,
+            'period_start': start,
+            'trade_date': trade_date,
+            'open_price': Decimal(f"{o:.4f}"),
+            'high_price': Decimal(f"{h:.4f}"),
+            'low_price': Decimal(f"{l:.4f}"),
+            'close_price': Decimal(f"{c:.4f}"),
+            'volume': int(v),
+            'amount': None if a != a else int(a),
+            'update_time': now,
+        })
+    return records
+
+
+async def refresh_rollups(db: AsyncSession, stock_id: int, since: Optional[date] = None) -> Dict[str, Bars]:
+    """
+    Recomputes the weekly and monthly rollups of a stock from its daily bars.
+
+    Args:
+        db: The database session.
+        stock_id: The stock to refresh.
+        since: The earliest daily bar that changed. Only periods containing this
+            date or later are recomputed; None rebuilds the full history.
+
+    Returns:
+        The recomputed bars per rollup frequency.
+    """
+    if since is None:
+        load_from = date(1900, 1, 1)
+    else:
+        load_from = min(period_start(since, frequency) for frequency in ROLLUP_FREQUENCIES)
+
+    rows = await crud.get_daily_bars_batch(db, stock_ids=[stock_id], start_date=load_from, end_date=date.max)
+    daily = split_rows_by_stock(rows).get(stock_id)
+    if daily is None:
+        return {}
+
+    refreshed = {}
+    for frequency in ROLLUP_FREQUENCIES:
+        period_daily = daily if since is None else daily.slice(start_date=period_start(since, frequency))
+        starts, rolled = rollup_bars(period_daily, frequency)
+        await crud.upsert_period_data_batch(db, _to_records(stock_id, frequency, starts, rolled))
+        refreshed[frequency] = rolled
+    return refreshed
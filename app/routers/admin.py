@@ -0,0 +1,49 @@
+"""
+Admin-only endpoints, protected by the X-Admin-Token header (ADMIN_TOKEN).
+"""
+import asyncio
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from .. import profiling
+from ..config import settings
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Rejects the request unless ADMIN_TOKEN is set and matches the X-Admin-Token header."""
+    if not profiling.admin_token_valid(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin)],
+)
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_process(
+    seconds: float = Query(10, gt=0, description="How long to sample"),
+    mode: Literal["wall", "cpu"] = Query("wall", description="wall: all samples; cpu: only threads running on a CPU"),
+    interval: Optional[float] = Query(None, ge=0.001, le=1, description="Sampling interval in seconds"),
+    idle: bool = Query(False, description="Also sample threads that are not running app code"),
+):
+    """
+    Samples every thread of this worker for ``seconds`` and returns collapsed stacks
+    (``flamegraph.pl`` / speedscope input).
+    """
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be at most {settings.PROFILE_MAX_SECONDS}")
+    try:
+        profiler = profiling.SamplingProfiler(interval or settings.PROFILE_INTERVAL_SECONDS, mode, idle=idle)
+        profiler.start()
+    except profiling.ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        # The sampler runs in its own thread; the loop keeps serving requests meanwhile.
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    return PlainTextResponse(profiler.collapsed(), headers={"X-Profile-Samples": str(profiler.samples)})
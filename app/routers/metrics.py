@@ -0,0 +1,26 @@
+"""
+API Endpoints for process metrics.
+"""
+from typing import List
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from .. import db_metrics, loop_monitor, metrics
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    """All process metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/metrics/slow_queries", response_model=List[dict])
+async def read_slow_queries(limit: int = 50):
+    """The most recent sampled slow SQL statements, newest first."""
+    return db_metrics.slow_queries()[:limit]
+
+@router.get("/metrics/loop_stalls", response_model=List[dict])
+async def read_loop_stalls(limit: int = 50):
+    """The most recent event-loop stalls with their most common stack sample, newest first."""
+    return loop_monitor.stalls()[:limit]
@@ -0,0 +1,36 @@
+"""
+API Endpoints for the whole-market screener.
+"""
+import time
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from .. import schemas, screener
+
+router = APIRouter(
+    prefix="/screener",
+    tags=["screener"],
+)
+
+@router.get("", response_model=schemas.ScreenerResponse)
+async def run_screener(
+    expr: str = Query(..., description="Filter expression, e.g. close > ma(close, 20) and volume > 2 * ma(volume, 20)"),
+    as_of: Optional[date] = Query(None, description="Evaluate on this date instead of the latest panel date"),
+):
+    """Evaluate a filter expression across every stock and return the matching symbols."""
+    panel = await screener.get_panel()
+    started = time.perf_counter()
+    try:
+        result = screener.screen(panel, expr, as_of=as_of)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "expression": expr,
+        "as_of": result["as_of"],
+        "universe": panel.shape[0],
+        "count": len(result["symbols"]),
+        "symbols": result["symbols"],
+        "elapsed_ms": (time.perf_counter() - started) * 1000,
+    }
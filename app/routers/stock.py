@@ -2,13 +2,14 @@
 API Endpoints for stock-related data.
 """
 from datetime import date
-from typing import List
+from decimal import Decimal
+from typing import List, Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, schemas
-from ..database import get_db
+from .. import bars, barstore, crud, history, indicators, schemas, symbols
+from ..database import get_db, get_read_db
 
 # 创建了一个带有前缀 /stocks 和标签 stocks 的路由器。
 # 这样，所有通过该路由器注册的接口都会自动带上 /stocks 前缀，并在自动生成的文档中归类到 stocks 标签下。
@@ -17,6 +18,50 @@ router = APIRouter(
     tags=["stocks"],
 )
 
+@router.post("/batch/bars", response_model=schemas.BatchBarsResponse)
+async def read_batch_bars(request: schemas.BatchBarsRequest, db: AsyncSession = Depends(get_read_db)):
+    """Retrieve column-oriented bars for many symbols over a common range in one request."""
+    requested = bars.unique_symbols(request.symbols)
+
+    # Symbols held in the local bar store are sliced from memory-mapped files.
+    data = {}
+    store = barstore.get_store()
+    if store is not None:
+        for symbol in requested:
+            stored = store.read(symbol, request.frequency, request.start_date, request.end_date)
+            if stored is not None:
+                data[symbol] = stored.to_payload()
+
+    remaining = [s for s in requested if s not in data]
+    stock_infos = await crud.get_stock_infos_by_symbols(db, symbols=remaining)
+    id_by_symbol = {info.symbol: info.id for info in stock_infos}
+
+    rows = await crud.get_bars_batch(
+        db, stock_ids=list(id_by_symbol.values()), frequency=request.frequency,
+        start_date=request.start_date, end_date=request.end_date
+    )
+    bars_by_id = bars.split_rows_by_stock(rows)
+
+    for symbol, stock_id in id_by_symbol.items():
+        data[symbol] = bars_by_id.get(stock_id, bars.Bars.empty()).to_payload()
+    for symbol in data:
+        symbols.record_view(symbol)
+    return {
+        "frequency": request.frequency,
+        "data": data,
+        "missing": [s for s in requested if s not in data],
+    }
+
+@router.get("/search", response_model=List[schemas.StockSearchResult])
+async def search_stocks(
+    q: str = Query(..., min_length=1, description="Symbol, numeric code or company name fragment"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """Search stocks by symbol or company name using the in-memory index."""
+    index = await symbols.get_index(db)
+    return index.search(q, limit=limit)
+
 @router.get("/{symbol}", response_model=schemas.StockInfoResponse)
 async def read_stock_info(symbol: str, db: AsyncSession = Depends(get_db)):
     """Retrieve basic information for a single stock by its symbol."""
@@ -33,11 +78,66 @@ async def read_stock_daily_data(
     db: AsyncSession = Depends(get_db)
 ):
     """获取股票在指定日期范围内的历史每日数据。"""
+    entry = await history.get_daily_history(db, symbol)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Stock not found")
+    symbols.record_view(symbol)
+    window = entry.bars.slice(start_date, end_date)
+    stock_id = entry.meta["stock_id"]
+
+    prices = [
+        [Decimal(f"{v:.4f}") for v in window[name].tolist()]
+        for name in ("open_price", "high_price", "low_price", "close_price")
+    ]
+    return [
+        {
+            "stock_id": stock_id, "trade_date": trade_date,
+            "open_price": o, "high_price": h, "low_price": l, "close_price": c,
+            "volume": int(v), "amount": None if a != a else int(a),
+        }
+        for trade_date, o, h, l, c, v, a in zip(
+            window.trade_date.tolist(), *prices,
+            window["volume"].tolist(), window["amount"].tolist(),
+        )
+    ]
+
+@router.get("/{symbol}/indicators", response_model=schemas.IndicatorResponse)
+async def read_stock_indicators(
+    symbol: str,
+    start_date: date = Query(..., description="Start date for the data range (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="End date for the data range (YYYY-MM-DD)"),
+    indicators_spec: str = Query(..., alias="indicators", description="Comma-separated indicators, e.g. ma5,ma20,macd,rsi14,boll,kdj"),
+    frequency: Literal["d", "w", "m"] = Query("d", description="Bar frequency: d=daily, w=weekly, m=monthly"),
+    db: AsyncSession = Depends(get_db)
+):
+    """计算股票在指定日期范围内的技术指标。"""
+    try:
+        parsed = indicators.parse_spec(indicators_spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     stock_info = await crud.get_stock_info_by_symbol(db, symbol=symbol)
     if stock_info is None:
         raise HTTPException(status_code=404, detail="Stock not found")
-    
-    daily_data = await crud.get_daily_data_history(
-        db, stock_id=stock_info.id, start_date=start_date, end_date=end_date
+    symbols.record_view(symbol)
+
+    # Load enough bars ahead of the range for the indicators to warm up.
+    warmup_rows = await crud.get_bars_before(
+        db, stock_id=stock_info.id, frequency=frequency, before=start_date, limit=indicators.lookback(parsed)
     )
-    return daily_data
+    rows = await crud.get_bars_batch(
+        db, stock_ids=[stock_info.id], frequency=frequency, start_date=start_date, end_date=end_date
+    )
+    series = bars.split_rows_by_stock(warmup_rows + rows).get(stock_info.id, bars.Bars.empty())
+
+    outputs, _ = indicators.compute(series, parsed)
+    skip = len(warmup_rows)
+    return {
+        "symbol": symbol,
+        "frequency": frequency,
+        "trade_date": series.trade_date[skip:].tolist(),
+        "values": {
+            name: [None if v != v else v for v in values[skip:].tolist()]
+            for name, values in outputs.items()
+        },
+    }
@@ -1,12 +1,14 @@
 """
 API Endpoints for user watchlist management.
 """
+from datetime import timedelta
+from itertools import groupby
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, schemas, models
+from .. import bars, crud, schemas, models
 from ..database import get_db
 
 router = APIRouter(
@@ -21,6 +23,41 @@ async def read_user_watchlist(user_id: int, db: AsyncSession = Depends(get_db)):
     watchlist = await crud.get_user_watchlist(db, user_id=user_id)
     return watchlist
 
+@router.get("/dashboard", response_model=List[schemas.WatchlistDashboardItem])
+async def read_watchlist_dashboard(
+    user_id: int,
+    days: int = Query(20, ge=2, le=250, description="Number of bars in the close sparkline"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Retrieve a user's watchlist with the latest bar, day change and a close sparkline per stock."""
+    # Calendar days back from each stock's own latest bar that hold ``days`` trading days.
+    lookback = timedelta(days=days * 2 + 30)
+    rows = await crud.get_watchlist_dashboard(db, user_id=user_id, days=days, lookback=lookback)
+
+    items = []
+    for stock_info, group in groupby(rows, key=lambda row: row.StockInfo):
+        group = list(group)
+        item = {"stock_info": stock_info, "added_at": group[0].added_at, "sparkline": []}
+        entry_rows = [row for row in group if row.trade_date is not None]
+        if entry_rows:
+            first = entry_rows[0]
+            item["latest"] = {
+                "trade_date": first.trade_date,
+                "open_price": first.open_price,
+                "high_price": first.high_price,
+                "low_price": first.low_price,
+                "close_price": first.close_price,
+                "volume": first.volume,
+                "amount": first.amount,
+            }
+            if len(entry_rows) > 1 and entry_rows[1].close_price:
+                prev_close = entry_rows[1].close_price
+                item["change"] = first.close_price - prev_close
+                item["change_pct"] = float(item["change"] / prev_close * 100)
+            item["sparkline"] = [float(row.close_price) for row in reversed(entry_rows)]
+        items.append(item)
+    return items
+
 @router.post("", response_model=schemas.UserWatchlistResponse)
 async def add_to_watchlist(
     user_id: int, 
@@ -56,3 +93,55 @@ async def remove_from_watchlist(user_id: int, symbol: str, db: AsyncSession = De
         raise HTTPException(status_code=404, detail="Stock not found in watchlist")
     
     return {"message": "Stock removed from watchlist successfully"}
+
+
+@router.post("/bulk", response_model=schemas.WatchlistBulkResponse)
+async def bulk_add_to_watchlist(
+    user_id: int,
+    request: schemas.WatchlistBulkRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Add many stocks to a user's watchlist by symbol, reporting the outcome per symbol."""
+    symbols = bars.unique_symbols(request.symbols)
+    resolved = {row[0]: row for row in await crud.resolve_watchlist_symbols(db, user_id=user_id, symbols=symbols)}
+
+    to_add = [stock_id for _, stock_id, watchlist_id in resolved.values() if watchlist_id is None]
+    await crud.add_stocks_to_watchlist_bulk(db, user_id=user_id, stock_ids=to_add)
+
+    results = []
+    for symbol in symbols:
+        row = resolved.get(symbol)
+        if row is None:
+            status = "not_found"
+        elif row[2] is None:
+            status = "added"
+        else:
+            status = "already_exists"
+        results.append({"symbol": symbol, "status": status})
+    return {"results": results}
+
+
+@router.post("/bulk_delete", response_model=schemas.WatchlistBulkResponse)
+async def bulk_remove_from_watchlist(
+    user_id: int,
+    request: schemas.WatchlistBulkRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Remove many stocks from a user's watchlist by symbol, reporting the outcome per symbol."""
+    symbols = bars.unique_symbols(request.symbols)
+    resolved = {row[0]: row for row in await crud.resolve_watchlist_symbols(db, user_id=user_id, symbols=symbols)}
+
+    to_remove = [stock_id for _, stock_id, watchlist_id in resolved.values() if watchlist_id is not None]
+    await crud.remove_stocks_from_watchlist_bulk(db, user_id=user_id, stock_ids=to_remove)
+
+    results = []
+    for symbol in symbols:
+        row = resolved.get(symbol)
+        if row is None:
+            status = "not_found"
+        elif row[2] is None:
+            status = "not_in_watchlist"
+        else:
+            status = "removed"
+        results.append({"symbol": symbol, "status": status})
+    return {"results": results}
@@ -5,7 +5,7 @@
 """
 from pydantic import BaseModel, Field
 from datetime import date, datetime
-from typing import Optional, List
+from typing import Dict, Literal, Optional, List
 from decimal import Decimal
 
 # Pydantic models should be configured to work with ORM objects.
@@ -25,10 +25,38 @@ class StockDailyDataCreate(StockDailyDataBase):
     pass
 
 class StockDailyDataResponse(StockDailyDataBase):
-    id: int
+    id: Optional[int] = Field(None, description="Deprecated, always null: daily bars are keyed by (stock_id, trade_date)")
     stock_id: int
     model_config = Config
 
+# --- Batch Bar Schemas ---
+class BatchBarsRequest(BaseModel):
+    symbols: List[str] = Field(..., min_length=1, max_length=500)
+    start_date: date
+    end_date: date
+    frequency: Literal["d", "w", "m"] = Field("d", description="Bar frequency: d=daily, w=weekly, m=monthly")
+
+class BarColumns(BaseModel):
+    """Column-oriented bars: the i-th element of every list belongs to the same bar."""
+    trade_date: List[date] = []
+    open_price: List[float] = []
+    high_price: List[float] = []
+    low_price: List[float] = []
+    close_price: List[float] = []
+    volume: List[Optional[int]] = []
+    amount: List[Optional[int]] = []
+
+class BatchBarsResponse(BaseModel):
+    frequency: str
+    data: Dict[str, BarColumns] = {}
+    missing: List[str] = Field([], description="Requested symbols that are not in stock_info")
+
+class IndicatorResponse(BaseModel):
+    symbol: str
+    frequency: str
+    trade_date: List[date] = []
+    values: Dict[str, List[Optional[float]]] = Field({}, description="One series per indicator output, aligned with trade_date")
+
 # --- StockInfo Schemas ---
 class StockInfoBase(BaseModel):
     symbol: str = Field(..., max_length=10)
@@ -47,6 +75,10 @@ class StockInfoResponse(StockInfoBase):
     last_updated: datetime
     model_config = Config
 
+class StockSearchResult(BaseModel):
+    symbol: str
+    company_name: Optional[str] = None
+
 class StockInfoWithDailyDataResponse(StockInfoResponse):
     daily_data: List[StockDailyDataResponse] = []
 
@@ -79,3 +111,30 @@ class UserWatchlistResponse(BaseModel):
     added_at: datetime
     stock_info: StockInfoResponse
     model_config = Config
+
+class WatchlistDashboardItem(BaseModel):
+    stock_info: StockInfoResponse
+    added_at: datetime
+    latest: Optional[StockDailyDataBase] = None
+    change: Optional[Decimal] = Field(None, description="Latest close minus the previous close")
+    change_pct: Optional[float] = Field(None, description="Day change in percent")
+    sparkline: List[float] = Field([], description="Closing prices of the last N bars, oldest first")
+
+class WatchlistBulkRequest(BaseModel):
+    symbols: List[str] = Field(..., min_length=1, max_length=1000)
+
+class WatchlistBulkResult(BaseModel):
+    symbol: str
+    status: Literal["added", "already_exists", "removed", "not_in_watchlist", "not_found"]
+
+class WatchlistBulkResponse(BaseModel):
+    results: List[WatchlistBulkResult]
+
+# --- Screener Schemas ---
+class ScreenerResponse(BaseModel):
+    expression: str
+    as_of: Optional[date] = None
+    universe: int = Field(..., description="Number of stocks in the panel")
+    count: int
+    symbols: List[str] = []
+    elapsed_ms: float
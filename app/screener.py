@@ -0,0 +1,334 @@
+"""
+Whole-market screener over an in-memory price panel.
+
+选股器：将最近N个交易日的全市场日线对齐为 (股票 × 日期) 的NumPy面板，
+并对声明式的筛选表达式做一次性向量化求值，例如::
+
+    close > ma(close, 20) and volume > 2 * ma(volume, 20)
+"""
+import ast
+import asyncio
+import logging
+import time
+import warnings
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import analytics, crud
+from .bars import BAR_COLUMNS
+from .config import settings
+from .database import ReadSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Panel field names exposed to expressions, mapped to bar columns.
+FIELDS = {
+    "open": "open_price",
+    "high": "high_price",
+    "low": "low_price",
+    "close": "close_price",
+    "volume": "volume",
+    "amount": "amount",
+}
+
+
+class PricePanel:
+    """Aligned (stocks x dates) arrays of recent daily bars; missing bars are NaN."""
+
+    def __init__(self, symbols: np.ndarray, dates: np.ndarray, fields: Dict[str, np.ndarray]):
+        self.symbols = symbols
+        self.dates = dates
+        self.fields = fields
+        self.built_at = time.monotonic()
+
+    @property
+    def shape(self):
+        return len(self.symbols), len(self.dates)
+
+    @classmethod
+    def from_rows(cls, symbol_rows: List[tuple], bar_rows: List[tuple]) -> "PricePanel":
+        """
+        Builds a panel from ``(stock_id, symbol)`` rows and
+        ``(stock_id, trade_date, open, high, low, close, volume, amount)`` rows.
+        """
+        symbol_rows = sorted(symbol_rows)
+        stock_ids = np.array([row[0] for row in symbol_rows], dtype=np.int64)
+        symbols = np.array([row[1] for row in symbol_rows], dtype=object)
+        if not bar_rows:
+            return cls(symbols, np.empty(0, dtype="datetime64[D]"), {})
+
+        columns = list(zip(*bar_rows))
+        return cls.from_columns(
+            stock_ids, symbols,
+            np.array(columns[0], dtype=np.int64),
+            np.array(columns[1], dtype="datetime64[D]"),
+            {name: np.array(values, dtype=np.float64) for name, values in zip(BAR_COLUMNS, columns[2:])},
+        )
+
+    @classmethod
+    def from_columns(
+        cls, keys: np.ndarray, symbols: np.ndarray,
+        row_keys: np.ndarray, row_dates: np.ndarray, values: Dict[str, np.ndarray]
+    ) -> "PricePanel":
+        """
+        Builds a panel from column arrays. ``keys`` are the sorted stock keys (ids or
+        symbols) of the panel rows; bars whose ``row_keys`` are not in ``keys`` are dropped.
+        """
+        row_index = np.minimum(np.searchsorted(keys, row_keys), max(len(keys) - 1, 0))
+        known = keys[row_index] == row_keys if len(keys) else np.zeros(len(row_keys), dtype=bool)
+        row_index, row_dates = row_index[known], row_dates[known]
+        dates = np.unique(row_dates)
+
+        col_index = np.searchsorted(dates, row_dates)
+        fields = {}
+        for name in BAR_COLUMNS:
+            panel = np.full((len(symbols), len(dates)), np.nan)
+            panel[row_index, col_index] = values[name][known]
+            fields[name] = panel
+        return cls(symbols, dates, fields)
+
+
+# --- Expression evaluation ---
+
+def _rolling_sum(x: np.ndarray, n: int):
+    """Trailing n-bar sums along the date axis; NaN unless all n bars are present."""
+    valid = ~np.isnan(x)
+    sums = np.cumsum(np.where(valid, x, 0.0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    sums = np.pad(sums, ((0, 0), (1, 0)))
+    counts = np.pad(counts, ((0, 0), (1, 0)))
+    out = np.full(x.shape, np.nan)
+    if n <= x.shape[1]:
+        window_sums = sums[:, n:] - sums[:, :-n]
+        window_counts = counts[:, n:] - counts[:, :-n]
+        out[:, n - 1:] = np.where(window_counts == n, window_sums, np.nan)
+    return out
+
+
+def _rolling_reduce(x: np.ndarray, n: int, func):
+    out = np.full(x.shape, np.nan)
+    if n <= x.shape[1]:
+        with warnings.catch_warnings():
+            # All-NaN windows (suspended stocks) are expected and yield NaN.
+            warnings.simplefilter("ignore", RuntimeWarning)
+            out[:, n - 1:] = func(sliding_window_view(x, n, axis=1), axis=2)
+    return out
+
+
+def _ref(x: np.ndarray, n: int):
+    out = np.full(x.shape, np.nan)
+    if n < x.shape[1]:
+        out[:, n:] = x[:, :x.shape[1] - n]
+    return out
+
+
+def _window(n) -> int:
+    if not isinstance(n, (int, float)) or isinstance(n, bool) or n != int(n) or n < 1:
+        raise ValueError("Window lengths must be positive integer constants")
+    return int(n)
+
+
+FUNCTIONS = {
+    "ma": lambda x, n: _rolling_sum(x, _window(n)) / _window(n),
+    "sum": lambda x, n: _rolling_sum(x, _window(n)),
+    "hhv": lambda x, n: _rolling_reduce(x, _window(n), np.nanmax),
+    "llv": lambda x, n: _rolling_reduce(x, _window(n), np.nanmin),
+    "std": lambda x, n: _rolling_reduce(x, _window(n), np.std),
+    "ref": lambda x, n: _ref(x, _window(n)),
+    "abs": np.abs,
+    "max": np.fmax,
+    "min": np.fmin,
+}
+
+_BINARY_OPS = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+_COMPARE_OPS = {
+    ast.Gt: np.greater, ast.GtE: np.greater_equal, ast.Lt: np.less,
+    ast.LtE: np.less_equal, ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Compare, ast.Call, ast.Name, ast.Load, ast.Constant,
+    *_BINARY_OPS, *_COMPARE_OPS,
+)
+
+
+@lru_cache(maxsize=256)
+def compile_expression(expression: str) -> ast.Expression:
+    """
+    Parses and validates a screener expression.
+
+    Raises:
+        ValueError: If the expression has a syntax error or uses anything other than
+            panel fields, numbers, arithmetic, comparisons, and/or/not and FUNCTIONS.
+    """
+    try:
+        tree = ast.parse(expression.strip().lower(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax in expression: {type(node).__name__}")
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS):
+            raise ValueError("Unknown function in expression")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError("Only numeric constants are allowed")
+    return tree
+
+
+def _present(value):
+    """Validity of a numeric operand: False where it is NaN (missing bars, incomplete windows)."""
+    return ~np.isnan(np.asarray(value, dtype=np.float64))
+
+
+def _eval(node, panel: PricePanel):
+    """
+    Evaluates ``node`` to ``(value, valid)``. ``valid`` is False wherever an input
+    was missing, so that negating a comparison on NaN (which is False) cannot match.
+    """
+    if isinstance(node, ast.Expression):
+        return _eval(node.body, panel)
+    if isinstance(node, ast.Constant):
+        return node.value, True
+    if isinstance(node, ast.Name):
+        if node.id in FIELDS:
+            value = panel.fields[FIELDS[node.id]]
+        # Shorthand: ma20 == ma(close, 20)
+        elif node.id.startswith("ma") and node.id[2:].isdigit():
+            value = FUNCTIONS["ma"](panel.fields["close_price"], int(node.id[2:]))
+        else:
+            raise ValueError(f"Unknown name in expression: {node.id}")
+        return value, _present(value)
+    if isinstance(node, ast.Call):
+        args = [_eval(arg, panel)[0] for arg in node.args]
+        value = FUNCTIONS[node.func.id](*args)
+        return value, _present(value)
+    if isinstance(node, ast.UnaryOp):
+        operand, valid = _eval(node.operand, panel)
+        if isinstance(node.op, ast.Not):
+            return np.logical_not(operand), valid
+        return (-operand if isinstance(node.op, ast.USub) else operand), valid
+    if isinstance(node, ast.BinOp):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            value = _BINARY_OPS[type(node.op)](_eval(node.left, panel)[0], _eval(node.right, panel)[0])
+        return value, _present(value)
+    if isinstance(node, ast.Compare):
+        left, valid = _eval(node.left, panel)
+        result = True
+        for op, comparator in zip(node.ops, node.comparators):
+            right, right_valid = _eval(comparator, panel)
+            with np.errstate(invalid="ignore"):
+                result = np.logical_and(result, _COMPARE_OPS[type(op)](left, right))
+            valid = np.logical_and(valid, right_valid)
+            left = right
+        return result, valid
+    if isinstance(node, ast.BoolOp):
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        result, valid = _eval(node.values[0], panel)
+        for value_node in node.values[1:]:
+            value, value_valid = _eval(value_node, panel)
+            result = combine(result, value)
+            valid = np.logical_and(valid, value_valid)
+        return result, valid
+    raise ValueError(f"Unsupported syntax in expression: {type(node).__name__}")
+
+
+def screen(panel: PricePanel, expression: str, as_of: Optional[date] = None) -> dict:
+    """
+    Evaluates ``expression`` over the whole panel and returns the symbols matching
+    on ``as_of`` (the latest panel date by default).
+    """
+    tree = compile_expression(expression)
+    if len(panel.dates) == 0:
+        return {"as_of": None, "symbols": []}
+
+    if as_of is None:
+        column = len(panel.dates) - 1
+    else:
+        column = int(np.searchsorted(panel.dates, np.datetime64(as_of, "D"), "right")) - 1
+        if column < 0:
+            raise ValueError(f"No panel data on or before {as_of}")
+
+    try:
+        value, valid = _eval(tree, panel)
+        result = np.broadcast_to(np.asarray(value), panel.shape)
+    except TypeError:
+        raise ValueError("Wrong number of arguments in a function call")
+    if result.dtype != bool:
+        raise ValueError("Expression must evaluate to a condition")
+    # Symbols with a missing input never match, whatever the expression's negations.
+    matched = result[:, column] & np.broadcast_to(np.asarray(valid, dtype=bool), panel.shape)[:, column]
+    return {"as_of": panel.dates[column].item(), "symbols": panel.symbols[matched].tolist()}
+
+
+# --- Process-level panel ---
+
+_panel: Optional[PricePanel] = None
+_panel_lock = asyncio.Lock()
+
+
+async def build_panel(db: AsyncSession, lookback: int) -> PricePanel:
+    """
+    Loads the last ``lookback`` trading dates of every stock into a PricePanel.
+
+    The scan runs on the DuckDB analytics store when ANALYTICS_DATABASE_URL is set,
+    falling back to the main database if the store is unavailable.
+    """
+    started = time.perf_counter()
+    symbol_rows = await crud.get_all_stock_symbols(db)
+    panel = None
+    if analytics.enabled():
+        try:
+            columns = await asyncio.to_thread(analytics.scan_recent_daily_bars, lookback)
+            symbols = np.array(sorted(row[1] for row in symbol_rows), dtype=object)
+            panel = PricePanel.from_columns(
+                symbols.astype(str), symbols, columns["symbol"].astype(str),
+                columns["trade_date"], {name: columns[name] for name in BAR_COLUMNS},
+            )
+        except Exception as e:
+            logger.warning(f"Analytics store scan failed, using the main database: {e}")
+    if panel is None:
+        dates = await crud.get_recent_trade_dates(db, limit=lookback)
+        bar_rows = []
+        if dates:
+            bar_rows = await crud.get_all_daily_bars_since(db, start_date=min(dates))
+        # Row-by-row conversion of the whole market; keep it off the event loop.
+        panel = await asyncio.to_thread(PricePanel.from_rows, symbol_rows, bar_rows)
+    logger.info(
+        f"Built screener panel {panel.shape[0]}x{panel.shape[1]} "
+        f"in {time.perf_counter() - started:.2f}s."
+    )
+    return panel
+
+
+async def _rebuild_panel() -> PricePanel:
+    global _panel
+    async with ReadSessionLocal() as db:
+        _panel = await build_panel(db, lookback=settings.SCREENER_LOOKBACK_DAYS)
+    return _panel
+
+
+async def refresh_panel() -> PricePanel:
+    """Rebuilds the process-level panel from the database."""
+    async with _panel_lock:
+        return await _rebuild_panel()
+
+
+async def get_panel() -> PricePanel:
+    """
+    Returns the process-level panel, building it on first use.
+
+    The panel is also rebuilt once it is older than SCREENER_MAX_AGE_SECONDS, for
+    deployments where the sync tasks run in a different process.
+    """
+    panel = _panel
+    if panel is None or time.monotonic() - panel.built_at > settings.SCREENER_MAX_AGE_SECONDS:
+        async with _panel_lock:
+            # Another request may have rebuilt it while we waited for the lock.
+            if _panel is panel:
+                return await _rebuild_panel()
+    return _panel
@@ -0,0 +1,85 @@
+"""
+Content-hashed static assets with long-lived caching.
+
+静态资源：页面引用的 CSS/JS 按内容哈希改写为 ``app.<hash>.js`` 形式的地址，
+这些地址的内容永不改变，可以让浏览器缓存一年（immutable）；首页 HTML 带 ETag、
+每次向服务器确认（no-cache），未改动时返回 304，不必每次重新下载整页。
+
+The files are read and hashed once per process on first use; restart the worker
+(or run uvicorn with ``--reload-include '*.js' --reload-include '*.css'``) after
+editing them.
+"""
+import hashlib
+import mimetypes
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def _etag(content: bytes) -> str:
+    return '"' + hashlib.sha256(content).hexdigest()[:20] + '"'
+
+
+class AssetBundle:
+    """
+    The files of ``directory`` served under ``url_prefix``. Every reference to
+    ``<url_prefix>/<name>`` in the index page is rewritten to the hashed URL.
+    """
+
+    def __init__(self, directory: Path, url_prefix: str, index: str = "index.html"):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.index = index
+        self._assets: Optional[Dict[str, Tuple[bytes, str, str]]] = None
+        self._index: Optional[Tuple[bytes, str]] = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._assets is not None:
+                return
+            assets, urls = {}, {}
+            for path in sorted(self.directory.iterdir()):
+                if not path.is_file() or path.name == self.index:
+                    continue
+                content = path.read_bytes()
+                digest = hashlib.sha256(content).hexdigest()[:12]
+                hashed = f"{path.stem}.{digest}{path.suffix}"
+                media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+                assets[hashed] = (content, media_type, IMMUTABLE)
+                # The plain name keeps working, but has to be revalidated.
+                assets[path.name] = (content, media_type, REVALIDATE)
+                urls[f"{self.url_prefix}/{path.name}"] = f"{self.url_prefix}/{hashed}"
+            html = (self.directory / self.index).read_text(encoding="utf-8")
+            for plain, hashed in urls.items():
+                html = html.replace(f'"{plain}"', f'"{hashed}"')
+            content = html.encode("utf-8")
+            self._index = (content, _etag(content))
+            self._assets = assets
+
+    def index_response(self, request: Request) -> Response:
+        """The index page, or 304 when the browser's copy (If-None-Match) is current."""
+        self._load()
+        content, etag = self._index
+        headers = {"ETag": etag, "Cache-Control": REVALIDATE}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content, media_type="text/html; charset=utf-8", headers=headers)
+
+    def asset_response(self, request: Request, name: str) -> Response:
+        self._load()
+        asset = self._assets.get(name)
+        if asset is None:
+            return Response("Not Found", status_code=404, media_type="text/plain")
+        content, media_type, cache_control = asset
+        etag = _etag(content)
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content, media_type=media_type, headers=headers)
@@ -0,0 +1,140 @@
+"""
+In-memory symbol map, search index and view counters.
+
+股票代码映射与搜索索引常驻内存，避免每次请求都查询 stock_info；
+同时统计各股票的访问次数，供启动预热挑选热门股票。
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SymbolIndex:
+    """Symbol -> (stock_id, company_name) map with a simple substring search."""
+
+    def __init__(self, entries: List[Tuple[int, str, str]]):
+        self._by_symbol: Dict[str, Tuple[int, Optional[str]]] = {symbol: (stock_id, name) for stock_id, symbol, name in entries}
+        # (lowercased symbol, lowercased name, symbol) sorted by symbol for stable results.
+        self._keys = sorted((symbol.lower(), (name or "").lower(), symbol) for _, symbol, name in entries)
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._by_symbol)
+
+    def resolve(self, symbol: str) -> Optional[int]:
+        """Returns the stock id of ``symbol``, or None if it is unknown."""
+        entry = self._by_symbol.get(symbol)
+        return entry[0] if entry else None
+
+    def search(self, keyword: str, limit: int = 20) -> List[dict]:
+        """
+        Finds stocks whose symbol or company name contains ``keyword``.
+        Prefix matches on the symbol, its numeric code or the name rank first.
+        """
+        keyword = keyword.strip().lower()
+        if not keyword:
+            return []
+        prefix, contains = [], []
+        for symbol_key, name_key, symbol in self._keys:
+            code = symbol_key.split(".", 1)[-1]
+            if symbol_key.startswith(keyword) or code.startswith(keyword) or name_key.startswith(keyword):
+                prefix.append(symbol)
+            elif keyword in symbol_key or keyword in name_key:
+                contains.append(symbol)
+            if len(prefix) >= limit:
+                break
+        return [
+            {"symbol": symbol, "company_name": self._by_symbol[symbol][1]}
+            for symbol in (prefix + contains)[:limit]
+        ]
+
+
+_index: Optional[SymbolIndex] = None
+_index_lock = asyncio.Lock()
+
+
+async def load_index(db: AsyncSession) -> SymbolIndex:
+    """(Re)builds the process-level symbol index from stock_info."""
+    global _index
+    _index = SymbolIndex(await crud.get_all_stock_names(db))
+    return _index
+
+
+async def get_index(db: AsyncSession) -> SymbolIndex:
+    """
+    Returns the process-level symbol index, loading it on first use.
+
+    The index is reloaded once it is older than SYMBOL_INDEX_TTL_SECONDS, so stocks
+    added by sync tasks in other processes show up in search.
+    """
+    index = _index
+    if index is None or time.monotonic() - index.built_at > settings.SYMBOL_INDEX_TTL_SECONDS:
+        async with _index_lock:
+            # Another request may have reloaded it while we waited for the lock.
+            if _index is index:
+                return await load_index(db)
+    return _index
+
+
+def note_symbol(symbol: str):
+    """Marks the index for reload if ``symbol`` (just synced in this process) is not in it."""
+    global _index
+    if _index is not None and _index.resolve(symbol) is None:
+        _index = None
+
+
+# --- View counters ---
+
+_views: Counter = Counter()
+_views_lock = threading.Lock()
+
+
+def record_view(symbol: str):
+    """Counts a request for ``symbol``; used to pick the most requested symbols to pre-warm."""
+    with _views_lock:
+        _views[symbol] += 1
+
+
+def most_viewed(n: int) -> List[str]:
+    with _views_lock:
+        return [symbol for symbol, _ in _views.most_common(n)]
+
+
+def load_view_counts(path: Optional[str] = None):
+    """Loads view counts saved by a previous process, if any."""
+    path = path or settings.POPULAR_SYMBOLS_FILE
+    try:
+        with open(path, encoding="utf-8") as f:
+            counts = json.load(f)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read view counts from {path}: {e}")
+        return
+    with _views_lock:
+        _views.update({str(k): int(v) for k, v in counts.items()})
+
+
+def save_view_counts(path: Optional[str] = None, keep: int = 5000):
+    """Persists the most requested symbols so the next process can warm them up."""
+    path = path or settings.POPULAR_SYMBOLS_FILE
+    with _views_lock:
+        counts = dict(_views.most_common(keep))
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(counts, f)
+    except OSError as e:
+        logger.warning(f"Could not save view counts to {path}: {e}")
@@ -0,0 +1,458 @@
+"""
+Database-backed sync work queue with leases.
+
+分布式同步队列：同步工作拆成按股票（和日期区间）划分的任务，写入 sync_jobs 表；
+任意数量的进程或机器运行 worker，连接同一个数据库，用 ``SELECT ... FOR UPDATE SKIP LOCKED``
+领取任务，互不等待、不会重复领取。领取的任务带租约（lease），worker 工作期间定期续约；
+worker 崩溃或失联后租约过期，任务自动回到队列由其他 worker 接手。全量回补的吞吐量随
+worker 数量增加，上限是 Baostock 的限流与数据库的写入能力::
+
+    python -m app.sync_queue enqueue --all --start 1990-01-01   # full backfill of stock_info
+    python -m app.sync_queue enqueue --all                      # incremental: after the latest stored bar
+    python -m app.sync_queue worker                             # as many as needed, on any machine
+    python -m app.sync_queue status
+
+Baostock calls are serialized within a process (``app.baostock_client``), so scale
+out with more worker processes rather than ``--concurrency``; a little concurrency
+only overlaps the database writes of one job with the fetch of the next.
+
+Jobs are idempotent (bars are upserted), so a job whose lease expired while its
+worker was still running does no harm when it runs again. Lease expiry is compared
+with the workers' clocks; keep them NTP-synced. On SQLite there is no SKIP LOCKED:
+claims are serialized by the database lock and verified afterwards, which is fine
+for development but not for many workers.
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import signal
+import socket
+import time
+import uuid
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import baostock_client, loop_monitor, models
+from .config import settings
+from .database import AsyncSessionLocal
+from .metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+OPEN_STATUSES = (PENDING, RUNNING)
+
+JOBS = Counter("sync_jobs_total", "Sync jobs finished by this worker, by outcome.", ("outcome",))
+JOB_DURATION = Histogram(
+    "sync_job_seconds", "Time a worker spent on one sync job.",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+
+Job = models.SyncJob
+
+
+def _utcnow() -> datetime.datetime:
+    # Naive UTC, like the models' default timestamps.
+    return datetime.datetime.utcnow()
+
+
+def _lease_until(lease_seconds: float) -> datetime.datetime:
+    return _utcnow() + datetime.timedelta(seconds=lease_seconds)
+
+
+# --- Queue operations ---
+
+async def enqueue_jobs(db: AsyncSession, symbols: List[str], start_date: Optional[date] = None,
+                       end_date: Optional[date] = None, frequency: str = "d", chunk_size: int = 5000) -> int:
+    """
+    Adds one job per symbol, skipping symbols that already have a pending or running
+    job for the same frequency and date range. Returns the number of jobs added.
+
+    Args:
+        start_date: First date to fetch; None continues from the latest stored bar.
+        end_date: Last date to fetch; None means the day the job runs.
+    """
+    if frequency != "d":
+        raise ValueError("Only daily ('d') sync jobs are supported")
+    # NULL never equals NULL in SQL, so open ranges are matched with IS NULL.
+    same_range = [
+        Job.start_date.is_(None) if start_date is None else Job.start_date == start_date,
+        Job.end_date.is_(None) if end_date is None else Job.end_date == end_date,
+    ]
+    result = await db.execute(
+        select(Job.symbol).where(Job.frequency == frequency, Job.status.in_(OPEN_STATUSES), *same_range)
+    )
+    queued = set(result.scalars().all())
+    rows = [
+        {"symbol": symbol, "frequency": frequency, "start_date": start_date, "end_date": end_date,
+         "status": PENDING, "attempts": 0}
+        for symbol in dict.fromkeys(symbols) if symbol not in queued
+    ]
+    for i in range(0, len(rows), chunk_size):
+        await db.execute(insert(Job), rows[i:i + chunk_size])
+    await db.commit()
+    return len(rows)
+
+
+async def claim_jobs(db: AsyncSession, worker_id: str, limit: int, lease_seconds: float) -> List[models.SyncJob]:
+    """
+    Leases up to ``limit`` pending jobs, oldest first, to ``worker_id``.
+
+    On PostgreSQL and MySQL 8 the candidate rows are locked with ``FOR UPDATE SKIP
+    LOCKED``, so concurrent workers each get different jobs without waiting on one
+    another. Elsewhere the guarded UPDATE and the read-back below make sure a job
+    another worker won in the meantime is not returned.
+    """
+    stmt = select(Job.id).where(Job.status == PENDING).order_by(Job.id).limit(limit)
+    if db.bind.dialect.name in ("postgresql", "mysql"):
+        stmt = stmt.with_for_update(skip_locked=True)
+    ids = (await db.execute(stmt)).scalars().all()
+    if not ids:
+        await db.commit()
+        return []
+    now = _utcnow()
+    await db.execute(
+        update(Job)
+        .where(Job.id.in_(ids), Job.status == PENDING)
+        .values(status=RUNNING, lease_owner=worker_id, lease_expires_at=_lease_until(lease_seconds),
+                attempts=Job.attempts + 1, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    result = await db.execute(
+        select(Job).where(Job.id.in_(ids), Job.status == RUNNING, Job.lease_owner == worker_id).order_by(Job.id)
+    )
+    return list(result.scalars().all())
+
+
+async def renew_leases(db: AsyncSession, worker_id: str, job_ids: List[int], lease_seconds: float) -> List[int]:
+    """Extends the leases ``worker_id`` still holds on ``job_ids``; returns the ids whose lease was lost."""
+    if not job_ids:
+        return []
+    await db.execute(
+        update(Job)
+        .where(Job.id.in_(job_ids), Job.status == RUNNING, Job.lease_owner == worker_id)
+        .values(lease_expires_at=_lease_until(lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    result = await db.execute(
+        select(Job.id).where(Job.id.in_(job_ids), Job.status == RUNNING, Job.lease_owner == worker_id)
+    )
+    held = set(result.scalars().all())
+    return [job_id for job_id in job_ids if job_id not in held]
+
+
+async def _finish(db: AsyncSession, job: models.SyncJob, worker_id: str, **values) -> bool:
+    """Updates a job this worker still holds; False if its lease was lost in the meantime."""
+    result = await db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.status == RUNNING, Job.lease_owner == worker_id)
+        .values(lease_owner=None, lease_expires_at=None, updated_at=_utcnow(), **values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def complete_job(db: AsyncSession, job: models.SyncJob, worker_id: str, rows_written: int) -> bool:
+    return await _finish(db, job, worker_id, status=DONE, rows_written=rows_written, last_error=None)
+
+
+async def fail_job(db: AsyncSession, job: models.SyncJob, worker_id: str, error: str, max_attempts: int) -> bool:
+    """Puts the job back in the queue, or marks it failed once it used up ``max_attempts``."""
+    status = FAILED if job.attempts >= max_attempts else PENDING
+    return await _finish(db, job, worker_id, status=status, last_error=error[:2000])
+
+
+async def release_job(db: AsyncSession, job: models.SyncJob, worker_id: str) -> bool:
+    """Returns the job to the queue without counting the attempt (e.g. while Baostock is down)."""
+    return await _finish(db, job, worker_id, status=PENDING, attempts=Job.attempts - 1)
+
+
+async def requeue_expired(db: AsyncSession, max_attempts: int) -> int:
+    """
+    Puts running jobs whose lease expired (their worker died or stalled) back in the
+    queue; those that already used up ``max_attempts`` are marked failed instead.
+    Returns the number of jobs re-queued or failed.
+    """
+    now = _utcnow()
+    expired = (Job.status == RUNNING) & (Job.lease_expires_at < now)
+    failed = await db.execute(
+        update(Job)
+        .where(expired, Job.attempts >= max_attempts)
+        .values(status=FAILED, lease_owner=None, lease_expires_at=None, last_error="lease expired", updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    requeued = await db.execute(
+        update(Job)
+        .where(expired)
+        .values(status=PENDING, lease_owner=None, lease_expires_at=None, last_error="lease expired", updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    count = failed.rowcount + requeued.rowcount
+    if count:
+        logger.warning(f"Re-queued {requeued.rowcount} and failed {failed.rowcount} jobs with expired leases.")
+    return count
+
+
+async def retry_failed(db: AsyncSession) -> int:
+    """Puts every failed job back in the queue with a fresh attempt budget."""
+    result = await db.execute(
+        update(Job).where(Job.status == FAILED).values(status=PENDING, attempts=0, updated_at=_utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def queue_status(db: AsyncSession, window_seconds: float = 300) -> dict:
+    """Job counts by status, plus the jobs and bars finished in the last ``window_seconds``."""
+    result = await db.execute(select(Job.status, func.count()).group_by(Job.status))
+    counts = {status: 0 for status in (PENDING, RUNNING, DONE, FAILED)}
+    counts.update(dict(result.all()))
+    since = _utcnow() - datetime.timedelta(seconds=window_seconds)
+    recent = (await db.execute(
+        select(func.count(), func.coalesce(func.sum(Job.rows_written), 0))
+        .where(Job.status == DONE, Job.updated_at >= since)
+    )).one()
+    workers = (await db.execute(
+        select(func.count(func.distinct(Job.lease_owner))).where(Job.status == RUNNING)
+    )).scalar_one()
+    return {
+        "counts": counts,
+        "workers": workers,
+        "window_seconds": window_seconds,
+        "jobs_per_second": recent[0] / window_seconds,
+        "rows_per_second": int(recent[1]) / window_seconds,
+    }
+
+
+# --- Worker ---
+
+class SyncWorker:
+    """
+    Claims jobs and runs ``app.tasks.sync_symbol`` for each, renewing the leases of
+    the jobs in progress until they finish. Stops claiming on SIGTERM/SIGINT and
+    exits once its running jobs are done.
+
+    Args:
+        concurrency: Jobs run at the same time by this worker.
+        drain: Exit once the queue has no pending or running jobs left, instead of
+            waiting for new ones.
+    """
+
+    def __init__(self, worker_id: Optional[str] = None, concurrency: int = 1, lease_seconds: float = 120.0,
+                 poll_seconds: float = 5.0, max_attempts: int = 3, drain: bool = False):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.drain = drain
+        self.completed = 0
+        self.failed = 0
+        self.rows = 0
+        self._running: Dict[int, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+        self._paused_until = 0.0
+        self._next_requeue = 0.0
+        self._sync_symbol = None
+
+    def stop(self):
+        if not self._stopping.is_set():
+            logger.info(f"Worker {self.worker_id} stopping after {len(self._running)} running jobs.")
+        self._stopping.set()
+
+    async def run(self):
+        # Imported here, before the loop monitor starts: app.tasks pulls in pandas and the bar stores.
+        from .tasks import sync_symbol
+        self._sync_symbol = sync_symbol
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        loop_monitor.start()
+        logger.info(f"Sync worker {self.worker_id} started (concurrency {self.concurrency}).")
+        started = time.perf_counter()
+        renewer = asyncio.create_task(self._renew_forever())
+        try:
+            while not self._stopping.is_set():
+                try:
+                    claimed = await self._claim()
+                except Exception as e:
+                    # e.g. the database restarting; running jobs carry on, claiming resumes later.
+                    logger.error(f"Failed to claim sync jobs: {e}")
+                    claimed = 0
+                if self._running:
+                    await asyncio.wait(
+                        list(self._running.values()), timeout=self.poll_seconds,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                elif not claimed:
+                    if self.drain and await self._queue_empty():
+                        break
+                    await self._sleep(self.poll_seconds)
+            if self._running:
+                await asyncio.wait(list(self._running.values()))
+        finally:
+            renewer.cancel()
+            for task in self._running.values():
+                task.cancel()
+            loop_monitor.stop()
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Sync worker {self.worker_id} finished: {self.completed} jobs done, {self.failed} failed attempts, "
+            f"{self.rows} rows in {elapsed:.1f}s ({self.completed / max(elapsed, 1e-9):.2f} jobs/s)."
+        )
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _claim(self) -> int:
+        now = time.monotonic()
+        free = self.concurrency - len(self._running)
+        if free <= 0 or now < self._paused_until:
+            return 0
+        async with AsyncSessionLocal() as db:
+            if now >= self._next_requeue:
+                self._next_requeue = now + self.poll_seconds
+                await requeue_expired(db, self.max_attempts)
+            jobs = await claim_jobs(db, self.worker_id, free, self.lease_seconds)
+        for job in jobs:
+            self._running[job.id] = asyncio.create_task(self._run_job(job))
+        return len(jobs)
+
+    async def _queue_empty(self) -> bool:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(func.count()).select_from(Job).where(Job.status.in_(OPEN_STATUSES)))
+            return result.scalar_one() == 0
+
+    async def _run_job(self, job: models.SyncJob):
+        started = time.perf_counter()
+        outcome = "done"
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = await self._sync_symbol(db, job.symbol, start_date=job.start_date, end_date=job.end_date)
+            async with AsyncSessionLocal() as db:
+                if not await complete_job(db, job, self.worker_id, rows):
+                    outcome = "lost"
+                    logger.warning(f"Lease of sync job {job.id} ({job.symbol}) expired before it finished.")
+            self.completed += 1
+            self.rows += rows
+        except asyncio.CancelledError:
+            outcome = "lost"
+            logger.warning(f"Sync job {job.id} ({job.symbol}) cancelled; its lease was lost or the worker stopped.")
+            raise
+        except baostock_client.CircuitOpenError as e:
+            # Baostock is down: hand the job back and stop claiming until the breaker may close.
+            outcome = "released"
+            self._paused_until = time.monotonic() + e.retry_after
+            logger.warning(f"Baostock unavailable, pausing {self.worker_id} for {e.retry_after:.1f}s: {e}")
+            async with AsyncSessionLocal() as db:
+                await release_job(db, job, self.worker_id)
+        except Exception as e:
+            outcome = "failed" if job.attempts >= self.max_attempts else "retry"
+            logger.error(f"Sync job {job.id} ({job.symbol}) failed, attempt {job.attempts}: {e}")
+            self.failed += 1
+            async with AsyncSessionLocal() as db:
+                await fail_job(db, job, self.worker_id, f"{type(e).__name__}: {e}", self.max_attempts)
+        finally:
+            self._running.pop(job.id, None)
+            JOBS.inc(outcome=outcome)
+            JOB_DURATION.observe(time.perf_counter() - started)
+
+    async def _renew_forever(self):
+        interval = self.lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            if not self._running:
+                continue
+            try:
+                async with AsyncSessionLocal() as db:
+                    lost = await renew_leases(db, self.worker_id, list(self._running), self.lease_seconds)
+            except Exception as e:
+                # Keep working; the leases may still be valid, and the next renewal may succeed.
+                logger.error(f"Failed to renew leases of {self.worker_id}: {e}")
+                continue
+            for job_id in lost:
+                task = self._running.get(job_id)
+                if task is not None:
+                    # Someone else owns the job now; stop duplicating the work.
+                    task.cancel()
+
+
+# --- CLI ---
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed sync work queue.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = sub.add_parser("enqueue", help="Add sync jobs")
+    enqueue.add_argument("symbols", nargs="*", help="Symbols, e.g. sh.600000")
+    enqueue.add_argument("--all", action="store_true", help="Every symbol in stock_info")
+    enqueue.add_argument("--start", type=date.fromisoformat, default=None,
+                         help="First date (default: after the latest stored bar)")
+    enqueue.add_argument("--end", type=date.fromisoformat, default=None, help="Last date (default: the day the job runs)")
+
+    worker = sub.add_parser("worker", help="Claim and run jobs until stopped")
+    worker.add_argument("--id", default=None, help="Worker id (default: host:pid:random)")
+    worker.add_argument("--concurrency", type=int, default=settings.SYNC_WORKER_CONCURRENCY)
+    worker.add_argument("--drain", action="store_true", help="Exit once the queue is empty")
+
+    sub.add_parser("status", help="Job counts and recent throughput")
+    sub.add_parser("retry-failed", help="Put failed jobs back in the queue")
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        await SyncWorker(
+            args.id,
+            concurrency=args.concurrency,
+            lease_seconds=settings.SYNC_LEASE_SECONDS,
+            poll_seconds=settings.SYNC_POLL_SECONDS,
+            max_attempts=settings.SYNC_MAX_ATTEMPTS,
+            drain=args.drain,
+        ).run()
+        return
+
+    async with AsyncSessionLocal() as db:
+        if args.command == "enqueue":
+            symbols = list(args.symbols)
+            if args.all:
+                symbols += (await db.execute(select(models.StockInfo.symbol).order_by(models.StockInfo.symbol))).scalars().all()
+            if not symbols:
+                parser.error("enqueue needs symbols or --all")
+            added = await enqueue_jobs(db, symbols, start_date=args.start, end_date=args.end)
+            logger.info(f"Enqueued {added} sync jobs ({len(symbols) - added} already queued for the same range).")
+        elif args.command == "retry-failed":
+            logger.info(f"Re-queued {await retry_failed(db)} failed jobs.")
+        else:
+            status = await queue_status(db)
+            counts = status["counts"]
+            print(" ".join(f"{name}={count}" for name, count in counts.items()))
+            print(f"workers with running jobs: {status['workers']}")
+            print(f"last {status['window_seconds']:.0f}s: {status['jobs_per_second']:.2f} jobs/s, "
+                  f"{status['rows_per_second']:.0f} rows/s")
+            if counts[FAILED]:
+                result = await db.execute(
+                    select(Job.id, Job.symbol, Job.last_error).where(Job.status == FAILED).order_by(Job.id).limit(10)
+                )
+                for job_id, symbol, error in result.all():
+                    print(f"  failed #{job_id} {symbol}: {error}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,547 @@
+"""
+Deterministic synthetic A-share market for scale testing.
+
+合成行情生成器：由随机种子确定性地生成数千只股票的股票池（板块、上市/退市日期、ST 区间）
+以及日线与分钟K线，包含停牌、涨跌停（含连板）、送转（复权因子）等特征。生成结果可以：
+
+- 通过批量加载器写入数据库（MySQL / SQLite）
+- 输出为与 ``app.archive`` 相同布局的 Parquet 数据集（可用 ``python -m app.archive import`` 导入）
+- 作为离线 Baostock 替身（app/offline_baostock.py）的数据源
+
+The same seed, symbol count and date range always give the same bars, and moving
+``end`` later only appends bars (every random stream is drawn per symbol and per
+feature, indexed by trading day). Usage::
+
+    python -m app.synthetic db --symbols 5000 --years 30 --seed 7
+    python -m app.synthetic parquet data/synthetic --symbols 5000 --years 30 --minute-days 20
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import shutil
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Boards: exchange prefix, first code, share of the universe, first listing, exchange, daily limit.
+BOARDS = (
+    ("sh", 600000, 0.30, date(1990, 12, 19), "SSE", 0.10),
+    ("sh", 601000, 0.10, date(2000, 1, 1), "SSE", 0.10),
+    ("sh", 603000, 0.10, date(2011, 1, 1), "SSE", 0.10),
+    ("sh", 688000, 0.08, date(2019, 7, 22), "SSE", 0.20),
+    ("sz", 1, 0.15, date(1991, 4, 3), "SZSE", 0.10),
+    ("sz", 2001, 0.15, date(2004, 6, 25), "SZSE", 0.10),
+    ("sz", 300001, 0.12, date(2009, 10, 30), "SZSE", 0.20),
+)
+# ChiNext (sz.300) moved from a 10% to a 20% limit on this day.
+CHINEXT_WIDE_LIMIT_FROM = date(2020, 8, 24)
+ST_LIMIT = 0.05
+# IPO and delisting dates are drawn up to this day, independent of the generated range,
+# so the universe does not change with the run date.
+LISTING_HORIZON = date(2025, 12, 31)
+INDUSTRIES = (
+    "银行", "证券", "保险", "地产", "医药", "电子", "计算机", "通信", "传媒", "汽车",
+    "机械", "电力", "化工", "钢铁", "有色", "煤炭", "食品", "家电", "建筑", "农业",
+)
+SPLIT_RATIOS = (1.2, 1.3, 1.5, 2.0)
+# Raw price above which a stock may split, and the band adjusted prices stay within.
+SPLIT_ABOVE = 40.0
+PRICE_FLOOR = 4.0
+PRICE_CEILING = 300.0
+MINUTE_FREQUENCIES = {"5": 5, "15": 15, "30": 30, "60": 60}
+# Price columns affected by adjustflag ("1" backward-adjusted, "2" forward-adjusted, "3" raw).
+PRICE_FIELDS = ("open", "high", "low", "close", "preclose")
+
+
+class SymbolSpec(NamedTuple):
+    code: str
+    name: str
+    exchange: str
+    industry: str
+    ipo_date: date
+    out_date: Optional[date]
+    limit: float
+    chinext: bool
+    # Drift/volatility/market beta of daily returns, float shares and typical turnover (%).
+    drift: float
+    vol: float
+    beta: float
+    float_shares: float
+    turnover: float
+    st_from: Optional[date]
+    st_to: Optional[date]
+
+
+def trading_calendar(start: date, end: date) -> np.ndarray:
+    """
+    Weekdays between ``start`` and ``end`` minus approximate exchange holidays: New Year's
+    Day, a Spring Festival week, Labour Day and the National Day week.
+    """
+    holidays = []
+    for year in range(start.year, end.year + 1):
+        holidays += [date(year, 1, 1), date(year, 5, 1), date(year, 5, 2), date(year, 5, 3)]
+        holidays += [date(year, 10, d) for d in range(1, 8)]
+        # The Spring Festival moves between late January and mid February.
+        festival = date(year, 1, 21) + timedelta(days=(year * 11) % 21)
+        holidays += [festival + timedelta(days=d) for d in range(7)]
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    return days[np.is_busday(days, holidays=np.array(holidays, dtype="datetime64[D]"))]
+
+
+def _reflect(values: np.ndarray, low: float, high: float) -> np.ndarray:
+    """Folds ``values`` back into [low, high] as if reflected at both bounds."""
+    width = high - low
+    folded = np.mod(values - low, 2 * width)
+    return low + np.where(folded > width, 2 * width - folded, folded)
+
+
+class MarketGenerator:
+    """
+    Synthetic universe of ``symbols`` stocks with bars from ``start`` to ``end``.
+
+    Daily returns combine a shared market factor with fat-tailed idiosyncratic noise
+    and are capped at the board's price limit; limit-up days extend into streaks.
+    Stocks are suspended for random spells (bars with ``tradestatus`` 0 and no volume),
+    spend a spell as ST (5% limit, ``isST`` 1) and occasionally split, which moves
+    the raw prices and the adjustment factor.
+    """
+
+    def __init__(self, symbols: int = 5000, start: Optional[date] = None, end: Optional[date] = None,
+                 seed: int = 0, cache_size: int = 128):
+        self.end = end or date.today()
+        self.start = start or self.end - timedelta(days=365 * 30)
+        self.seed = seed
+        self.calendar = trading_calendar(self.start, self.end)
+        market = np.random.default_rng([seed, 0])
+        self._market = 0.0003 + 0.012 * market.standard_t(5, len(self.calendar)) / np.sqrt(5 / 3)
+        self._specs = [s for s in self._universe(symbols) if s.ipo_date <= self.end]
+        self._by_code = {spec.code: spec for spec in self._specs}
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    # --- Universe ---
+
+    def _universe(self, symbols: int) -> List[SymbolSpec]:
+        rng = random.Random(self.seed)
+        counts = [int(round(share * symbols)) for _, _, share, _, _, _ in BOARDS]
+        counts[0] += symbols - sum(counts)
+        specs = []
+        for (prefix, first, _, listed_from, exchange, limit), count in zip(BOARDS, counts):
+            span = (LISTING_HORIZON - listed_from).days
+            for k in range(count):
+                code = f"{prefix}.{first + k:06d}"
+                industry = rng.choice(INDUSTRIES)
+                ipo = listed_from + timedelta(days=int(span * rng.random() ** 1.5))
+                out = None
+                if rng.random() < 0.04:
+                    out = ipo + timedelta(days=rng.randrange(3 * 365, 20 * 365))
+                    out = out if out < LISTING_HORIZON else None
+                st_from = st_to = None
+                if rng.random() < 0.06:
+                    st_from = ipo + timedelta(days=rng.randrange(365, 15 * 365))
+                    st_to = st_from + timedelta(days=rng.randrange(120, 3 * 365))
+                specs.append(SymbolSpec(
+                    code=code,
+                    name=f"合成{industry}{len(specs):04d}",
+                    exchange=exchange,
+                    industry=industry,
+                    ipo_date=ipo,
+                    out_date=out,
+                    limit=limit,
+                    chinext=first == 300001,
+                    drift=rng.gauss(0.0002, 0.0004),
+                    vol=rng.uniform(0.015, 0.035),
+                    beta=rng.uniform(0.6, 1.4),
+                    float_shares=float(np.exp(rng.uniform(np.log(5e7), np.log(5e9)))),
+                    turnover=rng.uniform(0.3, 3.0),
+                    st_from=st_from,
+                    st_to=st_to,
+                ))
+        return specs
+
+    def symbols(self) -> List[SymbolSpec]:
+        return list(self._specs)
+
+    def stock_basic_rows(self) -> List[list]:
+        """Rows shaped like ``query_stock_basic``: code, code_name, ipoDate, outDate, type, status."""
+        return [
+            [s.code, s.name, s.ipo_date.isoformat(), s.out_date.isoformat() if s.out_date else "", "1",
+             "0" if s.out_date and s.out_date <= self.end else "1"]
+            for s in self._specs
+        ]
+
+    def stock_info_rows(self) -> List[dict]:
+        """Rows for the stock_info table."""
+        return [
+            {
+                "symbol": s.code, "company_name": s.name, "exchange": s.exchange,
+                "sector": None, "industry": s.industry, "description": None, "ipo_date": s.ipo_date,
+            }
+            for s in self._specs
+        ]
+
+    # --- Daily bars ---
+
+    def daily(self, code: str) -> Optional[dict]:
+        """
+        Raw (unadjusted) daily bars of ``code`` as NumPy columns, plus ``factor``, the
+        cumulative backward adjustment factor. None for unknown codes or an empty range.
+        """
+        with self._lock:
+            if code in self._cache:
+                self._cache.move_to_end(code)
+                return self._cache[code]
+        spec = self._by_code.get(code)
+        series = self._generate(spec) if spec is not None else None
+        if series is not None:
+            with self._lock:
+                self._cache[code] = series
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return series
+
+    def _generate(self, spec: SymbolSpec) -> Optional[dict]:
+        first = max(spec.ipo_date, self.start)
+        last = min(spec.out_date, self.end) if spec.out_date else self.end
+        i0 = np.searchsorted(self.calendar, np.datetime64(first, "D"), side="left")
+        i1 = np.searchsorted(self.calendar, np.datetime64(last, "D"), side="right")
+        n = int(i1 - i0)
+        if n <= 0:
+            return None
+        days = self.calendar[i0:i1]
+        key = zlib.crc32(spec.code.encode())
+
+        def stream(feature: int) -> np.random.Generator:
+            # One stream per feature, so each array's prefix is stable as ``end`` moves.
+            return np.random.default_rng([self.seed, key, feature])
+
+        limit = np.full(n, spec.limit)
+        if spec.chinext:
+            limit[days < np.datetime64(CHINEXT_WIDE_LIMIT_FROM, "D")] = 0.10
+        st = np.zeros(n, dtype=bool)
+        if spec.st_from:
+            st = (days >= np.datetime64(spec.st_from, "D")) & (days < np.datetime64(spec.st_to, "D"))
+            limit[st] = ST_LIMIT
+
+        # Suspensions: spells starting on ~0.2% of days, geometric length (mean ~7 days).
+        suspended = np.zeros(n, dtype=bool)
+        starts = np.flatnonzero(stream(1).random(n) < 0.002)
+        lengths = stream(2).geometric(0.15, n)
+        for s in starts:
+            suspended[s:s + lengths[s]] = True
+        suspended[0] = False
+
+        returns = spec.drift + spec.beta * self._market[i0:i1] + spec.vol * stream(0).standard_t(4, n) / np.sqrt(2)
+        # Half of the limit-up closes run into a second limit-up day.
+        at_up = returns >= limit
+        streak = np.flatnonzero(at_up[:-1] & (stream(7).random(n)[:-1] < 0.5)) + 1
+        returns[streak] = limit[streak]
+        returns = np.clip(returns, -limit, limit)
+        returns[suspended] = 0.0
+
+        # Adjusted prices are a random walk reflected into [PRICE_FLOOR, PRICE_CEILING], which
+        # keeps each day's move (and so the price limits) but stops prices drifting to 0.
+        log_price = _reflect(np.log(stream(5).uniform(4, 40)) + np.cumsum(np.log1p(returns)),
+                             np.log(PRICE_FLOOR), np.log(PRICE_CEILING))
+        returns[1:] = np.expm1(np.diff(log_price))
+        adjusted = np.exp(log_price)
+
+        # Splits (ex-rights days) on about one day in 750 while trading, only when the raw price is high.
+        ratio = np.ones(n)
+        choices = stream(4).integers(0, len(SPLIT_RATIOS), n)
+        current = 1.0
+        for i in np.flatnonzero((stream(3).random(n) < 1 / 750) & ~suspended):
+            if i > 0 and adjusted[i] / current > SPLIT_ABOVE:
+                ratio[i] = SPLIT_RATIOS[choices[i]]
+                current *= ratio[i]
+        factor = np.cumprod(ratio)
+
+        # Raw prices divide the adjusted ones by the split factor.
+        close = np.round(adjusted / factor, 2)
+        preclose = np.empty(n)
+        preclose[0] = np.round(close[0] / (1 + returns[0]), 2)
+        preclose[1:] = np.round(close[:-1] / ratio[1:], 2)
+        up = np.round(preclose * (1 + limit), 2)
+        down = np.round(preclose * (1 - limit), 2)
+        close = np.clip(close, down, up)
+
+        gap = np.clip(stream(6).normal(0, 0.3 * spec.vol, n), -limit, limit)
+        open_ = np.clip(np.round(preclose * (1 + gap), 2), down, up)
+        # Separate streams per wick: a (2, n) draw would shift the low wicks whenever n grows.
+        upper_wick = np.abs(stream(8).normal(0, 0.4 * spec.vol, n))
+        lower_wick = np.abs(stream(10).normal(0, 0.4 * spec.vol, n))
+        high = np.clip(np.round(np.maximum(open_, close) * (1 + upper_wick), 2), down, up)
+        low = np.clip(np.round(np.minimum(open_, close) * (1 - lower_wick), 2), down, up)
+
+        turn = spec.turnover * np.exp(stream(9).normal(0, 0.5, n)) * (1 + 10 * np.abs(returns))
+        volume = np.round(turn * spec.float_shares * factor / 100 / 100) * 100
+        for column in (open_, high, low, close):
+            column[suspended] = preclose[suspended]
+        volume[suspended] = 0
+        turn[suspended] = 0
+        amount = np.round(volume * (open_ + high + low + close) / 4)
+
+        return {
+            "date": days,
+            "open": open_, "high": high, "low": low, "close": close, "preclose": preclose,
+            "volume": volume.astype(np.int64), "amount": amount.astype(np.int64),
+            "turn": turn, "pctChg": (close / preclose - 1) * 100,
+            "tradestatus": np.where(suspended, 0, 1), "isST": st.astype(int),
+            "factor": factor,
+        }
+
+    @staticmethod
+    def adjust(series: dict, adjustflag: str) -> dict:
+        """Price columns adjusted per baostock's ``adjustflag``: "1" backward, "2" forward, "3" raw."""
+        if adjustflag == "3":
+            return series
+        scale = series["factor"] if adjustflag == "1" else series["factor"] / series["factor"][-1]
+        adjusted = dict(series)
+        for name in PRICE_FIELDS:
+            adjusted[name] = series[name] * scale
+        return adjusted
+
+    # --- Minute bars ---
+
+    def minute_bars(self, code: str, minutes: int, start: date, end: date, adjustflag: str = "3") -> Optional[dict]:
+        """
+        Intraday bars of ``minutes`` length (5/15/30/60) between ``start`` and ``end``, as a
+        path from each day's open to its close that stays within its low and high.
+        """
+        series = self.daily(code)
+        if series is None:
+            return None
+        series = self.adjust(series, adjustflag)
+        lo = np.searchsorted(series["date"], np.datetime64(start, "D"), side="left")
+        hi = np.searchsorted(series["date"], np.datetime64(end, "D"), side="right")
+        # 09:30-11:30 and 13:00-15:00, labelled with each bar's end time.
+        per_session = 120 // minutes
+        clock = [9 * 60 + 30 + minutes * (k + 1) for k in range(per_session)]
+        clock += [13 * 60 + minutes * (k + 1) for k in range(per_session)]
+        times = np.array([np.timedelta64(m, "m") for m in clock])
+        bars = len(clock)
+        key = zlib.crc32(code.encode())
+
+        trade_time, o_, h_, l_, c_, v_ = [], [], [], [], [], []
+        for i in range(lo, hi):
+            day = series["date"][i]
+            rng = np.random.default_rng([self.seed, key, 100 + minutes, int(day.astype(np.int64))])
+            path = np.linspace(series["open"][i], series["close"][i], bars + 1)
+            path[1:-1] += rng.normal(0, (series["high"][i] - series["low"][i]) / 6, bars - 1)
+            path = np.clip(path, series["low"][i], series["high"][i])
+            lots = rng.multinomial(int(series["volume"][i]) // 100, np.full(bars, 1 / bars))
+            trade_time.append(day.astype("datetime64[m]") + times)
+            o_.append(path[:-1])
+            c_.append(path[1:])
+            h_.append(np.maximum(path[:-1], path[1:]))
+            l_.append(np.minimum(path[:-1], path[1:]))
+            v_.append(lots * 100)
+        if not trade_time:
+            return {name: np.array([]) for name in ("time", "open", "high", "low", "close", "volume", "amount")}
+        volume = np.concatenate(v_).astype(np.int64)
+        open_, close = np.concatenate(o_), np.concatenate(c_)
+        return {
+            "time": np.concatenate(trade_time),
+            "open": open_, "high": np.concatenate(h_), "low": np.concatenate(l_), "close": close,
+            "volume": volume, "amount": np.round(volume * (open_ + close) / 2).astype(np.int64),
+        }
+
+    # --- Baostock-shaped rows (offline stand-in) ---
+
+    def k_rows(self, code: str, fields: List[str], start: date, end: date,
+               frequency: str = "d", adjustflag: str = "3") -> List[list]:
+        """Rows of string values for ``query_history_k_data_plus``, in the order of ``fields``."""
+        if frequency in MINUTE_FREQUENCIES:
+            bars = self.minute_bars(code, MINUTE_FREQUENCIES[frequency], start, end, adjustflag)
+            if bars is None:
+                return []
+            columns = {
+                "date": [str(t)[:10] for t in bars["time"].astype("datetime64[D]")],
+                "time": [str(t).replace("-", "").replace("T", "").replace(":", "") + "00000"
+                         for t in bars["time"]],
+                "code": [code] * len(bars["time"]),
+                "adjustflag": [adjustflag] * len(bars["time"]),
+            }
+            for name in ("open", "high", "low", "close", "amount"):
+                columns[name] = [f"{v:.4f}" for v in bars[name]]
+            columns["volume"] = [str(v) for v in bars["volume"]]
+        else:
+            series = self.daily(code)
+            if series is None:
+                return []
+            lo = np.searchsorted(series["date"], np.datetime64(start, "D"), side="left")
+            hi = np.searchsorted(series["date"], np.datetime64(end, "D"), side="right")
+            # Adjust before slicing: forward adjustment is relative to the latest bar.
+            series = {name: values[lo:hi] for name, values in self.adjust(series, adjustflag).items()}
+            count = hi - lo
+            columns = {
+                "date": [str(d) for d in series["date"]],
+                "code": [code] * count,
+                "adjustflag": [adjustflag] * count,
+                "volume": [str(v) for v in series["volume"]],
+                "amount": [f"{v:.4f}" for v in series["amount"]],
+                "tradestatus": [str(v) for v in series["tradestatus"]],
+                "isST": [str(v) for v in series["isST"]],
+            }
+            for name in (*PRICE_FIELDS, "turn", "pctChg"):
+                columns[name] = [f"{v:.4f}" for v in series[name]]
+        empty = [""] * len(columns["date"])
+        return [list(row) for row in zip(*(columns.get(field, empty) for field in fields))]
+
+
+# --- Outputs ---
+
+# adjustflag of the bars stored in the database, matching baostock_utils.fetch_k_data.
+DB_ADJUSTFLAG = "2"
+
+
+def _daily_columns(generator: MarketGenerator, code: str) -> Optional[dict]:
+    series = generator.daily(code)
+    if series is None:
+        return None
+    return MarketGenerator.adjust(series, DB_ADJUSTFLAG)
+
+
+async def load_database(generator: MarketGenerator, chunk_size: int = 5000):
+    """Writes stock_info and every symbol's daily bars through the bulk upsert loader."""
+    from . import crud, models
+    from .database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        infos = generator.stock_info_rows()
+        for i in range(0, len(infos), chunk_size):
+            await crud.upsert_stock_infos_bulk(db, infos[i:i + chunk_size])
+        id_by_symbol = {symbol: stock_id for stock_id, symbol in await crud.get_all_stock_symbols(db)}
+
+        started = time.perf_counter()
+        total = 0
+        for n, spec in enumerate(generator.symbols(), 1):
+            series = _daily_columns(generator, spec.code)
+            if series is None:
+                continue
+            stock_id = id_by_symbol[spec.code]
+            rows = [
+                {
+                    "stock_id": stock_id, "trade_date": d,
+                    "open_price": round(o, 4), "high_price": round(h, 4),
+                    "low_price": round(l, 4), "close_price": round(c, 4),
+                    "volume": v, "amount": a,
+                }
+                for d, o, h, l, c, v, a in zip(
+                    series["date"].tolist(), series["open"].tolist(), series["high"].tolist(),
+                    series["low"].tolist(), series["close"].tolist(), series["volume"].tolist(),
+                    series["amount"].tolist(),
+                )
+            ]
+            await crud.bulk_upsert_bars(db, models.StockDailyData, rows, chunk_size=chunk_size)
+            total += len(rows)
+            if n % 100 == 0:
+                logger.info(f"Loaded {n} symbols, {total} bars ({total / (time.perf_counter() - started):.0f} rows/s).")
+        logger.info(f"Loaded {len(infos)} symbols and {total} daily bars in {time.perf_counter() - started:.1f}s.")
+
+
+def write_parquet(generator: MarketGenerator, root: str, minute_days: int = 0,
+                  symbols_per_chunk: int = 200, overwrite: bool = False):
+    """
+    Writes the universe in the ``app.archive`` layout (stock_info.parquet and a
+    year/prefix-partitioned stock_daily_data dataset). With ``minute_days``, the
+    5-minute bars of the last that many trading days go to ``stock_minute_data``.
+    """
+    from .archive import PARTITION_COLUMNS, STOCK_INFO_FILE, _pyarrow, symbol_prefix
+
+    pa = _pyarrow()
+    if os.path.exists(root) and os.listdir(root):
+        if not overwrite:
+            raise FileExistsError(f"Output directory {root} is not empty.")
+        shutil.rmtree(root)
+    os.makedirs(root, exist_ok=True)
+    pa.parquet.write_table(pa.Table.from_pylist(generator.stock_info_rows()), os.path.join(root, STOCK_INFO_FILE))
+
+    minute_start = (
+        generator.calendar[-minute_days].astype(object) if minute_days and len(generator.calendar) else None
+    )
+    price = pa.decimal128(12, 4)
+    specs = generator.symbols()
+    started = time.perf_counter()
+    total = 0
+    for chunk_no, i in enumerate(range(0, len(specs), symbols_per_chunk)):
+        daily, minute = [], []
+        for spec in specs[i:i + symbols_per_chunk]:
+            series = _daily_columns(generator, spec.code)
+            if series is None:
+                continue
+            count = len(series["date"])
+            daily.append(pa.table({
+                "symbol": pa.array([spec.code] * count, type=pa.string()),
+                "trade_date": pa.array(series["date"], type=pa.date32()),
+                **{f"{name}_price": pa.array(np.round(series[name], 4)).cast(price)
+                   for name in ("open", "high", "low", "close")},
+                "volume": pa.array(series["volume"], type=pa.int64()),
+                "amount": pa.array(series["amount"], type=pa.int64()),
+            }))
+            if minute_start is not None:
+                bars = generator.minute_bars(spec.code, 5, minute_start, generator.end, DB_ADJUSTFLAG)
+                if bars is not None and len(bars["time"]):
+                    minute.append(pa.table({
+                        "symbol": pa.array([spec.code] * len(bars["time"]), type=pa.string()),
+                        "trade_time": pa.array(bars["time"].astype("datetime64[s]")),
+                        **{f"{name}_price": pa.array(np.round(bars[name], 4)).cast(price)
+                           for name in ("open", "high", "low", "close")},
+                        "volume": pa.array(bars["volume"], type=pa.int64()),
+                        "amount": pa.array(bars["amount"], type=pa.int64()),
+                    }))
+        for table_name, tables, time_column in (
+            ("stock_daily_data", daily, "trade_date"), ("stock_minute_data", minute, "trade_time"),
+        ):
+            if not tables:
+                continue
+            table = pa.concat_tables(tables)
+            table = table.append_column("year", pa.compute.year(table[time_column]))
+            table = table.append_column(
+                "prefix", pa.array([symbol_prefix(s) for s in table["symbol"].to_pylist()], type=pa.string())
+            )
+            pa.parquet.write_to_dataset(
+                table, root_path=os.path.join(root, table_name), partition_cols=PARTITION_COLUMNS,
+                basename_template=f"part-{chunk_no}-{{i}}.parquet",
+            )
+            if table_name == "stock_daily_data":
+                total += table.num_rows
+        logger.info(f"Wrote {min(i + symbols_per_chunk, len(specs))}/{len(specs)} symbols, {total} daily bars.")
+    logger.info(f"Wrote {len(specs)} symbols and {total} daily bars to {root} in {time.perf_counter() - started:.1f}s.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic market.")
+    parser.add_argument("command", choices=["db", "parquet"])
+    parser.add_argument("path", nargs="?", help="Output directory (parquet)")
+    parser.add_argument("--symbols", type=int, default=5000)
+    parser.add_argument("--years", type=int, default=30)
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="Last day (default: today)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--minute-days", type=int, default=0, help="Also write 5-minute bars for the last N days")
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args(argv)
+
+    end = args.end or date.today()
+    generator = MarketGenerator(args.symbols, start=end - timedelta(days=365 * args.years), end=end, seed=args.seed)
+    if args.command == "db":
+        asyncio.run(load_database(generator))
+    else:
+        if not args.path:
+            parser.error("parquet requires an output directory")
+        write_parquet(generator, args.path, minute_days=args.minute_days, overwrite=args.overwrite)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -7,49 +7,115 @@ They are designed to be run from a scheduler (like APScheduler, Celery, or cron)
 import asyncio
 import logging
 from datetime import date, timedelta
-from typing import List
+from typing import List, Optional
 
-from sqlalchemy import select
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from . import crud, baostock_utils, models
+from . import (crud, analytics, bar_cache, baostock_client, baostock_utils, barstore, indicators, loop_monitor, models,
+               rollups, screener, symbols)
+from .bars import BAR_COLUMNS, bars_from_frame
+from .config import settings
 from .database import AsyncSessionLocal
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _daily_records(df, stock_id: int) -> List[dict]:
+    """
+    Rows for crud.upsert_daily_data_batch from ``fetch_k_data`` output: only the
+    table's columns (an INSERT rejects unknown keys such as ``code``), NA as None.
+    """
+    frame = df[['trade_date', *BAR_COLUMNS]].astype(object)
+    frame = frame.where(frame.notna(), None)
+    frame['stock_id'] = stock_id
+    return frame.to_dict(orient='records')
+
+def _publish_synced_bars(symbol: str, df, rolled: dict):
+    """
+    Appends freshly synced daily bars and their recomputed rollups to the local bar
+    store, mirrors the daily bars into the analytics store, and drops the symbol from
+    this process's hot-set cache.
+    """
+    bar_cache.get_cache().invalidate_symbol(symbol)
+    analytics.mirror_synced_bars(symbol, df)
+    store = barstore.get_store()
+    if store is None:
+        return
+    store.append(symbol, "d", bars_from_frame(df))
+    for frequency, bars in rolled.items():
+        store.append(symbol, frequency, bars)
+
+async def sync_symbol(db: AsyncSession, symbol: str, start_date: Optional[date] = None,
+                      end_date: Optional[date] = None) -> int:
+    """
+    Fetches and stores the daily bars of one symbol, then refreshes its rollups,
+    indicator state, bar store and analytics mirror.
+
+    Args:
+        symbol: The stock symbol (e.g., 'sh.600000').
+        start_date: First date to fetch. None continues from the latest stored bar
+            (a full history from 1990 for a symbol without bars).
+        end_date: Last date to fetch; defaults to today.
+
+    Returns:
+        The number of daily bars written.
+
+    Raises:
+        BaostockError: The fetch failed; CircuitOpenError while Baostock is down.
+    """
+    stock_info = await crud.get_or_create_stock_info(db, symbol=symbol)
+    # A stock new to stock_info should show up in this process's search right away.
+    symbols.note_symbol(symbol)
+    end_date = end_date or date.today()
+    incremental = start_date is None
+    if incremental:
+        latest_date = await crud.get_latest_daily_data_date(db, stock_id=stock_info.id)
+        start_date = (latest_date + timedelta(days=1)) if latest_date else date(1990, 1, 1)
+        if start_date >= end_date:
+            logger.info(f"Data for {symbol} is already up to date. Skipping.")
+            return 0
+
+    logger.info(f"Fetching data for {symbol} from {start_date} to {end_date}")
+    # Blocking; run off the event loop.
+    df = await asyncio.to_thread(baostock_utils.fetch_k_data, symbol, start_date=start_date, end_date=end_date)
+    if df is None or df.empty:
+        logger.warning(f"No data returned for {symbol}. Skipping.")
+        return 0
+
+    daily_data_list = _daily_records(df, stock_info.id)
+    await crud.upsert_daily_data_batch(db, daily_data_list=daily_data_list)
+    # An incremental sync only recomputes the periods touched by the new bars (usually the current week/month).
+    since = df['trade_date'].min() if incremental else None
+    rolled = await rollups.refresh_rollups(db, stock_id=stock_info.id, since=since)
+    _publish_synced_bars(symbol, df, rolled)
+    # Indicator state is advanced over the new bars only.
+    await indicators.refresh_indicator_state(db, stock_id=stock_info.id, spec=settings.INDICATOR_SPEC)
+    logger.info(f"Successfully synced {len(daily_data_list)} records for {symbol}.")
+    return len(daily_data_list)
+
 async def initial_full_sync(stock_symbols: List[str], start_date: date):
     """
     Performs an initial, full synchronization of historical data for a list of stocks.
 
+    Runs the symbols one after another in this process; to spread a large backfill
+    over several processes or machines, enqueue it with ``app.sync_queue`` instead.
+
     Args:
         stock_symbols: A list of stock symbols to sync (e.g., ['sh.600000', 'sz.000001']).
         start_date: The date from which to start fetching historical data.
     """
     logger.info(f"Starting initial full sync for {len(stock_symbols)} stocks from {start_date}.")
+    loop_monitor.start()
     async with AsyncSessionLocal() as db:
         for symbol in stock_symbols:
             try:
                 logger.info(f"Processing symbol: {symbol}")
-                
-                # 1. Get or create stock_info record
-                stock_info = await crud.get_or_create_stock_info(db, symbol=symbol)
-                
-                # 2. Fetch historical data from Baostock
-                today = date.today()
-                df = baostock_utils.fetch_k_data(symbol, start_date=start_date, end_date=today)
-                
-                if df is not None and not df.empty:
-                    # 3. Convert DataFrame to list of dicts for CRUD operation
-                    df['stock_id'] = stock_info.id
-                    daily_data_list = df.to_dict(orient='records')
-                    
-                    # 4. Batch upsert into the database
-                    await crud.upsert_daily_data_batch(db, daily_data_list=daily_data_list)
-                    logger.info(f"Successfully synced {len(daily_data_list)} records for {symbol}.")
-                else:
-                    logger.warning(f"No data returned for {symbol}. Skipping.")
-
+                await sync_symbol(db, symbol, start_date=start_date)
+            except baostock_client.CircuitOpenError as e:
+                # Baostock is down; the remaining symbols would fail the same way.
+                logger.error(f"Aborting initial sync at {symbol}: {e}")
+                break
             except Exception as e:
                 logger.error(f"Failed to sync {symbol}: {e}")
                 # Continue to the next symbol
@@ -61,48 +127,79 @@ async def daily_incremental_sync():
     Performs a daily incremental synchronization for all stocks in the database.
     """
     logger.info("Starting daily incremental sync.")
+    loop_monitor.start()
     async with AsyncSessionLocal() as db:
         # 1. Get all stocks from our database
-        result = await db.execute(select(models.StockInfo))
-        all_stocks = result.scalars().all()
-        
-        if not all_stocks:
+        result = await db.execute(select(models.StockInfo.symbol))
+        all_symbols = result.scalars().all()
+
+        if not all_symbols:
             logger.warning("No stocks found in the database. Aborting daily sync.")
             return
 
-        for stock_info in all_stocks:
+        for symbol in all_symbols:
             try:
-                logger.info(f"Checking for updates for {stock_info.symbol} (ID: {stock_info.id})")
-                
-                # 2. Get the last recorded date for the stock
-                latest_date = await crud.get_latest_daily_data_date(db, stock_id=stock_info.id)
-                
-                # 3. Determine the start date for the new fetch
-                start_date_for_fetch = (latest_date + timedelta(days=1)) if latest_date else date(1990, 1, 1)
-                end_date_for_fetch = date.today()
-
-                if start_date_for_fetch >= end_date_for_fetch:
-                    logger.info(f"Data for {stock_info.symbol} is already up to date. Skipping.")
-                    continue
-
-                logger.info(f"Fetching data for {stock_info.symbol} from {start_date_for_fetch} to {end_date_for_fetch}")
-                
-                # 4. Fetch new data
-                df = baostock_utils.fetch_k_data(stock_info.symbol, start_date=start_date_for_fetch, end_date=end_date_for_fetch)
-
-                if df is not None and not df.empty:
-                    # 5. Convert and save to DB
-                    df['stock_id'] = stock_info.id
-                    daily_data_list = df.to_dict(orient='records')
-                    await crud.upsert_daily_data_batch(db, daily_data_list=daily_data_list)
-                    logger.info(f"Successfully synced {len(daily_data_list)} new records for {stock_info.symbol}.")
-
+                # 2. Fetch and store everything after the latest stored bar
+                await sync_symbol(db, symbol)
+            except baostock_client.CircuitOpenError as e:
+                logger.error(f"Aborting daily sync at {symbol}: {e}")
+                break
             except Exception as e:
-                logger.error(f"Failed to perform daily sync for {stock_info.symbol}: {e}")
+                logger.error(f"Failed to perform daily sync for {symbol}: {e}")
                 continue
 
+    # Pick up the new bars in this process's screener panel.
+    await screener.refresh_panel()
     logger.info("Daily incremental sync completed.")
 
+async def rebuild_rollups():
+    """
+    Rebuilds the weekly and monthly rollups of every stock from its stored daily bars.
+    Use this once to backfill rollups for data that was synced before they existed.
+    """
+    logger.info("Starting rollup rebuild.")
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(models.StockInfo.id, models.StockInfo.symbol))
+        for stock_id, symbol in result.all():
+            try:
+                await rollups.refresh_rollups(db, stock_id=stock_id)
+            except Exception as e:
+                logger.error(f"Failed to rebuild rollups for {symbol}: {e}")
+                await db.rollback()
+                continue
+    logger.info("Rollup rebuild completed.")
+
+async def maintain_daily_partitions(years_ahead: int = 1):
+    """
+    Keeps a dedicated yearly partition of stock_daily_data (MySQL only) for every
+    year up to ``years_ahead`` years from now, by splitting them off the catch-all
+    ``pmax`` partition created by migration 0002. Run it from the scheduler yearly.
+    """
+    async with AsyncSessionLocal() as db:
+        if db.bind.dialect.name != "mysql":
+            return
+        result = await db.execute(text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'stock_daily_data' "
+            "AND PARTITION_NAME IS NOT NULL AND PARTITION_NAME <> 'pmax'"
+        ))
+        years = [int(name[1:]) for name in result.scalars().all()]
+        if not years:
+            logger.warning("stock_daily_data is not partitioned; run `alembic upgrade head`.")
+            return
+        target = date.today().year + years_ahead
+        if max(years) >= target:
+            return
+        partitions = ", ".join(
+            f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')"
+            for year in range(max(years) + 1, target + 1)
+        )
+        await db.execute(text(
+            f"ALTER TABLE stock_daily_data REORGANIZE PARTITION pmax INTO "
+            f"({partitions}, PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+        ))
+        logger.info(f"Added stock_daily_data partitions up to p{target}.")
+
 # Example of how you might run these tasks
 if __name__ == '__main__':
     # This is for demonstration. In a real app, you'd use a scheduler.
@@ -112,4 +209,14 @@ if __name__ == '__main__':
     
     # Example: Run daily sync
     # asyncio.run(daily_incremental_sync())
+
+    # Example: Backfill weekly/monthly rollups from existing daily data
+    # asyncio.run(rebuild_rollups())
+
+    # Example: Add next year's stock_daily_data partition (MySQL)
+    # asyncio.run(maintain_daily_partitions())
+
+    # Example: Backfill with several workers (see app/sync_queue.py)
+    #   python -m app.sync_queue enqueue --all --start 1990-01-01
+    #   python -m app.sync_queue worker   # in as many processes/machines as needed
     pass
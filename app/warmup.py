@@ -0,0 +1,114 @@
+"""
+Background cache warm-up after startup.
+
+服务启动后在后台预热：加载股票代码映射与搜索索引、选股面板，
+并将所有自选股及访问最多的前N只股票的日线载入热点缓存。
+预热不阻塞启动，进度通过 /health/ready 查询。
+"""
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from . import bars, crud, history, screener, symbols
+from .config import settings
+from .database import ReadSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupProgress:
+    """Progress of the warm-up task, reported by the readiness endpoint."""
+
+    def __init__(self):
+        self.state = "pending"  # pending -> running -> done | failed | disabled
+        self.stage: Optional[str] = None
+        self.symbols_total = 0
+        self.symbols_done = 0
+        self.symbols_failed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("done", "failed", "disabled")
+
+    def to_dict(self) -> dict:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.monotonic()) - self.started_at, 3)
+        return {
+            "state": self.state,
+            "stage": self.stage,
+            "symbols_total": self.symbols_total,
+            "symbols_done": self.symbols_done,
+            "symbols_failed": self.symbols_failed,
+            "elapsed_seconds": elapsed,
+            "error": self.error,
+        }
+
+
+progress = WarmupProgress()
+_task: Optional[asyncio.Task] = None
+
+
+async def _warm_symbols(to_warm: List[str]):
+    progress.stage = "bars"
+    progress.symbols_total = len(to_warm)
+    for symbol in to_warm:
+        try:
+            async with ReadSessionLocal() as db:
+                await history.get_daily_history(db, symbol)
+            progress.symbols_done += 1
+        except Exception as e:
+            progress.symbols_failed += 1
+            logger.warning(f"Warm-up failed for {symbol}: {e}")
+        # Yield between symbols so warm-up never starves request handling.
+        await asyncio.sleep(0)
+
+
+async def run_warmup():
+    """Loads the symbol index, the screener panel and the hot symbols' bars."""
+    progress.state = "running"
+    progress.started_at = time.monotonic()
+    try:
+        progress.stage = "symbols"
+        async with ReadSessionLocal() as db:
+            index = await symbols.load_index(db)
+            watchlisted = await crud.get_watchlisted_symbols(db)
+        symbols.load_view_counts()
+        to_warm = [
+            s for s in bars.unique_symbols(list(watchlisted) + symbols.most_viewed(settings.WARMUP_TOP_N))
+            if index.resolve(s) is not None
+        ]
+        logger.info(f"Warm-up: {len(index)} symbols indexed, {len(to_warm)} to preload.")
+
+        await _warm_symbols(to_warm)
+
+        progress.stage = "screener"
+        await screener.refresh_panel()
+
+        progress.state = "done"
+        logger.info(
+            f"Warm-up finished: {progress.symbols_done} symbols cached, "
+            f"{progress.symbols_failed} failed, in {time.monotonic() - progress.started_at:.2f}s."
+        )
+    except Exception as e:
+        progress.state = "failed"
+        progress.error = str(e)
+        logger.error(f"Warm-up failed: {e}")
+    finally:
+        progress.stage = None
+        progress.finished_at = time.monotonic()
+
+
+def start_warmup() -> Optional[asyncio.Task]:
+    """Schedules the warm-up on the running loop and returns immediately."""
+    global _task
+    if not settings.WARMUP_ENABLED:
+        progress.state = "disabled"
+        return None
+    if _task is None or _task.done():
+        _task = asyncio.create_task(run_warmup())
+    return _task
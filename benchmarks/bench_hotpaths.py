@@ -0,0 +1,189 @@
+"""
+Micro-benchmarks of the ingest, read and serialize hot paths.
+
+热点路径微基准：覆盖同步任务的 K 线清洗（fetch_k_data 的转换部分）、app2 的
+prepare_kline_data 与 K 线逐条序列化、不同批量大小的 upsert_daily_data_batch、
+get_daily_data_history 加 Pydantic 响应构建，以及股票搜索。数据来自 ``app.synthetic``
+的确定性合成行情，数据库为临时 SQLite 文件，Baostock 使用离线替身，结果可在不同提交之间对比::
+
+    python -m benchmarks.bench_hotpaths run -o before.json
+    # ... change code ...
+    python -m benchmarks.bench_hotpaths run -o after.json
+    python -m benchmarks.bench_hotpaths compare before.json after.json
+
+``run -k upsert`` only runs benchmarks whose name contains "upsert"; ``--quick`` trades
+precision for a short run. ``compare`` exits with status 1 when a benchmark's median
+got slower by more than ``--threshold`` (and more than the measured noise).
+"""
+import os
+import sys
+import tempfile
+
+# Settings are read at import time: point the app at a scratch database and the
+# offline Baostock stand-in before any app module is imported.
+_SCRATCH_DIR = tempfile.mkdtemp(prefix="bench_hotpaths_")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(_SCRATCH_DIR, 'bench.db')}")
+os.environ.setdefault("DB_INSTRUMENTATION", "false")
+os.environ.setdefault("BAOSTOCK_BACKEND", "offline")
+os.environ.setdefault("BAOSTOCK_OFFLINE_SYMBOLS", "5000")
+os.environ.setdefault("BAOSTOCK_OFFLINE_YEARS", "12")
+os.environ.setdefault("BAOSTOCK_OFFLINE_LATENCY_SECONDS", "0")
+os.environ.setdefault("BAOSTOCK_OFFLINE_ERROR_RATE", "0")
+os.environ.setdefault("BAOSTOCK_RATE_LIMIT", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import argparse
+import asyncio
+import shutil
+from datetime import date, timedelta
+from typing import List
+
+import pandas as pd
+from pydantic import TypeAdapter
+
+import app2
+from app import baostock_utils, crud, models, schemas
+from app.database import Base, AsyncSessionLocal, async_engine
+from app.symbols import SymbolIndex
+from app.synthetic import DB_ADJUSTFLAG, MarketGenerator
+from app.tasks import _daily_records
+from benchmarks.harness import Case, compare, run_suite, save
+
+SYNC_FIELDS = ["date", "code", "open", "high", "low", "close", "volume", "amount", "adjustflag"]
+KLINE_FIELDS = ["date", "code", "open", "high", "low", "close", "volume", "amount", "adjustflag", "turn", "pctChg"]
+MINUTE_FIELDS = ["date", "time", "code", "open", "high", "low", "close", "volume", "amount", "adjustflag"]
+UPSERT_BATCH_SIZES = (100, 1000, 3000)
+HISTORY_DAYS = (250, 2500)
+SEARCH_KEYWORDS = ("60", "sz.0000", "证券")
+
+
+def _long_listed(generator: MarketGenerator) -> str:
+    """A symbol listed before the generator's first day and still trading, so every window is full."""
+    for spec in generator.symbols():
+        if spec.ipo_date <= generator.start and spec.out_date is None:
+            return spec.code
+    raise RuntimeError("No symbol covers the whole synthetic range")
+
+
+async def _prepare_database(generator: MarketGenerator, symbol: str) -> int:
+    """Creates the schema and loads ``symbol``'s daily bars; returns its stock id."""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        await crud.upsert_stock_infos_bulk(db, [row for row in generator.stock_info_rows() if row["symbol"] == symbol])
+        stock_id = (await crud.get_stock_info_by_symbol(db, symbol)).id
+        rows = generator.k_rows(symbol, SYNC_FIELDS, generator.start, generator.end, "d", DB_ADJUSTFLAG)
+        records = _daily_records(baostock_utils.k_data_frame(SYNC_FIELDS, rows), stock_id)
+        await crud.bulk_upsert_bars(db, models.StockDailyData, records)
+    return stock_id
+
+
+def build_cases(loop: asyncio.AbstractEventLoop) -> List[Case]:
+    generator = app2.get_client().api.source
+    symbol = _long_listed(generator)
+    stock_id = loop.run_until_complete(_prepare_database(generator, symbol))
+    end = generator.end
+    cases = []
+
+    # --- Ingest: fetch_k_data's transform and the upsert it feeds ---
+    for days in (250, 2500):
+        rows = generator.k_rows(symbol, SYNC_FIELDS, end - timedelta(days=days * 7 // 5), end, "d", DB_ADJUSTFLAG)
+        cases.append(Case(f"ingest.k_data_frame[{len(rows)}]",
+                          lambda rows=rows: baostock_utils.k_data_frame(SYNC_FIELDS, rows), items=len(rows)))
+
+    all_rows = generator.k_rows(symbol, SYNC_FIELDS, generator.start, end, "d", DB_ADJUSTFLAG)
+    records = _daily_records(baostock_utils.k_data_frame(SYNC_FIELDS, all_rows), stock_id)
+    for size in UPSERT_BATCH_SIZES:
+        batch = records[-size:]
+
+        async def upsert(batch=batch):
+            async with AsyncSessionLocal() as db:
+                await crud.upsert_daily_data_batch(db, batch)
+
+        cases.append(Case(f"ingest.upsert_daily_data_batch[{len(batch)}]", upsert, is_async=True, items=len(batch)))
+
+    # --- Read: history query plus response building, as the daily_data endpoint returns it ---
+    response_adapter = TypeAdapter(List[schemas.StockDailyDataResponse])
+    for days in HISTORY_DAYS:
+        start = end - timedelta(days=days * 7 // 5)
+
+        async def history(start=start):
+            async with AsyncSessionLocal() as db:
+                bars = await crud.get_daily_data_history(db, stock_id, start, end)
+            return response_adapter.dump_json(response_adapter.validate_python(bars, from_attributes=True))
+
+        count = len(loop.run_until_complete(_history_rows(stock_id, start, end)))
+        cases.append(Case(f"read.daily_data_history+response[{count}]", history, is_async=True, items=count))
+
+    # --- app2 K-line: DataFrame preparation and the per-bar serialization loop ---
+    kline_start = end - timedelta(days=365 * 3)
+    daily_rows = generator.k_rows(symbol, KLINE_FIELDS, kline_start, end, "d", "3")
+    minute_rows = generator.k_rows(symbol, MINUTE_FIELDS, end - timedelta(days=30), end, "5", "3")
+    for frequency, fields, rows in (("d", KLINE_FIELDS, daily_rows), ("5", MINUTE_FIELDS, minute_rows)):
+        cases.append(Case(
+            f"kline.prepare_kline_data[{frequency}:{len(rows)}]",
+            lambda fields=fields, rows=rows, frequency=frequency: app2.frame_to_bars(
+                app2.prepare_kline_data(pd.DataFrame(rows, columns=fields), frequency)),
+            items=len(rows),
+        ))
+    bars = app2.frame_to_bars(app2.prepare_kline_data(pd.DataFrame(daily_rows, columns=KLINE_FIELDS), "d"))
+    cases.append(Case(f"kline.bars_to_output[{len(bars)}]", lambda: app2.bars_to_output(bars), items=len(bars)))
+    output = app2.bars_to_output(bars)
+    cases.append(Case(
+        f"kline.response_json[{len(output)}]",
+        lambda: app2.KlineResponse(success=True, data=output, stockCode=symbol, frequency="d").model_dump_json(),
+        items=len(output),
+    ))
+
+    # --- Search: app2 (Baostock stand-in) and the main app's in-memory index ---
+    index = SymbolIndex([(i, s.code, s.name) for i, s in enumerate(generator.symbols(), 1)])
+    for keyword in SEARCH_KEYWORDS:
+        cases.append(Case(f"search.app2[{keyword}]", lambda keyword=keyword: app2.search_stock(keyword), is_async=True))
+        cases.append(Case(f"search.symbol_index[{keyword}]", lambda keyword=keyword: index.search(keyword)))
+    return cases
+
+
+async def _history_rows(stock_id: int, start: date, end: date):
+    async with AsyncSessionLocal() as db:
+        return await crud.get_daily_data_history(db, stock_id, start, end)
+
+
+def run(args):
+    loop = asyncio.new_event_loop()
+    try:
+        cases = build_cases(loop)
+        loop.run_until_complete(async_engine.dispose())
+    finally:
+        loop.close()
+    rounds, min_time = (3, 0.02) if args.quick else (args.rounds, args.min_time)
+    document = run_suite(cases, rounds=rounds, min_time=min_time, pattern=args.filter)
+    if args.output:
+        save(document, args.output)
+        print(f"Saved {len(document['benchmarks'])} results to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("-o", "--output", help="Write the results to this JSON file")
+    run_parser.add_argument("-k", "--filter", default="", help="Only run benchmarks whose name contains this")
+    run_parser.add_argument("--rounds", type=int, default=7)
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per round")
+    run_parser.add_argument("--quick", action="store_true", help="3 short rounds, for a smoke run")
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "compare":
+            sys.exit(1 if compare(args.base, args.new, args.threshold) else 0)
+        run(args)
+    finally:
+        shutil.rmtree(_SCRATCH_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
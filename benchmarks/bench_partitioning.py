@@ -0,0 +1,189 @@
+"""
+Benchmark: legacy vs clustered/partitioned stock_daily_data layout.
+
+对比两种日线表结构的区间读取与 upsert 吞吐：
+
+- legacy:    surrogate ``id`` primary key + UNIQUE (stock_id, trade_date) + INDEX (trade_date)
+- clustered: PRIMARY KEY (stock_id, trade_date) + INDEX (trade_date), RANGE partitioned
+             by year on MySQL (WITHOUT ROWID on SQLite)
+
+Both layouts are created as scratch tables in the database of DATABASE_URL, filled
+with the same synthetic bars, and dropped afterwards (unless ``--keep``)::
+
+    python -m benchmarks.bench_partitioning --symbols 500 --years 10
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+
+FIRST_YEAR = 1990
+LAST_YEAR = 2030
+VALUE_COLUMNS = ("open_price", "high_price", "low_price", "close_price", "volume", "amount")
+
+
+def _tables():
+    metadata = sa.MetaData()
+
+    def value_columns():
+        return [
+            sa.Column("open_price", sa.Numeric(12, 4), nullable=False),
+            sa.Column("high_price", sa.Numeric(12, 4), nullable=False),
+            sa.Column("low_price", sa.Numeric(12, 4), nullable=False),
+            sa.Column("close_price", sa.Numeric(12, 4), nullable=False),
+            sa.Column("volume", sa.BigInteger(), nullable=False),
+            sa.Column("amount", sa.BigInteger()),
+        ]
+
+    legacy = sa.Table(
+        "bench_daily_legacy", metadata,
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("stock_id", sa.BigInteger(), nullable=False),
+        sa.Column("trade_date", sa.Date(), nullable=False),
+        *value_columns(),
+        sa.UniqueConstraint("stock_id", "trade_date", name="uq_bench_legacy"),
+        sa.Index("idx_bench_legacy_date", "trade_date"),
+    )
+    clustered = sa.Table(
+        "bench_daily_clustered", metadata,
+        sa.Column("stock_id", sa.BigInteger(), primary_key=True, autoincrement=False),
+        sa.Column("trade_date", sa.Date(), primary_key=True),
+        *value_columns(),
+        sa.Index("idx_bench_clustered_date", "trade_date"),
+        sqlite_with_rowid=False,
+    )
+    return metadata, {"legacy": (legacy, ["stock_id", "trade_date"]), "clustered": (clustered, ["stock_id", "trade_date"])}
+
+
+def _upsert(dialect: str, table: sa.Table, keys):
+    if dialect == "mysql":
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in VALUE_COLUMNS})
+    stmt = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(table)
+    return stmt.on_conflict_do_update(index_elements=keys, set_={c: stmt.excluded[c] for c in VALUE_COLUMNS})
+
+
+def _trading_days(years: int):
+    end = date.today()
+    day = end - timedelta(days=365 * years)
+    days = []
+    while day <= end:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def _bar(stock_id: int, day: date, rng: random.Random) -> dict:
+    close = Decimal(rng.randint(100000, 2000000)) / 10000
+    return {
+        "stock_id": stock_id, "trade_date": day,
+        "open_price": close, "high_price": close, "low_price": close, "close_price": close,
+        "volume": rng.randint(1, 10 ** 8), "amount": rng.randint(1, 10 ** 10),
+    }
+
+
+async def run(args):
+    engine = create_async_engine(settings.DATABASE_URL)
+    dialect = engine.dialect.name
+    metadata, layouts = _tables()
+    rng = random.Random(args.seed)
+    days = _trading_days(args.years)
+    load_days, new_days = days[:-args.upsert_days], days[-args.upsert_days:]
+    results = {}
+
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.drop_all)
+        await conn.run_sync(metadata.create_all)
+        if dialect == "mysql":
+            partitions = ", ".join(
+                f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')" for year in range(FIRST_YEAR, LAST_YEAR + 1)
+            )
+            await conn.execute(sa.text(
+                f"ALTER TABLE bench_daily_clustered PARTITION BY RANGE COLUMNS(trade_date) "
+                f"({partitions}, PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+            ))
+
+    try:
+        for name, (table, keys) in layouts.items():
+            # Bars arrive day by day for all symbols, as the sync tasks write them.
+            started = time.perf_counter()
+            rows = 0
+            async with engine.begin() as conn:
+                for day in load_days:
+                    batch = [_bar(stock_id, day, rng) for stock_id in range(1, args.symbols + 1)]
+                    await conn.execute(sa.insert(table), batch)
+                    rows += len(batch)
+            load_seconds = time.perf_counter() - started
+
+            # Upserts: rewrite the last loaded day and append new ones.
+            upsert = _upsert(dialect, table, keys)
+            started = time.perf_counter()
+            upserted = 0
+            async with engine.begin() as conn:
+                for day in [load_days[-1], *new_days]:
+                    batch = [_bar(stock_id, day, rng) for stock_id in range(1, args.symbols + 1)]
+                    await conn.execute(upsert, batch)
+                    upserted += len(batch)
+            upsert_seconds = time.perf_counter() - started
+
+            # Per-symbol one-year range reads, the shape of the daily_data endpoint.
+            query = (
+                sa.select(table.c.trade_date, *(table.c[c] for c in VALUE_COLUMNS))
+                .where(table.c.stock_id == sa.bindparam("stock_id"))
+                .where(table.c.trade_date.between(sa.bindparam("start"), sa.bindparam("end")))
+                .order_by(table.c.trade_date)
+            )
+            read_rng = random.Random(args.seed)
+            latencies, read_rows = [], 0
+            async with engine.connect() as conn:
+                for _ in range(args.reads):
+                    start = read_rng.choice(days[:-250] or days)
+                    params = {"stock_id": read_rng.randint(1, args.symbols), "start": start, "end": start + timedelta(days=365)}
+                    t0 = time.perf_counter()
+                    read_rows += len((await conn.execute(query, params)).all())
+                    latencies.append(time.perf_counter() - t0)
+
+            results[name] = {
+                "load_rows_per_s": rows / load_seconds,
+                "upsert_rows_per_s": upserted / upsert_seconds,
+                "read_p50_ms": statistics.median(latencies) * 1000,
+                "read_p95_ms": sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000,
+                "read_rows_per_s": read_rows / sum(latencies),
+            }
+    finally:
+        if not args.keep:
+            async with engine.begin() as conn:
+                await conn.run_sync(metadata.drop_all)
+        await engine.dispose()
+
+    print(f"{dialect}: {args.symbols} symbols x {len(days)} days, {args.reads} range reads")
+    metrics = list(next(iter(results.values())))
+    print(f"{'metric':<20}" + "".join(f"{name:>14}" for name in results))
+    for metric in metrics:
+        print(f"{metric:<20}" + "".join(f"{results[name][metric]:>14.1f}" for name in results))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--upsert-days", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch tables for inspection")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Minimal benchmark runner: calibrated timing loops, JSON results and comparison.
+
+基准测试工具：每个用例先预热并标定循环次数，使每轮耗时不低于 ``min_time``，
+再重复多轮取中位数；结果保存为 JSON，``compare`` 对比两次结果并标出性能回退。
+"""
+import asyncio
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+
+class Case:
+    """
+    One benchmark: ``func`` is called with no arguments (awaited if ``is_async``).
+    ``items`` is the number of rows/records one call processes, for per-item throughput.
+    """
+
+    def __init__(self, name: str, func: Callable, is_async: bool = False, items: int = 1):
+        self.name = name
+        self.func = func
+        self.is_async = is_async
+        self.items = items
+
+
+def _round(case: Case, loops: int, loop: asyncio.AbstractEventLoop) -> float:
+    """Seconds per call over ``loops`` calls, with the garbage collector paused as timeit does."""
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if case.is_async:
+            async def run():
+                started = time.perf_counter()
+                for _ in range(loops):
+                    await case.func()
+                return time.perf_counter() - started
+            elapsed = loop.run_until_complete(run())
+        else:
+            func = case.func
+            started = time.perf_counter()
+            for _ in range(loops):
+                func()
+            elapsed = time.perf_counter() - started
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return elapsed / loops
+
+
+def measure(case: Case, loop: asyncio.AbstractEventLoop, rounds: int = 7, min_time: float = 0.1) -> dict:
+    """Warms up, calibrates the loop count to ``min_time`` per round and times ``rounds`` rounds."""
+    loops = 1
+    while True:
+        per_call = _round(case, loops, loop)
+        if per_call * loops >= min_time or loops >= 1 << 20:
+            break
+        loops = max(loops * 2, int(min_time / max(per_call, 1e-9)) + 1)
+    samples = [_round(case, loops, loop) for _ in range(rounds)]
+    median = statistics.median(samples)
+    return {
+        "median_s": median,
+        "min_s": min(samples),
+        "mean_s": statistics.fmean(samples),
+        "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "loops": loops,
+        "rounds": rounds,
+        "items": case.items,
+        "items_per_s": case.items / median if median else 0.0,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(cases: List[Case], rounds: int, min_time: float, pattern: str = "") -> dict:
+    """Runs every case whose name contains ``pattern`` and returns the results document."""
+    loop = asyncio.new_event_loop()
+    results: Dict[str, dict] = {}
+    try:
+        for case in cases:
+            if pattern and pattern not in case.name:
+                continue
+            results[case.name] = stats = measure(case, loop, rounds=rounds, min_time=min_time)
+            print(f"{case.name:<48} {_format_time(stats['median_s']):>10}  "
+                  f"±{stats['stdev_s'] / stats['median_s'] * 100 if stats['median_s'] else 0:4.1f}%  "
+                  f"{stats['items_per_s']:>12,.0f} items/s", flush=True)
+    finally:
+        loop.close()
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "rounds": rounds,
+            "min_time": min_time,
+        },
+        "benchmarks": results,
+    }
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def save(document: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+
+
+def compare(base_path: str, new_path: str, threshold: float = 0.10) -> int:
+    """
+    Prints the median change of every benchmark present in both files and returns the
+    number of regressions: benchmarks slower by more than ``threshold`` (0.10 = 10%)
+    and by more than both runs' combined noise (stdev).
+    """
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"base: {base['meta'].get('commit')} {base['meta']['created']}")
+    print(f"new:  {new['meta'].get('commit')} {new['meta']['created']}")
+    print(f"{'benchmark':<48} {'base':>10} {'new':>10} {'change':>8}")
+    regressions = 0
+    for name, after in new["benchmarks"].items():
+        before = base["benchmarks"].get(name)
+        if before is None:
+            print(f"{name:<48} {'-':>10} {_format_time(after['median_s']):>10}     new")
+            continue
+        change = after["median_s"] / before["median_s"] - 1
+        noise = (before["stdev_s"] + after["stdev_s"]) / before["median_s"]
+        flag = ""
+        if change > threshold and change > noise:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -threshold and -change > noise:
+            flag = "  faster"
+        print(f"{name:<48} {_format_time(before['median_s']):>10} {_format_time(after['median_s']):>10} "
+              f"{change * 100:+7.1f}%{flag}")
+    for name, before in base["benchmarks"].items():
+        if name not in new["benchmarks"]:
+            print(f"{name:<48} {_format_time(before['median_s']):>10} {'-':>10}  not run")
+    return regressions
@@ -0,0 +1,89 @@
+"""
+Import-time report of the app entry points.
+
+启动导入耗时：在全新子进程中运行 ``python -X importtime -c "import <模块>"``，
+按顶层包汇总累计耗时，并标出启动时就被导入的重型依赖（pandas、numpy、baostock 等，
+应通过 ``app.lazy_imports.lazy_import`` 推迟到首次使用）::
+
+    python -m benchmarks.import_time app2 app.main
+    python -m benchmarks.import_time app2 --budget-ms 1500 --rounds 5
+
+Each module is imported ``--rounds`` times in a fresh interpreter and the fastest
+run is reported, since the first run also pays for cold file caches. With
+``--budget-ms`` the exit status is 1 when a module's import exceeds the budget, so
+the check can run in CI.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy dependencies the entry points should not import eagerly.
+HEAVY = ("pandas", "numpy", "baostock", "pyarrow", "duckdb", "scipy", "matplotlib")
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """(name, self µs, cumulative µs) per imported module, in ``-X importtime`` order."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def summarize(module: str, entries: List[Tuple[str, int, int]]) -> dict:
+    total = next((cumulative for name, _, cumulative in entries if name == module), 0)
+    packages: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in entries:
+        packages[name.split(".")[0]] += self_us
+    imported = {name.split(".")[0] for name, _, _ in entries}
+    return {
+        "module": module,
+        "total_ms": total / 1000,
+        "modules": len(entries),
+        "packages": sorted(packages.items(), key=lambda item: item[1], reverse=True),
+        "heavy": [name for name in HEAVY if name in imported],
+    }
+
+
+def report(summary: dict, top: int):
+    print(f"\n{summary['module']}: {summary['total_ms']:.0f} ms, {summary['modules']} modules")
+    for package, self_us in summary["packages"][:top]:
+        print(f"  {package:<28} {self_us / 1000:8.1f} ms")
+    if summary["heavy"]:
+        print(f"  eagerly imported heavy dependencies: {', '.join(summary['heavy'])}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=["app2", "app.main"])
+    parser.add_argument("--rounds", type=int, default=3, help="fresh interpreters per module; the fastest counts")
+    parser.add_argument("--top", type=int, default=12, help="packages listed per module")
+    parser.add_argument("--budget-ms", type=float, default=None, help="exit 1 if a module's import takes longer")
+    args = parser.parse_args(argv)
+
+    over_budget = 0
+    for module in args.modules:
+        runs = [summarize(module, import_times(module)) for _ in range(max(1, args.rounds))]
+        summary = min(runs, key=lambda run: run["total_ms"])
+        report(summary, args.top)
+        if args.budget_ms is not None and summary["total_ms"] > args.budget_ms:
+            print(f"  over budget: {summary['total_ms']:.0f} ms > {args.budget_ms:.0f} ms")
+            over_budget += 1
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
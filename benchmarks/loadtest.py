@@ -0,0 +1,444 @@
+"""
+End-to-end HTTP load test for ``app.main:app`` and ``app2:app``.
+
+压测工具：模拟真实用户的访问组合——边输入边搜索（逐键请求搜索接口）、打开K线图、
+查看自选股面板——以闭环并发用户驱动 HTTP 接口，按路由统计吞吐、p50/p95/p99 延迟与错误率，
+并按场景统计每秒完成的图表打开次数。
+
+``--serve`` starts the app itself with uvicorn on a scratch SQLite database filled
+by ``app.synthetic`` (plus users and watchlists) and with the offline Baostock
+stand-in, so a run needs no MySQL and no network::
+
+    python -m benchmarks.loadtest main --serve --users 50 --duration 60
+    python -m benchmarks.loadtest app2 --serve --users 50 --upstream-latency 0.05
+    python -m benchmarks.loadtest main --serve --server-workers 4 --processes 4 --users 200
+
+Without ``--serve`` it targets ``--url``; that server must serve the same synthetic
+universe (``--symbols``/``--seed``) and, for the main app, have users 1..``--watchlist-users``.
+``--processes`` spreads the simulated users over several load-generator processes
+so that the client is not the bottleneck; ``--think 0`` removes think times for a
+saturation test.
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.synthetic import MarketGenerator
+from benchmarks.harness import save
+
+MAIN_INDICATORS = "ma5,ma20,macd"
+DASHBOARD_CHARTS = 8
+WATCHLIST_SIZE = 20
+DEFAULT_MIXES = {
+    "main": {"search": 0.35, "chart": 0.45, "dashboard": 0.2},
+    "app2": {"search": 0.35, "chart": 0.5, "dashboard": 0.15},
+}
+
+
+class Recorder:
+    """Per-route and per-scenario results of one load-generator process, kept as plain (picklable) dicts."""
+
+    def __init__(self, record_from: float, stop_at: float):
+        self.record_from = record_from
+        self.stop_at = stop_at
+        self.routes: Dict[str, dict] = {}
+        self.scenarios: Dict[str, dict] = {}
+
+    @property
+    def running(self) -> bool:
+        return time.monotonic() < self.stop_at
+
+    def _recording(self, started: float) -> bool:
+        return self.record_from <= started < self.stop_at
+
+    def route(self, label: str, started: float, elapsed: float, status: Optional[int], ok: bool):
+        if not self._recording(started):
+            return
+        entry = self.routes.setdefault(label, {"latencies": [], "errors": 0, "statuses": {}})
+        entry["latencies"].append(elapsed)
+        entry["errors"] += not ok
+        key = str(status) if status is not None else "exception"
+        entry["statuses"][key] = entry["statuses"].get(key, 0) + 1
+
+    def scenario(self, name: str, started: float, elapsed: float, ok: bool):
+        if not self._recording(started):
+            return
+        entry = self.scenarios.setdefault(name, {"latencies": [], "errors": 0})
+        entry["latencies"].append(elapsed)
+        entry["errors"] += not ok
+
+
+class User:
+    """One simulated user: picks a scenario by weight, runs it, thinks, repeats."""
+
+    def __init__(self, user_id: int, app: str, client: httpx.AsyncClient, recorder: Recorder,
+                 universe: "Universe", mix: Dict[str, float], think: float, keystroke: float, seed: int):
+        self.user_id = user_id
+        self.app = app
+        self.client = client
+        self.recorder = recorder
+        self.universe = universe
+        self.scenarios = list(mix)
+        self.weights = list(mix.values())
+        self.think = think
+        self.keystroke = keystroke
+        self.rng = random.Random(seed)
+
+    async def run(self):
+        # Stagger the start so users don't arrive in lockstep.
+        await asyncio.sleep(self.rng.uniform(0, self.think or 0.1))
+        while self.recorder.running:
+            name = self.rng.choices(self.scenarios, self.weights)[0]
+            started = time.monotonic()
+            ok = await getattr(self, f"{self.app}_{name}")()
+            self.recorder.scenario(name, started, time.monotonic() - started, ok)
+            if self.think:
+                await asyncio.sleep(self.rng.expovariate(1 / self.think))
+
+    async def request(self, label: str, method: str, url: str, check_success: bool = False, **kwargs) -> bool:
+        started = time.monotonic()
+        status = None
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+            ok = status < 400
+            # app2 reports failures as {"success": false} with status 200.
+            if ok and check_success:
+                ok = bool(response.json().get("success"))
+        except httpx.HTTPError:
+            ok = False
+        self.recorder.route(label, started, time.monotonic() - started, status, ok)
+        return ok
+
+    async def type_query(self, text: str, minimum: int, send) -> bool:
+        """Sends one search per keystroke from ``minimum`` characters on, pausing between keystrokes."""
+        ok = True
+        for length in range(minimum, len(text) + 1):
+            ok &= await send(text[:length])
+            if self.keystroke:
+                await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.keystroke)
+        return ok
+
+    # --- app.main scenarios ---
+
+    async def main_search(self) -> bool:
+        spec = self.universe.pick(self.rng)
+        # Half the users type the numeric code, the others the name.
+        text = spec.code.split(".")[1][:4] if self.rng.random() < 0.5 else spec.name[:4]
+        ok = await self.type_query(text, 1, lambda q: self.request(
+            "GET /stocks/search", "GET", "/stocks/search", params={"q": q, "limit": 10}))
+        return ok and await self.main_chart(spec.code)
+
+    async def main_chart(self, symbol: Optional[str] = None) -> bool:
+        symbol = symbol or self.universe.pick(self.rng).code
+        end = date.today()
+        params = {"start_date": (end - timedelta(days=365)).isoformat(), "end_date": end.isoformat()}
+        # The chart loads its bars and indicator overlay side by side.
+        results = await asyncio.gather(
+            self.request("GET /stocks/{symbol}/daily_data", "GET", f"/stocks/{symbol}/daily_data", params=params),
+            self.request("GET /stocks/{symbol}/indicators", "GET", f"/stocks/{symbol}/indicators",
+                         params={**params, "indicators": MAIN_INDICATORS}),
+        )
+        return all(results)
+
+    async def main_dashboard(self) -> bool:
+        user_id = self.rng.randint(1, self.universe.watchlist_users)
+        return await self.request("GET /users/{user_id}/watchlist/dashboard", "GET",
+                                  f"/users/{user_id}/watchlist/dashboard")
+
+    # --- app2 scenarios ---
+
+    async def app2_search(self) -> bool:
+        spec = self.universe.pick(self.rng)
+        ok = await self.type_query(spec.name[:5], 2, lambda keyword: self.request(
+            "GET /api/stock2/search", "GET", "/api/stock2/search", check_success=True,
+            params={"keyword": keyword}))
+        return ok and await self.app2_chart(spec.code)
+
+    async def app2_chart(self, symbol: Optional[str] = None) -> bool:
+        symbol = symbol or self.universe.pick(self.rng).code
+        ok = await self.kline(symbol, "d")
+        # Some users switch the open chart to an intraday frequency.
+        if self.rng.random() < 0.2:
+            ok &= await self.kline(symbol, self.rng.choice(["5", "60"]))
+        return ok
+
+    async def app2_dashboard(self) -> bool:
+        symbols = self.universe.watchlist(self.rng.randint(1, self.universe.watchlist_users))
+        results = await asyncio.gather(*(self.kline(symbol, "d") for symbol in symbols[:DASHBOARD_CHARTS]))
+        return all(results)
+
+    async def kline(self, symbol: str, frequency: str) -> bool:
+        return await self.request("POST /api/stock2/kline", "POST", "/api/stock2/kline", check_success=True,
+                                  json={"stockCode": symbol, "frequency": frequency})
+
+
+class Universe:
+    """The synthetic symbols the server has, with skewed (Zipf-like) popularity and fixed watchlists."""
+
+    def __init__(self, symbols: int, seed: int, watchlist_users: int):
+        generator = MarketGenerator(symbols, seed=seed)
+        today = date.today()
+        self.specs = [s for s in generator.symbols() if s.out_date is None and s.ipo_date < today]
+        # Popularity ranks are a seeded shuffle so hot symbols spread across boards.
+        random.Random(seed).shuffle(self.specs)
+        self.cum_weights = list(_accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(self.specs))))
+        self.watchlist_users = watchlist_users
+        self.seed = seed
+
+    def pick(self, rng: random.Random):
+        return rng.choices(self.specs, cum_weights=self.cum_weights)[0]
+
+    def watchlist(self, user_id: int) -> List[str]:
+        rng = random.Random(self.seed * 1000003 + user_id)
+        return list(dict.fromkeys(self.pick(rng).code for _ in range(WATCHLIST_SIZE)))
+
+
+def _accumulate(values):
+    total = 0.0
+    for value in values:
+        total += value
+        yield total
+
+
+async def _drive(options: dict, process_index: int) -> dict:
+    universe = Universe(options["symbols"], options["seed"], options["watchlist_users"])
+    now = time.monotonic()
+    recorder = Recorder(now + options["warmup"], now + options["warmup"] + options["duration"])
+    users = range(process_index, options["users"], options["processes"])
+    limits = httpx.Limits(max_connections=max(len(users), 1) * 2, max_keepalive_connections=max(len(users), 1) * 2)
+    async with httpx.AsyncClient(base_url=options["url"], limits=limits, timeout=options["timeout"]) as client:
+        await asyncio.gather(*(
+            User(i + 1, options["app"], client, recorder, universe, options["mix"], options["think"],
+                 options["keystroke"], seed=options["seed"] * 7919 + i).run()
+            for i in users
+        ))
+    return {"routes": recorder.routes, "scenarios": recorder.scenarios}
+
+
+def _drive_process(options: dict, process_index: int) -> dict:
+    return asyncio.run(_drive(options, process_index))
+
+
+def _merge(parts: List[dict]) -> dict:
+    merged = {"routes": {}, "scenarios": {}}
+    for part in parts:
+        for kind in ("routes", "scenarios"):
+            for name, entry in part[kind].items():
+                target = merged[kind].setdefault(name, {"latencies": [], "errors": 0, "statuses": {}})
+                target["latencies"].extend(entry["latencies"])
+                target["errors"] += entry["errors"]
+                for status, count in entry.get("statuses", {}).items():
+                    target["statuses"][status] = target["statuses"].get(status, 0) + count
+    return merged
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def summarize(merged: dict, duration: float) -> dict:
+    summary = {}
+    for kind in ("routes", "scenarios"):
+        summary[kind] = {}
+        for name, entry in sorted(merged[kind].items()):
+            ordered = sorted(entry["latencies"])
+            count = len(ordered)
+            summary[kind][name] = {
+                "count": count,
+                "per_second": count / duration,
+                "error_rate": entry["errors"] / count if count else 0.0,
+                "p50_ms": _percentile(ordered, 0.50) * 1000,
+                "p95_ms": _percentile(ordered, 0.95) * 1000,
+                "p99_ms": _percentile(ordered, 0.99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+            if entry["statuses"]:
+                summary[kind][name]["statuses"] = entry["statuses"]
+    return summary
+
+
+def print_summary(summary: dict):
+    for kind, title in (("routes", "route"), ("scenarios", "scenario")):
+        print(f"\n{title:<42} {'count':>8} {'per s':>9} {'err%':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for name, row in summary[kind].items():
+            print(f"{name:<42} {row['count']:>8} {row['per_second']:>9.1f} {row['error_rate'] * 100:>6.2f} "
+                  f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}")
+
+
+# --- Self-hosted server (--serve) ---
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _server_env(args, scratch: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(scratch, 'loadtest.db')}",
+        "BAOSTOCK_BACKEND": "offline",
+        "BAOSTOCK_OFFLINE_SYMBOLS": str(args.symbols),
+        "BAOSTOCK_OFFLINE_YEARS": str(args.years),
+        "BAOSTOCK_OFFLINE_SEED": str(args.seed),
+        "BAOSTOCK_OFFLINE_LATENCY_SECONDS": str(args.upstream_latency),
+        "LOG_LEVEL": "WARNING",
+        "POPULAR_SYMBOLS_FILE": os.path.join(scratch, "popular_symbols.json"),
+    })
+    return env
+
+
+def _prepare_database(args, env: dict):
+    """Migrates the scratch database, loads the synthetic market and creates the watchlist users."""
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    subprocess.run([sys.executable, "-m", "app.synthetic", "db", "--symbols", str(args.symbols),
+                    "--years", str(args.years), "--seed", str(args.seed)], env=env, check=True)
+    users = json.dumps([
+        {"id": user_id, "symbols": Universe(args.symbols, args.seed, args.watchlist_users).watchlist(user_id)}
+        for user_id in range(1, args.watchlist_users + 1)
+    ])
+    subprocess.run([sys.executable, "-m", "benchmarks.loadtest", "_seed-users"], input=users, text=True,
+                   env=env, check=True)
+
+
+async def _seed_users(users: List[dict]):
+    """Creates ``users`` and their watchlists in DATABASE_URL (run in a child process with the server's settings)."""
+    from sqlalchemy import insert
+
+    from app import crud, models
+    from app.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(models.User), [
+            {"id": user["id"], "username": f"loadtest{user['id']}", "hashed_password": "-",
+             "email": f"loadtest{user['id']}@example.com"}
+            for user in users
+        ])
+        await db.commit()
+        for user in users:
+            rows = await crud.resolve_watchlist_symbols(db, user_id=user["id"], symbols=user["symbols"])
+            await crud.add_stocks_to_watchlist_bulk(db, user_id=user["id"], stock_ids=[row[1] for row in rows])
+
+
+def _start_server(args, env: dict, scratch: str) -> subprocess.Popen:
+    module = "app.main:app" if args.app == "main" else "app2:app"
+    port = _free_port()
+    args.url = f"http://127.0.0.1:{port}"
+    log = open(os.path.join(scratch, "server.log"), "w")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.server_workers), "--log-level", "warning", "--no-access-log"],
+        env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    # The main app is ready once its background warm-up has finished.
+    probe = "/health/ready" if args.app == "main" else "/metrics"
+    deadline = time.monotonic() + 300
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with {server.returncode}, see {log.name}")
+        try:
+            response = httpx.get(args.url + probe, timeout=2)
+            if response.status_code == 200 and (args.app != "main" or response.json().get("warm")):
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("Server did not become ready within 300s")
+
+
+def _parse_mix(text: str, app: str) -> Dict[str, float]:
+    mix = dict(DEFAULT_MIXES[app])
+    if text:
+        mix = {name: 0.0 for name in mix}
+        for part in text.split(","):
+            name, _, weight = part.partition("=")
+            if name.strip() not in mix:
+                raise argparse.ArgumentTypeError(f"Unknown scenario {name!r}; expected one of {sorted(mix)}")
+            mix[name.strip()] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def run(args) -> dict:
+    options = {
+        "app": args.app, "url": args.url, "users": args.users, "processes": args.processes,
+        "duration": args.duration, "warmup": args.warmup, "think": args.think, "keystroke": args.keystroke,
+        "timeout": args.timeout, "symbols": args.symbols, "seed": args.seed,
+        "watchlist_users": args.watchlist_users, "mix": _parse_mix(args.mix, args.app),
+    }
+    print(f"{args.app} at {args.url}: {args.users} users in {args.processes} process(es), "
+          f"{args.warmup:.0f}s warm-up + {args.duration:.0f}s, mix {options['mix']}", flush=True)
+    if args.processes == 1:
+        parts = [_drive_process(options, 0)]
+    else:
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            parts = pool.starmap(_drive_process, [(options, i) for i in range(args.processes)])
+    summary = summarize(_merge(parts), args.duration)
+    print_summary(summary)
+    return {"options": {k: v for k, v in options.items()}, "server_workers": args.server_workers, **summary}
+
+
+def main():
+    if sys.argv[1:2] == ["_seed-users"]:
+        asyncio.run(_seed_users(json.load(sys.stdin)))
+        return
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("app", choices=["main", "app2"])
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Target server (ignored with --serve)")
+    parser.add_argument("--serve", action="store_true", help="Start the app on a scratch database with offline Baostock")
+    parser.add_argument("--server-workers", type=int, default=1, help="uvicorn worker processes with --serve")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent simulated users")
+    parser.add_argument("--processes", type=int, default=1, help="Load-generator processes")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before the measurement")
+    parser.add_argument("--think", type=float, default=1.0, help="Mean think time between scenarios; 0 for none")
+    parser.add_argument("--keystroke", type=float, default=0.15, help="Mean pause between search keystrokes")
+    parser.add_argument("--mix", default="", help="Scenario weights, e.g. search=0.2,chart=0.7,dashboard=0.1")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--symbols", type=int, default=500, help="Synthetic universe size")
+    parser.add_argument("--years", type=int, default=5, help="Years of synthetic history (--serve)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--watchlist-users", type=int, default=50)
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="Offline Baostock latency (--serve)")
+    parser.add_argument("-o", "--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    server = None
+    scratch = tempfile.mkdtemp(prefix="loadtest_") if args.serve else None
+    try:
+        if args.serve:
+            env = _server_env(args, scratch)
+            if args.app == "main":
+                _prepare_database(args, env)
+            server = _start_server(args, env, scratch)
+        results = run(args)
+        if args.output:
+            save(results, args.output)
+            print(f"Saved results to {args.output}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
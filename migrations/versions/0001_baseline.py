@@ -0,0 +1,124 @@
+"""Baseline schema
+
+The schema as created by ``Base.metadata.create_all`` or schema.sql before
+migrations were introduced. Tables that already exist are left alone, so existing
+deployments can run ``alembic upgrade head`` directly.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# SQLite only auto-increments INTEGER PRIMARY KEY columns.
+BigIntPK = sa.BigInteger().with_variant(sa.Integer(), "sqlite")
+
+
+def _bar_columns():
+    return [
+        sa.Column("open_price", sa.Numeric(12, 4), nullable=False),
+        sa.Column("high_price", sa.Numeric(12, 4), nullable=False),
+        sa.Column("low_price", sa.Numeric(12, 4), nullable=False),
+        sa.Column("close_price", sa.Numeric(12, 4), nullable=False),
+        sa.Column("volume", sa.BigInteger(), nullable=False),
+        sa.Column("amount", sa.BigInteger(), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Offline (--sql) mode cannot inspect the database; assume it is empty.
+    existing = set() if op.get_context().as_sql else set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", BigIntPK, primary_key=True, autoincrement=True),
+            sa.Column("username", sa.String(50), nullable=False, unique=True),
+            sa.Column("hashed_password", sa.String(255), nullable=False),
+            sa.Column("email", sa.String(255), nullable=False, unique=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+        )
+
+    if "stock_info" not in existing:
+        op.create_table(
+            "stock_info",
+            sa.Column("id", BigIntPK, primary_key=True, autoincrement=True),
+            sa.Column("symbol", sa.String(10), nullable=False),
+            sa.Column("company_name", sa.String(255)),
+            sa.Column("exchange", sa.String(50)),
+            sa.Column("sector", sa.String(100)),
+            sa.Column("industry", sa.String(100)),
+            sa.Column("description", sa.Text()),
+            sa.Column("ipo_date", sa.Date()),
+            sa.Column("last_updated", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_stock_info_symbol", "stock_info", ["symbol"], unique=True)
+
+    if "stock_daily_data" not in existing:
+        op.create_table(
+            "stock_daily_data",
+            sa.Column("id", BigIntPK, primary_key=True, autoincrement=True),
+            sa.Column("stock_id", sa.BigInteger(), sa.ForeignKey("stock_info.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("trade_date", sa.Date(), nullable=False),
+            *_bar_columns(),
+            sa.Column("creation_time", sa.DateTime(), nullable=False),
+            sa.Column("update_time", sa.DateTime(), nullable=False),
+            sa.UniqueConstraint("stock_id", "trade_date", name="uq_stock_date"),
+        )
+
+    if "stock_period_data" not in existing:
+        op.create_table(
+            "stock_period_data",
+            sa.Column("id", BigIntPK, primary_key=True, autoincrement=True),
+            sa.Column("stock_id", sa.BigInteger(), sa.ForeignKey("stock_info.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("frequency", sa.String(1), nullable=False),
+            sa.Column("period_start", sa.Date(), nullable=False),
+            sa.Column("trade_date", sa.Date(), nullable=False),
+            *_bar_columns(),
+            sa.Column("update_time", sa.DateTime(), nullable=False),
+            sa.UniqueConstraint("stock_id", "frequency", "period_start", name="uq_stock_freq_period"),
+        )
+
+    if "stock_indicator_state" not in existing:
+        op.create_table(
+            "stock_indicator_state",
+            sa.Column("id", BigIntPK, primary_key=True, autoincrement=True),
+            sa.Column("stock_id", sa.BigInteger(), sa.ForeignKey("stock_info.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("frequency", sa.String(1), nullable=False),
+            sa.Column("spec", sa.String(255), nullable=False),
+            sa.Column("last_date", sa.Date(), nullable=False),
+            sa.Column("state", sa.JSON(), nullable=False),
+            sa.Column("latest", sa.JSON(), nullable=False),
+            sa.Column("update_time", sa.DateTime(), nullable=False),
+            sa.UniqueConstraint("stock_id", "frequency", name="uq_stock_freq_indicator"),
+        )
+
+    if "user_watchlist" not in existing:
+        op.create_table(
+            "user_watchlist",
+            sa.Column("id", BigIntPK, primary_key=True, autoincrement=True),
+            sa.Column("user_id", sa.BigInteger(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("stock_id", sa.BigInteger(), sa.ForeignKey("stock_info.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("added_at", sa.DateTime(), nullable=False),
+            sa.UniqueConstraint("user_id", "stock_id", name="uq_user_stock"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("user_watchlist", "stock_indicator_state", "stock_period_data",
+                  "stock_daily_data", "stock_info", "users"):
+        op.drop_table(table)
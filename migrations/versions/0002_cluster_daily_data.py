@@ -0,0 +1,142 @@
+"""Cluster stock_daily_data on (stock_id, trade_date) and partition it by year
+
+The surrogate ``id`` primary key is dropped and ``(stock_id, trade_date)`` becomes
+the primary key, so InnoDB stores each symbol's bars contiguously and a per-symbol
+range read is a sequential clustered scan instead of a secondary index lookup per
+row. On MySQL the table is also RANGE COLUMNS partitioned by year; range reads
+prune to the partitions they touch and old years can be archived by partition.
+MySQL does not allow foreign keys on partitioned tables, so fk to stock_info is
+dropped there. New years are added by ``app.tasks.maintain_daily_partitions``.
+
+On SQLite the table becomes a WITHOUT ROWID table clustered on the same key.
+A table that is already clustered (created from the current schema.sql) is left alone.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:01
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FIRST_YEAR = 1990
+LAST_YEAR = 2030
+
+COLUMNS = (
+    "stock_id", "trade_date", "open_price", "high_price", "low_price", "close_price",
+    "volume", "amount", "creation_time", "update_time",
+)
+
+
+def _year_partitions() -> str:
+    # p<year> holds the bars of that year (and, for the first one, everything earlier).
+    partitions = [
+        f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')"
+        for year in range(FIRST_YEAR, LAST_YEAR + 1)
+    ]
+    partitions.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    return ",\n  ".join(partitions)
+
+
+def _daily_table(name: str, clustered: bool, **kwargs) -> None:
+    key = [sa.PrimaryKeyConstraint("stock_id", "trade_date")] if clustered else [
+        sa.UniqueConstraint("stock_id", "trade_date", name="uq_stock_date"),
+    ]
+    id_column = [] if clustered else [
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True, autoincrement=True),
+    ]
+    op.create_table(
+        name,
+        *id_column,
+        sa.Column("stock_id", sa.BigInteger(), sa.ForeignKey("stock_info.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("trade_date", sa.Date(), nullable=False),
+        sa.Column("open_price", sa.Numeric(12, 4), nullable=False),
+        sa.Column("high_price", sa.Numeric(12, 4), nullable=False),
+        sa.Column("low_price", sa.Numeric(12, 4), nullable=False),
+        sa.Column("close_price", sa.Numeric(12, 4), nullable=False),
+        sa.Column("volume", sa.BigInteger(), nullable=False),
+        sa.Column("amount", sa.BigInteger(), nullable=True),
+        sa.Column("creation_time", sa.DateTime(), nullable=False),
+        sa.Column("update_time", sa.DateTime(), nullable=False),
+        *key,
+        **kwargs,
+    )
+
+
+def _swap_daily_table(clustered: bool, **kwargs) -> None:
+    """Copies stock_daily_data into a table with the target layout and swaps it in."""
+    _daily_table("stock_daily_data_new", clustered, **kwargs)
+    columns = ", ".join(COLUMNS)
+    op.execute(f"INSERT INTO stock_daily_data_new ({columns}) SELECT {columns} FROM stock_daily_data")
+    op.drop_table("stock_daily_data")
+    op.rename_table("stock_daily_data_new", "stock_daily_data")
+
+
+def _mysql_foreign_keys(bind) -> list:
+    if op.get_context().as_sql:
+        # Offline (--sql) mode cannot inspect the database; assume the schema.sql names.
+        return ["fk_stock_daily_data_stock_info"]
+    return bind.execute(sa.text(
+        "SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS "
+        "WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'stock_daily_data'"
+    )).scalars().all()
+
+
+def _already_clustered(bind) -> bool:
+    """True for a table created by the current schema.sql or models: no ``id`` column any more."""
+    if op.get_context().as_sql:
+        return False
+    return "id" not in {column["name"] for column in sa.inspect(bind).get_columns("stock_daily_data")}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if _already_clustered(bind):
+        return
+    if bind.dialect.name == "mysql":
+        for name in _mysql_foreign_keys(bind):
+            op.drop_constraint(name, "stock_daily_data", type_="foreignkey")
+        op.execute(
+            "ALTER TABLE stock_daily_data "
+            "DROP PRIMARY KEY, DROP COLUMN id, DROP INDEX uq_stock_date, "
+            "ADD PRIMARY KEY (stock_id, trade_date)"
+        )
+        if not op.get_context().as_sql and "idx_trade_date" not in {
+            index["name"] for index in sa.inspect(bind).get_indexes("stock_daily_data")
+        }:
+            op.create_index("idx_trade_date", "stock_daily_data", ["trade_date"])
+        op.execute(f"ALTER TABLE stock_daily_data PARTITION BY RANGE COLUMNS(trade_date) (\n  {_year_partitions()}\n)")
+    else:
+        _swap_daily_table(clustered=True, sqlite_with_rowid=False)
+        op.create_index("idx_trade_date", "stock_daily_data", ["trade_date"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == "mysql":
+        op.execute("ALTER TABLE stock_daily_data REMOVE PARTITIONING")
+        op.execute(
+            "ALTER TABLE stock_daily_data "
+            "DROP PRIMARY KEY, "
+            "ADD COLUMN id BIGINT NOT NULL AUTO_INCREMENT FIRST, "
+            "ADD PRIMARY KEY (id), "
+            "ADD UNIQUE INDEX uq_stock_date (stock_id, trade_date)"
+        )
+        op.create_foreign_key(
+            "fk_stock_daily_data_stock_info", "stock_daily_data", "stock_info",
+            ["stock_id"], ["id"], ondelete="CASCADE",
+        )
+    else:
+        op.drop_index("idx_trade_date", table_name="stock_daily_data")
+        _swap_daily_table(clustered=False)
@@ -0,0 +1,58 @@
+"""Add the sync_jobs work queue
+
+Jobs (a symbol and an optional date range) are claimed by ``app.sync_queue``
+workers with ``SELECT ... FOR UPDATE SKIP LOCKED`` and leased until
+``lease_expires_at``. The (status, id) index serves the claim query, the
+(status, lease_expires_at) index the re-queue of expired leases.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# SQLite only auto-increments INTEGER PRIMARY KEY columns.
+BigIntPK = sa.BigInteger().with_variant(sa.Integer(), "sqlite")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases created from the current schema.sql already have the table.
+    if not op.get_context().as_sql and "sync_jobs" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "sync_jobs",
+        sa.Column("id", BigIntPK, primary_key=True, autoincrement=True),
+        sa.Column("symbol", sa.String(10), nullable=False),
+        sa.Column("frequency", sa.String(1), nullable=False),
+        sa.Column("start_date", sa.Date()),
+        sa.Column("end_date", sa.Date()),
+        sa.Column("status", sa.String(10), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("lease_owner", sa.String(100)),
+        sa.Column("lease_expires_at", sa.DateTime()),
+        sa.Column("rows_written", sa.Integer()),
+        sa.Column("last_error", sa.Text()),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("idx_sync_jobs_status", "sync_jobs", ["status", "id"])
+    op.create_index("idx_sync_jobs_lease", "sync_jobs", ["status", "lease_expires_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("idx_sync_jobs_lease", table_name="sync_jobs")
+    op.drop_index("idx_sync_jobs_status", table_name="sync_jobs")
+    op.drop_table("sync_jobs")
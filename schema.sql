@@ -36,9 +36,11 @@ ENGINE = InnoDB;
 
 -- -----------------------------------------------------
 -- Table `stock_daily_data`
+-- Clustered on (stock_id, trade_date) and partitioned by year. MySQL does not
+-- allow foreign keys on partitioned tables. Prefer `alembic upgrade head`,
+-- which also migrates existing tables (migrations/versions/0002_*).
 -- -----------------------------------------------------
 CREATE TABLE IF NOT EXISTS `stock_daily_data` (
-  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
   `stock_id` BIGINT UNSIGNED NOT NULL,
   `trade_date` DATE NOT NULL,
   `open_price` DECIMAL(12, 4) NOT NULL,
@@ -49,10 +51,98 @@ CREATE TABLE IF NOT EXISTS `stock_daily_data` (
   `amount` BIGINT UNSIGNED NULL,
   `creation_time` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `update_time` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`stock_id`, `trade_date`),
+  INDEX `idx_trade_date` (`trade_date` ASC) VISIBLE)
+ENGINE = InnoDB
+PARTITION BY RANGE COLUMNS(`trade_date`) (
+  PARTITION p1990 VALUES LESS THAN ('1991-01-01'),
+  PARTITION p1991 VALUES LESS THAN ('1992-01-01'),
+  PARTITION p1992 VALUES LESS THAN ('1993-01-01'),
+  PARTITION p1993 VALUES LESS THAN ('1994-01-01'),
+  PARTITION p1994 VALUES LESS THAN ('1995-01-01'),
+  PARTITION p1995 VALUES LESS THAN ('1996-01-01'),
+  PARTITION p1996 VALUES LESS THAN ('1997-01-01'),
+  PARTITION p1997 VALUES LESS THAN ('1998-01-01'),
+  PARTITION p1998 VALUES LESS THAN ('1999-01-01'),
+  PARTITION p1999 VALUES LESS THAN ('2000-01-01'),
+  PARTITION p2000 VALUES LESS THAN ('2001-01-01'),
+  PARTITION p2001 VALUES LESS THAN ('2002-01-01'),
+  PARTITION p2002 VALUES LESS THAN ('2003-01-01'),
+  PARTITION p2003 VALUES LESS THAN ('2004-01-01'),
+  PARTITION p2004 VALUES LESS THAN ('2005-01-01'),
+  PARTITION p2005 VALUES LESS THAN ('2006-01-01'),
+  PARTITION p2006 VALUES LESS THAN ('2007-01-01'),
+  PARTITION p2007 VALUES LESS THAN ('2008-01-01'),
+  PARTITION p2008 VALUES LESS THAN ('2009-01-01'),
+  PARTITION p2009 VALUES LESS THAN ('2010-01-01'),
+  PARTITION p2010 VALUES LESS THAN ('2011-01-01'),
+  PARTITION p2011 VALUES LESS THAN ('2012-01-01'),
+  PARTITION p2012 VALUES LESS THAN ('2013-01-01'),
+  PARTITION p2013 VALUES LESS THAN ('2014-01-01'),
+  PARTITION p2014 VALUES LESS THAN ('2015-01-01'),
+  PARTITION p2015 VALUES LESS THAN ('2016-01-01'),
+  PARTITION p2016 VALUES LESS THAN ('2017-01-01'),
+  PARTITION p2017 VALUES LESS THAN ('2018-01-01'),
+  PARTITION p2018 VALUES LESS THAN ('2019-01-01'),
+  PARTITION p2019 VALUES LESS THAN ('2020-01-01'),
+  PARTITION p2020 VALUES LESS THAN ('2021-01-01'),
+  PARTITION p2021 VALUES LESS THAN ('2022-01-01'),
+  PARTITION p2022 VALUES LESS THAN ('2023-01-01'),
+  PARTITION p2023 VALUES LESS THAN ('2024-01-01'),
+  PARTITION p2024 VALUES LESS THAN ('2025-01-01'),
+  PARTITION p2025 VALUES LESS THAN ('2026-01-01'),
+  PARTITION p2026 VALUES LESS THAN ('2027-01-01'),
+  PARTITION p2027 VALUES LESS THAN ('2028-01-01'),
+  PARTITION p2028 VALUES LESS THAN ('2029-01-01'),
+  PARTITION p2029 VALUES LESS THAN ('2030-01-01'),
+  PARTITION p2030 VALUES LESS THAN ('2031-01-01'),
+  PARTITION pmax VALUES LESS THAN (MAXVALUE));
+
+
+-- -----------------------------------------------------
+-- Table `stock_period_data`
+-- Weekly ('w') and monthly ('m') rollups of stock_daily_data.
+-- `trade_date` is the last trading day within the period.
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `stock_period_data` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  `stock_id` BIGINT UNSIGNED NOT NULL,
+  `frequency` CHAR(1) NOT NULL,
+  `period_start` DATE NOT NULL,
+  `trade_date` DATE NOT NULL,
+  `open_price` DECIMAL(12, 4) NOT NULL,
+  `high_price` DECIMAL(12, 4) NOT NULL,
+  `low_price` DECIMAL(12, 4) NOT NULL,
+  `close_price` DECIMAL(12, 4) NOT NULL,
+  `volume` BIGINT UNSIGNED NOT NULL,
+  `amount` BIGINT UNSIGNED NULL,
+  `update_time` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE INDEX `uq_stock_freq_period` (`stock_id` ASC, `frequency` ASC, `period_start` ASC) VISIBLE,
+  CONSTRAINT `fk_stock_period_data_stock_info`
+    FOREIGN KEY (`stock_id`)
+    REFERENCES `stock_info` (`id`)
+    ON DELETE CASCADE
+    ON UPDATE NO ACTION)
+ENGINE = InnoDB;
+
+
+-- -----------------------------------------------------
+-- Table `stock_indicator_state`
+-- Incremental indicator state per stock and frequency.
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `stock_indicator_state` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  `stock_id` BIGINT UNSIGNED NOT NULL,
+  `frequency` CHAR(1) NOT NULL,
+  `spec` VARCHAR(255) NOT NULL,
+  `last_date` DATE NOT NULL,
+  `state` JSON NOT NULL,
+  `latest` JSON NOT NULL,
+  `update_time` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
-  INDEX `idx_trade_date` (`trade_date` ASC) VISIBLE,
-  UNIQUE INDEX `uq_stock_date` (`stock_id` ASC, `trade_date` ASC) VISIBLE,
-  CONSTRAINT `fk_stock_daily_data_stock_info`
+  UNIQUE INDEX `uq_stock_freq_indicator` (`stock_id` ASC, `frequency` ASC) VISIBLE,
+  CONSTRAINT `fk_stock_indicator_state_stock_info`
     FOREIGN KEY (`stock_id`)
     REFERENCES `stock_info` (`id`)
     ON DELETE CASCADE
@@ -60,6 +150,30 @@ CREATE TABLE IF NOT EXISTS `stock_daily_data` (
 ENGINE = InnoDB;
 
 
+-- -----------------------------------------------------
+-- Table `sync_jobs`
+-- Sync work queue drained by app.sync_queue workers (claimed with SKIP LOCKED).
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `sync_jobs` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  `symbol` VARCHAR(10) NOT NULL,
+  `frequency` CHAR(1) NOT NULL DEFAULT 'd',
+  `start_date` DATE NULL,
+  `end_date` DATE NULL,
+  `status` VARCHAR(10) NOT NULL DEFAULT 'pending',
+  `attempts` INT NOT NULL DEFAULT 0,
+  `lease_owner` VARCHAR(100) NULL,
+  `lease_expires_at` DATETIME NULL,
+  `rows_written` INT NULL,
+  `last_error` TEXT NULL,
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  INDEX `idx_sync_jobs_status` (`status` ASC, `id` ASC) VISIBLE,
+  INDEX `idx_sync_jobs_lease` (`status` ASC, `lease_expires_at` ASC) VISIBLE)
+ENGINE = InnoDB;
+
+
 -- -----------------------------------------------------
 -- Table `user_watchlist`
 -- -----------------------------------------------------
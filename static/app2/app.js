@@ -0,0 +1,693 @@
+const { createApp } = Vue;
+
+createApp({
+    data() {
+        return {
+            stockCode: 'sh.600000',
+            stockName: '浦发银行',
+            frequency: 'd',
+            startDate: this.getDefaultDate(-90),
+            endDate: this.getDefaultDate(0),
+            klineData: [],
+            currentData: {},
+            loading: false,
+            error: null,
+            chart: null,
+            searchKeyword: '',
+            searchResults: [],
+            searchTimer: null,
+            showSearchResults: false,
+            zoomLevel: 100,
+            dataZoomStart: 0,
+            dataZoomEnd: 100,
+            isDragging: false,
+            dragStartX: 0,
+            currentStart: 0,
+            isHighlighted: false,
+            highlightTimer: null
+        };
+    },
+    computed: {
+        hasData() {
+            return this.klineData.length > 0;
+        },
+        visibleDataCount() {
+            if (!this.klineData.length) return 0;
+            const total = this.klineData.length;
+            const visible = Math.round(total * (this.dataZoomEnd - this.dataZoomStart) / 100);
+            return visible;
+        }
+    },
+    mounted() {
+        console.log('组件挂载完成');
+        this.initChart();
+        this.bindKeyboardEvents();
+    },
+    beforeUnmount() {
+        this.unbindKeyboardEvents();
+    },
+    methods: {
+        getDefaultDate(daysOffset) {
+            const date = new Date();
+            date.setDate(date.getDate() + daysOffset);
+            return date.toISOString().split('T')[0];
+        },
+
+        initChart() {
+            console.log('初始化图表...');
+            const chartDom = document.getElementById('chart');
+            if (chartDom && typeof echarts !== 'undefined') {
+                try {
+                    this.chart = echarts.init(chartDom);
+                    console.log('图表初始化成功');
+
+                    // 窗口大小变化时重绘图表
+                    window.addEventListener('resize', () => {
+                        if (this.chart) {
+                            this.chart.resize();
+                        }
+                    });
+
+                    // 绑定鼠标滚轮事件
+                    this.bindMouseWheel(chartDom);
+
+                    // 绑定拖拽事件
+                    this.bindDragEvents(chartDom);
+
+                    // 绑定图表事件
+                    this.bindChartEvents();
+
+                    // 初始显示空图表
+                    this.chart.setOption({
+                        title: {
+                            text: '请选择股票并加载数据',
+                            left: 'center',
+                            top: 'center',
+                            textStyle: {
+                                fontSize: 16,
+                                color: '#999'
+                            }
+                        }
+                    });
+
+                } catch (error) {
+                    console.error('图表初始化失败:', error);
+                }
+            } else {
+                console.error('图表容器或ECharts未找到');
+            }
+        },
+
+        bindChartEvents() {
+            if (!this.chart) return;
+
+            // 鼠标悬停事件
+            this.chart.on('mouseover', (params) => {
+                if (params.componentType === 'series' && params.seriesType === 'candlestick') {
+                    this.updateHighlightedData(params.dataIndex);
+                }
+            });
+
+            // 鼠标移动事件（用于更精确的跟踪）
+            this.chart.on('globalout', () => {
+                this.clearHighlight();
+            });
+
+            // 点击事件也可以触发高亮
+            this.chart.on('click', (params) => {
+                if (params.componentType === 'series' && params.seriesType === 'candlestick') {
+                    this.updateHighlightedData(params.dataIndex);
+                }
+            });
+        },
+
+        updateHighlightedData(dataIndex) {
+            if (this.highlightTimer) {
+                clearTimeout(this.highlightTimer);
+            }
+
+            // 添加轻微延迟，避免频繁更新
+            this.highlightTimer = setTimeout(() => {
+                if (dataIndex >= 0 && dataIndex < this.klineData.length) {
+                    this.currentData = { ...this.klineData[dataIndex] };
+                    this.isHighlighted = true;
+                }
+            }, 50);
+        },
+
+        clearHighlight() {
+            if (this.highlightTimer) {
+                clearTimeout(this.highlightTimer);
+            }
+
+            // 延迟清除高亮，避免闪烁
+            this.highlightTimer = setTimeout(() => {
+                if (this.klineData.length > 0) {
+                    // 恢复到显示最新数据
+                    this.currentData = { ...this.klineData[this.klineData.length - 1] };
+                    this.isHighlighted = false;
+                }
+            }, 300);
+        },
+
+        bindMouseWheel(chartDom) {
+            chartDom.addEventListener('wheel', (e) => {
+                if (!this.hasData) return;
+
+                e.preventDefault();
+                const delta = e.deltaY;
+
+                if (delta < 0) {
+                    // 滚轮向上 - 放大
+                    this.zoomIn();
+                } else {
+                    // 滚轮向下 - 缩小
+                    this.zoomOut();
+                }
+            }, { passive: false });
+        },
+
+        bindDragEvents(chartDom) {
+            chartDom.addEventListener('mousedown', (e) => {
+                if (!this.hasData) return;
+
+                this.isDragging = true;
+                this.dragStartX = e.clientX;
+                this.currentStart = this.dataZoomStart;
+                chartDom.style.cursor = 'grabbing';
+            });
+
+            document.addEventListener('mousemove', (e) => {
+                if (!this.isDragging || !this.hasData) return;
+
+                const deltaX = e.clientX - this.dragStartX;
+                const totalWidth = chartDom.offsetWidth;
+                const movePercent = (deltaX / totalWidth) * 100;
+
+                // 计算新的起始位置
+                let newStart = this.currentStart - movePercent;
+                newStart = Math.max(0, Math.min(newStart, 100 - (this.dataZoomEnd - this.dataZoomStart)));
+
+                if (newStart !== this.dataZoomStart) {
+                    this.dataZoomStart = newStart;
+                    this.dataZoomEnd = newStart + (this.dataZoomEnd - this.dataZoomStart);
+                    this.applyDataZoom();
+                }
+            });
+
+            document.addEventListener('mouseup', () => {
+                if (this.isDragging) {
+                    this.isDragging = false;
+                    chartDom.style.cursor = 'default';
+                }
+            });
+        },
+
+        bindKeyboardEvents() {
+            document.addEventListener('keydown', this.handleKeyDown);
+        },
+
+        unbindKeyboardEvents() {
+            document.removeEventListener('keydown', this.handleKeyDown);
+        },
+
+        handleKeyDown(e) {
+            if (!this.hasData) return;
+
+            switch(e.key) {
+                case '+':
+                case '=':
+                    e.preventDefault();
+                    this.zoomIn();
+                    break;
+                case '-':
+                case '_':
+                    e.preventDefault();
+                    this.zoomOut();
+                    break;
+                case 'ArrowLeft':
+                    e.preventDefault();
+                    this.moveLeft();
+                    break;
+                case 'ArrowRight':
+                    e.preventDefault();
+                    this.moveRight();
+                    break;
+                case '0':
+                    e.preventDefault();
+                    this.resetZoom();
+                    break;
+            }
+        },
+
+        zoomIn() {
+            if (!this.hasData) return;
+
+            const zoomFactor = 0.8; // 缩小显示范围，相当于放大
+            const currentRange = this.dataZoomEnd - this.dataZoomStart;
+            const newRange = currentRange * zoomFactor;
+            const center = (this.dataZoomStart + this.dataZoomEnd) / 2;
+
+            this.dataZoomStart = Math.max(0, center - newRange / 2);
+            this.dataZoomEnd = Math.min(100, center + newRange / 2);
+
+            this.applyDataZoom();
+            this.updateZoomLevel();
+        },
+
+        zoomOut() {
+            if (!this.hasData) return;
+
+            const zoomFactor = 1.2; // 扩大显示范围，相当于缩小
+            const currentRange = this.dataZoomEnd - this.dataZoomStart;
+            const newRange = Math.min(100, currentRange * zoomFactor);
+            const center = (this.dataZoomStart + this.dataZoomEnd) / 2;
+
+            this.dataZoomStart = Math.max(0, center - newRange / 2);
+            this.dataZoomEnd = Math.min(100, center + newRange / 2);
+
+            this.applyDataZoom();
+            this.updateZoomLevel();
+        },
+
+        moveLeft() {
+            if (!this.hasData) return;
+
+            const moveStep = 10; // 移动步长百分比
+            const newStart = Math.max(0, this.dataZoomStart - moveStep);
+            const range = this.dataZoomEnd - this.dataZoomStart;
+
+            this.dataZoomStart = newStart;
+            this.dataZoomEnd = newStart + range;
+
+            this.applyDataZoom();
+        },
+
+        moveRight() {
+            if (!this.hasData) return;
+
+            const moveStep = 10; // 移动步长百分比
+            const range = this.dataZoomEnd - this.dataZoomStart;
+            const newEnd = Math.min(100, this.dataZoomEnd + moveStep);
+
+            this.dataZoomEnd = newEnd;
+            this.dataZoomStart = newEnd - range;
+
+            this.applyDataZoom();
+        },
+
+        resetZoom() {
+            this.dataZoomStart = 0;
+            this.dataZoomEnd = 100;
+            this.zoomLevel = 100;
+            this.applyDataZoom();
+        },
+
+        applyDataZoom() {
+            if (!this.chart) return;
+
+            this.chart.setOption({
+                dataZoom: [
+                    {
+                        start: this.dataZoomStart,
+                        end: this.dataZoomEnd
+                    },
+                    {
+                        start: this.dataZoomStart,
+                        end: this.dataZoomEnd
+                    }
+                ]
+            });
+        },
+
+        updateZoomLevel() {
+            const visiblePercent = this.dataZoomEnd - this.dataZoomStart;
+            this.zoomLevel = Math.round((100 / visiblePercent) * 100);
+        },
+
+        async loadData() {
+            if (!this.stockCode) {
+                this.error = '请先选择股票';
+                return;
+            }
+
+            this.loading = true;
+            this.error = null;
+
+            try {
+                console.log('开始加载数据...');
+                const response = await axios.post('/api/stock2/kline', {
+                    stockCode: this.stockCode,
+                    frequency: this.frequency,
+                    startDate: this.startDate,
+                    endDate: this.endDate
+                });
+
+                console.log('API响应:', response.data);
+
+                if (response.data.success) {
+                    this.klineData = response.data.data;
+                    if (this.klineData.length > 0) {
+                        // 初始化显示最新数据
+                        this.currentData = { ...this.klineData[this.klineData.length - 1] };
+                        this.isHighlighted = false;
+                        this.resetZoom(); // 重置缩放状态
+                        this.updateChart();
+                    } else {
+                        this.error = '没有获取到数据';
+                        this.clearChart();
+                    }
+                } else {
+                    this.error = response.data.error || '获取数据失败';
+                    this.clearChart();
+                }
+            } catch (err) {
+                this.error = '加载数据失败: ' + err.message;
+                console.error('API请求错误:', err);
+                this.clearChart();
+            } finally {
+                this.loading = false;
+            }
+        },
+
+        clearChart() {
+            if (this.chart) {
+                this.chart.setOption({
+                    title: {
+                        text: '数据加载失败或暂无数据',
+                        left: 'center',
+                        top: 'center',
+                        textStyle: {
+                            fontSize: 16,
+                            color: '#999'
+                        }
+                    }
+                });
+            }
+            this.klineData = [];
+            this.currentData = {};
+            this.zoomLevel = 100;
+            this.isHighlighted = false;
+        },
+
+        updateChart() {
+            if (!this.chart || this.klineData.length === 0) {
+                console.error('图表未初始化或数据为空');
+                return;
+            }
+
+            try {
+                // 处理日期显示
+                const dates = this.klineData.map(item => {
+                    const dateStr = item.date;
+                    if (['5', '15', '30', '60'].includes(this.frequency)) {
+                        // 分钟数据：显示时间
+                        if (dateStr.includes(' ')) {
+                            return dateStr.split(' ')[1].substr(0, 5); // HH:MM
+                        }
+                        return dateStr.substr(11, 5);
+                    } else {
+                        // 日、周、月数据：显示日期
+                        if (dateStr.includes(' ')) {
+                            return dateStr.split(' ')[0]; // YYYY-MM-DD
+                        }
+                        return dateStr;
+                    }
+                });
+
+                // K线数据
+                const klineValues = this.klineData.map(item => [
+                    parseFloat(item.open) || 0,
+                    parseFloat(item.close) || 0,
+                    parseFloat(item.low) || 0,
+                    parseFloat(item.high) || 0
+                ]);
+
+                // 成交量数据
+                const volumes = this.klineData.map(item => parseFloat(item.volume) || 0);
+
+                // 创建图表配置
+                const option = {
+                    animation: true,
+                    title: {
+                        text: `${this.stockName} (${this.stockCode}) ${this.getFrequencyText()}K线图`,
+                        left: 'center',
+                        textStyle: {
+                            fontSize: 16,
+                            fontWeight: 'bold'
+                        }
+                    },
+                    tooltip: {
+                        trigger: 'axis',
+                        axisPointer: {
+                            type: 'cross',
+                            label: {
+                                backgroundColor: '#6a7985'
+                            }
+                        },
+                        formatter: (params) => {
+                            const dataIndex = params[0].dataIndex;
+                            const item = this.klineData[dataIndex];
+                            let html = `<div style="font-weight: bold; margin-bottom: 5px;">${item.date}</div>`;
+                            html += `<div>开盘: ${this.formatPrice(item.open)}</div>`;
+                            html += `<div>收盘: ${this.formatPrice(item.close)}</div>`;
+                            html += `<div>最高: ${this.formatPrice(item.high)}</div>`;
+                            html += `<div>最低: ${this.formatPrice(item.low)}</div>`;
+                            html += `<div>成交量: ${this.formatVolume(item.volume)}</div>`;
+                            if (item.amount > 0) {
+                                html += `<div>成交额: ${this.formatAmount(item.amount)}</div>`;
+                            }
+                            if (item.pctChg !== undefined) {
+                                const color = item.pctChg >= 0 ? '#e74c3c' : '#2ecc71';
+                                html += `<div>涨跌幅: <span style="color:${color}">${item.pctChg.toFixed(2)}%</span></div>`;
+                            }
+                            return html;
+                        }
+                    },
+                    legend: {
+                        data: ['K线', '成交量'],
+                        top: 30
+                    },
+                    grid: [
+                        {
+                            left: '50px',
+                            right: '50px',
+                            bottom: '100px',
+                            height: '60%'
+                        },
+                        {
+                            left: '50px',
+                            right: '50px',
+                            bottom: '30px',
+                            height: '20%'
+                        }
+                    ],
+                    xAxis: [
+                        {
+                            type: 'category',
+                            data: dates,
+                            scale: true,
+                            boundaryGap: false,
+                            axisLine: { onZero: false },
+                            splitLine: { show: false },
+                            splitNumber: 20,
+                            min: 'dataMin',
+                            max: 'dataMax'
+                        },
+                        {
+                            type: 'category',
+                            gridIndex: 1,
+                            data: dates,
+                            scale: true,
+                            boundaryGap: false,
+                            axisLine: { onZero: false },
+                            axisTick: { show: false },
+                            splitLine: { show: false },
+                            axisLabel: { show: false },
+                            splitNumber: 20,
+                            min: 'dataMin',
+                            max: 'dataMax'
+                        }
+                    ],
+                    yAxis: [
+                        {
+                            scale: true,
+                            splitArea: {
+                                show: true
+                            }
+                        },
+                        {
+                            scale: true,
+                            gridIndex: 1,
+                            splitNumber: 2,
+                            axisLabel: { show: false },
+                            axisLine: { show: false },
+                            axisTick: { show: false },
+                            splitLine: { show: false }
+                        }
+                    ],
+                    dataZoom: [
+                        {
+                            type: 'inside',
+                            xAxisIndex: [0, 1],
+                            start: this.dataZoomStart,
+                            end: this.dataZoomEnd,
+                            zoomOnMouseWheel: false,  // 禁用默认滚轮缩放，使用自定义
+                            moveOnMouseMove: true,
+                            moveOnMouseWheel: false
+                        },
+                        {
+                            show: true,
+                            xAxisIndex: [0, 1],
+                            type: 'slider',
+                            bottom: 10,
+                            start: this.dataZoomStart,
+                            end: this.dataZoomEnd,
+                            height: 20,
+                            brushSelect: false,
+                            fillerColor: 'rgba(67,128,226,0.2)',
+                            borderColor: '#ddd',
+                            handleStyle: {
+                                color: '#4380e2'
+                            }
+                        }
+                    ],
+                    series: [
+                        {
+                            name: 'K线',
+                            type: 'candlestick',
+                            data: klineValues,
+                            itemStyle: {
+                                color: '#ef232a',
+                                color0: '#14b143',
+                                borderColor: '#ef232a',
+                                borderColor0: '#14b143'
+                            },
+                            emphasis: {
+                                itemStyle: {
+                                    borderWidth: 2,
+                                    shadowBlur: 10,
+                                    shadowColor: 'rgba(0, 0, 0, 0.3)'
+                                }
+                            }
+                        },
+                        {
+                            name: '成交量',
+                            type: 'bar',
+                            xAxisIndex: 1,
+                            yAxisIndex: 1,
+                            data: volumes,
+                            itemStyle: {
+                                color: (params) => {
+                                    const index = params.dataIndex;
+                                    const item = this.klineData[index];
+                                    return item.close >= item.open ? '#ef232a' : '#14b143';
+                                }
+                            }
+                        }
+                    ]
+                };
+
+                this.chart.setOption(option, true);
+                // 重新绑定图表事件
+                this.bindChartEvents();
+                console.log('图表更新成功');
+
+            } catch (error) {
+                console.error('更新图表时出错:', error);
+                this.error = '图表渲染失败: ' + error.message;
+            }
+        },
+
+        getFrequencyText() {
+            const freqMap = {
+                '5': '5分钟', '15': '15分钟', '30': '30分钟', '60': '60分钟',
+                'd': '日', 'w': '周', 'm': '月'
+            };
+            return freqMap[this.frequency] || this.frequency;
+        },
+
+        formatPrice(price) {
+            return price ? price.toFixed(2) : '--';
+        },
+
+        formatVolume(volume) {
+            if (!volume) return '--';
+            if (volume >= 100000000) {
+                return (volume / 100000000).toFixed(2) + '亿';
+            } else if (volume >= 10000) {
+                return (volume / 10000).toFixed(2) + '万';
+            }
+            return volume.toFixed(0);
+        },
+
+        formatAmount(amount) {
+            if (!amount) return '--';
+            return (amount / 100000000).toFixed(2) + '亿元';
+        },
+
+        getPriceClass(current, compare) {
+            if (!current || !compare) return '';
+            return current >= compare ? 'price-up' : 'price-down';
+        },
+
+        async searchStocks() {
+            if (this.searchTimer) {
+                clearTimeout(this.searchTimer);
+            }
+
+            this.searchTimer = setTimeout(async () => {
+                if (this.searchKeyword.trim().length < 2) {
+                    this.searchResults = [];
+                    this.showSearchResults = false;
+                    return;
+                }
+
+                try {
+                    const response = await axios.get('/api/stock2/search', {
+                        params: { keyword: this.searchKeyword.trim() }
+                    });
+
+                    if (response.data.success) {
+                        this.searchResults = response.data.data;
+                        this.showSearchResults = this.searchResults.length > 0;
+                    } else {
+                        this.searchResults = [];
+                        this.showSearchResults = false;
+                    }
+                } catch (err) {
+                    console.error('搜索股票失败:', err);
+                    this.searchResults = [];
+                    this.showSearchResults = false;
+                }
+            }, 500);
+        },
+
+        selectStock(stock2) {
+            this.stockCode = stock2.code;
+            this.stockName = stock2.name;
+            this.searchKeyword = stock2.name;
+            this.searchResults = [];
+            this.showSearchResults = false;
+            console.log(`选择了股票: ${stock2.name} (${stock2.code})`);
+        },
+
+        onSearchBlur() {
+            setTimeout(() => {
+                this.showSearchResults = false;
+            }, 200);
+        },
+
+        onSearchFocus() {
+            if (this.searchKeyword.trim().length >= 2 && this.searchResults.length > 0) {
+                this.showSearchResults = true;
+            }
+        },
+
+        clearSearch() {
+            this.searchKeyword = '';
+            this.searchResults = [];
+            this.showSearchResults = false;
+        }
+    }
+}).mount('#app');